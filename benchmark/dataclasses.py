@@ -0,0 +1,78 @@
+'''
+Micro-benchmark of message encoding and decoding: compiled encoders
+and decoders vs `dataclasses_json`.
+
+Run with: python -m benchmark.dataclasses
+'''
+import timeit
+from dataclasses import is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Type
+
+from dataclasses_json import LetterCase, dataclass_json
+from lumy_middleware.types import generated
+from lumy_middleware.types.generated import (DataTabularDataFilter,
+                                             DataTabularDataFilterCondition,
+                                             DataTabularDataFilterItem,
+                                             DataTabularDataSortingMethod,
+                                             Direction, LumyWorkflow,
+                                             MsgModuleIOOutputValue, Operator)
+from lumy_middleware.utils.dataclasses import from_dict, from_yaml, to_dict
+
+WORKFLOW_PATH = Path(__file__).parent.parent / \
+    'test' / 'resources' / 'LogicXorWorkflow.yml'
+
+NUMBER = 2000
+
+
+def output_value() -> MsgModuleIOOutputValue:
+    return MsgModuleIOOutputValue(
+        step_id='step',
+        output_id='output',
+        type='table',
+        value='x' * 64,
+        filter=DataTabularDataFilter(
+            offset=100,
+            page_size=50,
+            sorting=DataTabularDataSortingMethod(
+                column='a', direction=Direction.ASC),
+            condition=DataTabularDataFilterCondition(
+                operator=Operator.AND,
+                items=[
+                    DataTabularDataFilterItem(
+                        column='a', operator='contains', value='b')
+                ]
+            )
+        ),
+        stats={'rowsCount': 1000, 'columns': ['a', 'b']}
+    )
+
+
+def measure(label: str, fn: Callable[[], Any]) -> float:
+    seconds = min(timeit.repeat(fn, number=NUMBER, repeat=5))
+    print(f'  {label:<16} {seconds / NUMBER * 1e6:8.1f} us')
+    return seconds
+
+
+def compare(cls: Type, value: Any) -> None:
+    print(f'{cls.__name__}:')
+    data = to_dict(value)
+    encode = measure('to_dict', lambda: to_dict(value))
+    encode_ref = measure('dataclasses_json', lambda: value.to_dict())
+    decode = measure('from_dict', lambda: from_dict(cls, data))
+    decode_ref = measure('dataclasses_json', lambda: cls.from_dict(data))
+    print(f'  speed-up: encoding x{encode_ref / encode:.1f}, '
+          f'decoding x{decode_ref / decode:.1f}')
+
+
+def main():
+    for v in vars(generated).values():
+        if is_dataclass(v):
+            dataclass_json(v, letter_case=LetterCase.CAMEL)
+
+    compare(MsgModuleIOOutputValue, output_value())
+    compare(LumyWorkflow, from_yaml(LumyWorkflow, WORKFLOW_PATH.read_text()))
+
+
+if __name__ == '__main__':
+    main()
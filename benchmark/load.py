@@ -0,0 +1,125 @@
+'''
+Load generator for the middleware server (`lumy_middleware.server`).
+
+Concurrent clients send requests of a scenario one after another and
+wait for the response of each request. Throughput and latency of every
+action are printed at the end.
+
+Start the server: python -m lumy_middleware.server --port 8765
+Run with: python -m benchmark.load --port 8765 --clients 16 \\
+    --scenario system-info,notes
+'''
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from benchmark.report import print_latencies
+from lumy_middleware.server.client import ServerClient
+from lumy_middleware.target import Target
+
+# Responses sent instead of the expected response
+FAILURE_ACTIONS = {'Error', 'Cancelled'}
+
+
+@dataclass
+class Request:
+    target: Target
+    action: str
+    content: Dict[str, Any]
+    # action of the response message
+    response_action: str
+
+
+def scenarios(args: argparse.Namespace) -> Dict[str, List[Request]]:
+    return {
+        'system-info': [
+            Request(Target.Activity, 'GetSystemInfo', {}, 'SystemInfo'),
+        ],
+        'workflow-list': [
+            Request(Target.Workflow, 'GetWorkflowList', {}, 'WorkflowList'),
+        ],
+        'notes': [
+            Request(Target.Notes, 'GetNotes',
+                    {'stepId': args.step}, 'Notes'),
+        ],
+        'output-value': [
+            Request(Target.ModuleIO, 'GetOutputValue',
+                    {'stepId': args.step, 'outputId': args.output},
+                    'OutputValue'),
+        ],
+    }
+
+
+async def run_client(args: argparse.Namespace,
+                     requests: List[Request],
+                     latencies: Dict[str, List[float]],
+                     failures: Dict[str, int]) -> None:
+    client = await ServerClient.connect(args.host, args.port, args.path)
+    try:
+        for idx in range(args.requests):
+            request = requests[idx % len(requests)]
+            started_at = time.perf_counter()
+            await client.send(request.target, request.action,
+                              request.content)
+            while True:
+                response = await client.receive()
+                if response is None:
+                    raise ConnectionError('Server closed the connection')
+                _, envelope, _ = response
+                action = envelope.get('action')
+                if action == request.response_action:
+                    latencies[request.action].append(
+                        time.perf_counter() - started_at)
+                    break
+                if action in FAILURE_ACTIONS:
+                    failures[request.action] += 1
+                    break
+                # notifications are skipped
+    finally:
+        await client.close()
+
+
+async def run(args: argparse.Namespace) -> None:
+    requests = [
+        request
+        for name in args.scenario.split(',')
+        for request in scenarios(args)[name]
+    ]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    failures: Dict[str, int] = defaultdict(int)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*[
+        run_client(args, requests, latencies, failures)
+        for _ in range(args.clients)
+    ])
+    seconds = time.perf_counter() - started_at
+
+    print(f'{args.clients} clients, {seconds:.2f} s')
+    print_latencies(latencies, failures, seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lumy server load test')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--path', default=None,
+                        help='Unix socket path (instead of host and port)')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=100,
+                        help='Number of requests sent by every client')
+    parser.add_argument('--scenario', default='system-info',
+                        help='Comma separated scenarios: system-info, '
+                        'workflow-list, notes, output-value')
+    parser.add_argument('--step', default='step',
+                        help='Step ID used by "notes" and "output-value"')
+    parser.add_argument('--output', default='output',
+                        help='Output ID used by "output-value"')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
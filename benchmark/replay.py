@@ -0,0 +1,79 @@
+'''
+Replay of a recorded client session trace (see `utils.trace`).
+
+Messages received from the client are pushed through a
+`StandaloneController`, either at the recorded pace or as fast as
+possible. Messages are handled synchronously, so the latency of a message
+is the time it takes to handle it and publish all its responses.
+
+Record a trace: LUMY_TRACE_FILE=session.jsonl jupyter lab
+Run with: python -m benchmark.replay session.jsonl \\
+    --workflow test/resources/LogicXorWorkflow.yml --speed max
+'''
+import argparse
+import logging
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from benchmark.report import print_latencies
+from lumy_middleware.jupyter.base import MessageEnvelope, Target
+from lumy_middleware.standalone.controller import StandaloneController
+from lumy_middleware.types.generated import MsgWorkflowLoadLumyWorkflow
+from lumy_middleware.utils.trace import INBOUND, read_trace
+
+
+def replay(args: argparse.Namespace) -> None:
+    controller = StandaloneController()
+    client = controller.client
+
+    if args.workflow is not None:
+        client.publish(Target.Workflow, MessageEnvelope(
+            action='LoadLumyWorkflow',
+            content=MsgWorkflowLoadLumyWorkflow(workflow=args.workflow)
+        ))
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    failures: Dict[str, int] = defaultdict(int)
+    action: Optional[str] = None
+
+    def on_activity(msg: MessageEnvelope):
+        if msg.action == 'Error' and action is not None:
+            failures[action] += 1
+
+    records = [r for r in read_trace(args.trace) if r.direction == INBOUND]
+    started_at = time.perf_counter()
+    with client.subscribe(Target.Activity, on_activity):
+        for record in records:
+            if args.speed == 'recorded':
+                delay = record.t - (time.perf_counter() - started_at)
+                if delay > 0:
+                    time.sleep(delay)
+            action = record.action
+            sent_at = time.perf_counter()
+            client.publish(record.target, MessageEnvelope(
+                action=record.action, content=record.content))
+            latencies[record.action].append(time.perf_counter() - sent_at)
+    seconds = time.perf_counter() - started_at
+
+    print(f'{len(records)} messages replayed in {seconds:.2f} s, '
+          f'{len(records) / seconds:.1f} msg/s')
+    print_latencies(latencies, failures, seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a Lumy trace')
+    parser.add_argument('trace', type=Path)
+    parser.add_argument('--workflow', default=None,
+                        help='Workflow loaded before the trace is replayed')
+    parser.add_argument('--speed', choices=['recorded', 'max'],
+                        default='max')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARN)
+    replay(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+from typing import Dict, List
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def print_latencies(latencies: Dict[str, List[float]],
+                    failures: Dict[str, int],
+                    seconds: float) -> None:
+    '''
+    Print count, throughput and latency percentiles per action.
+    '''
+    print(f'  {"action":<20} {"count":>7} {"errors":>7} {"req/s":>9} '
+          f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+    for action in sorted(set(latencies) | set(failures)):
+        count = len(latencies.get(action, []))
+        values = latencies.get(action, None) or [float('nan')]
+        print(f'  {action:<20} {count:>7} '
+              f'{failures.get(action, 0):>7} '
+              f'{count / seconds:>9.1f} '
+              f'{percentile(values, 0.5) * 1e3:>8.2f} '
+              f'{percentile(values, 0.95) * 1e3:>8.2f} '
+              f'{percentile(values, 0.99) * 1e3:>8.2f}')
@@ -0,0 +1,175 @@
+'''
+Batching of outbound notifications.
+
+Processing a workflow emits many small notifications: values of inputs
+and outputs of every step are updated one step at a time. Notifications
+published within a short window are merged (i.e. updated IDs of the same
+step are sent in one message) and sent together when the window ends or
+when processing of the workflow is over.
+'''
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from lumy_middleware.jupyter.base import MessageEnvelope
+from lumy_middleware.target import Target
+from lumy_middleware.types.generated import (MsgExecutionState,
+                                             MsgModuleIOInputValuesUpdated,
+                                             MsgModuleIOOutputValuesUpdated,
+                                             State)
+
+logger = logging.getLogger(__name__)
+
+# Seconds notifications are held for before they are sent.
+# `0` sends notifications as soon as they are published.
+BATCH_WINDOW = float(os.environ.get('LUMY_BATCH_WINDOW', 0.05))
+
+BATCH_ACTION = 'Batch'
+
+# Messages announcing changes of the state of the middleware
+NOTIFICATION_TYPES = (MsgModuleIOInputValuesUpdated,
+                      MsgModuleIOOutputValuesUpdated,
+                      MsgExecutionState)
+
+NOTIFICATION_ACTIONS = frozenset(
+    [BATCH_ACTION] + [t._action for t in NOTIFICATION_TYPES])  # type: ignore
+
+SendBatch = Callable[[Target, List[MessageEnvelope]], None]
+Send = Callable[[Target, MessageEnvelope], None]
+
+
+def _merge_ids(a: List[str], b: List[str]) -> List[str]:
+    return a + [i for i in b if i not in a]
+
+
+def merge_key(msg: Any) -> Optional[Hashable]:
+    '''
+    Notifications with the same merge key are merged into one.
+    Returns `None` if the message is not a batched notification.
+    '''
+    if isinstance(msg, (MsgModuleIOInputValuesUpdated,
+                        MsgModuleIOOutputValuesUpdated)):
+        return (type(msg), msg.step_id)
+    if isinstance(msg, MsgExecutionState):
+        return MsgExecutionState
+    return None
+
+
+def merge(pending: Any, msg: Any) -> Any:
+    if isinstance(msg, MsgModuleIOInputValuesUpdated):
+        return MsgModuleIOInputValuesUpdated(
+            input_ids=_merge_ids(pending.input_ids, msg.input_ids),
+            step_id=msg.step_id)
+    if isinstance(msg, MsgModuleIOOutputValuesUpdated):
+        return MsgModuleIOOutputValuesUpdated(
+            output_ids=_merge_ids(pending.output_ids, msg.output_ids),
+            step_id=msg.step_id)
+    # only the latest state matters
+    return msg
+
+
+class NotificationBatcher:
+    '''
+    Holds notifications published on a target for `window` seconds,
+    merging notifications with the same merge key. Pending notifications
+    are passed to `send` in the order they were first published.
+
+    Messages on a target are sent one at a time: pending notifications
+    sent when the window ends are not interleaved with messages sent
+    through `publish`.
+    '''
+    # pending messages by merge key, by target
+    _pending: Dict[Target, Dict[Hashable, MessageEnvelope]]
+    # held while messages are sent on the target
+    _target_locks: Dict[Target, threading.RLock]
+    _timer: Optional[threading.Timer]
+
+    def __init__(self, send: SendBatch, window: float = BATCH_WINDOW):
+        self._send = send
+        self._window = window
+        self._pending = {}
+        self._target_locks = {}
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def publish(self,
+                target: Target,
+                msg: MessageEnvelope,
+                send: Send) -> None:
+        '''
+        Hold the message if it is a notification that can be batched.
+        Otherwise send it with `send` after pending notifications
+        on the target.
+        '''
+        with self._target_lock(target):
+            if not self.offer(target, msg):
+                send(target, msg)
+
+    def offer(self, target: Target, msg: MessageEnvelope) -> bool:
+        '''
+        Hold the message if it is a notification that can be batched.
+        Otherwise returns `False` after pending notifications on the target
+        are sent, so that the message is not sent ahead of them.
+        '''
+        key = merge_key(msg.content)
+        if key is None:
+            self.flush(target)
+            return False
+
+        with self._lock:
+            pending = self._pending.setdefault(target, {})
+            previous = pending.get(key, None)
+            if previous is not None:
+                msg = MessageEnvelope(
+                    action=msg.action,
+                    content=merge(previous.content, msg.content))
+            pending[key] = msg
+            if self._timer is None:
+                self._timer = threading.Timer(self._window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if isinstance(msg.content, MsgExecutionState) \
+                and msg.content.state == State.IDLE:
+            # processing is over: nothing else is coming
+            self.flush()
+        return True
+
+    def flush(self, target: Optional[Target] = None) -> None:
+        '''
+        Send pending notifications on `target` or on all targets.
+        '''
+        with self._lock:
+            if target is None:
+                targets = list(self._pending.keys())
+                # notifications offered from now on start a new window
+                self._cancel_timer()
+            else:
+                targets = [target]
+
+        for batch_target in targets:
+            with self._target_lock(batch_target):
+                with self._lock:
+                    messages = self._pending.pop(batch_target, None)
+                    if len(self._pending) == 0:
+                        self._cancel_timer()
+                if messages is None:
+                    continue
+                try:
+                    self._send(batch_target, list(messages.values()))
+                except Exception:
+                    logger.exception(
+                        f'Could not send notifications on "{batch_target}"')
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _target_lock(self, target: Target) -> threading.RLock:
+        with self._lock:
+            lock = self._target_locks.get(target, None)
+            if lock is None:
+                lock = self._target_locks[target] = threading.RLock()
+            return lock
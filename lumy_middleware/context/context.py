@@ -119,6 +119,34 @@ class AppContext(ABC):
         '''
         ...
 
+    def get_step_input_value_id(
+        self,
+        step_id: str,
+        input_id: str
+    ) -> Optional[str]:
+        '''
+        Return ID of the current value of a step input. The ID changes
+        every time the value returned by `get_step_input_value` changes.
+
+        `None` is returned if the value cannot be identified. Such values
+        are not cached.
+        '''
+        return None
+
+    def get_step_output_value_id(
+        self,
+        step_id: str,
+        output_id: str
+    ) -> Optional[str]:
+        '''
+        Return ID of the current value of a step output. The ID changes
+        every time the value returned by `get_step_output_value` changes.
+
+        `None` is returned if the value cannot be identified. Such values
+        are not cached.
+        '''
+        return None
+
     @abstractmethod
     def update_step_input_values(
         self,
@@ -1,4 +1,5 @@
 import logging
+import threading
 from collections import defaultdict
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -11,11 +12,13 @@ from lumy_middleware.context.kiara.data_transformation import (
     get_reverse_transformation_method, get_transformation_method,
     transform_value)
 from lumy_middleware.context.kiara.dataregistry import KiaraDataRegistry
+from lumy_middleware.context.kiara.table_utils import invalidate_table_views
 from lumy_middleware.context.kiara.util.data import get_value_data
 from lumy_middleware.types.generated import (
-    DataTabularDataFilter, LumyWorkflow, Metadata,
-    MsgWorkflowLumyWorkflowLoadProgress,
+    DataTabularDataFilter, DataTransformationDescriptor, LumyWorkflow,
+    Metadata, MsgWorkflowLumyWorkflowLoadProgress,
     MsgWorkflowLumyWorkflowLoadProgressStatus, State, TypeEnum)
+from lumy_middleware.utils.codec import CODECS
 from lumy_middleware.utils.extensions import reset_cache, reset_kiara_cache
 from lumy_middleware.utils.lumy import load_lumy_workflow_from_file
 from lumy_middleware.utils.workflow import install_dependencies
@@ -38,6 +41,19 @@ def is_default_value_acceptable(value: Value) -> bool:
         value.value_schema.default != SpecialValue.NOT_SET
 
 
+def get_value_id(
+    value: Value,
+    transformation: Optional[DataTransformationDescriptor]
+) -> str:
+    '''
+    Returns ID of a value as it is seen by the page: the same value
+    transformed with different pipelines is a different value.
+    '''
+    if transformation is None:
+        return value.id
+    return f'{value.id}:{transformation.pipeline.name}'
+
+
 def get_pipeline_input_id(ids: List[str]) -> Optional[str]:
     for id in ids:
         parts = id.split('.')
@@ -94,8 +110,22 @@ class KiaraAppContext(AppContext, PipelineController):
     _data_registry: DataRegistry = KiaraDataRegistry(_kiara)
     # kiara workflow step Id -> mappings
     _reverse_io_mappings: Dict[str, ReverseIoMappings]
-    _is_running = False
-    _is_loading_workflow = False
+    # Held while a workflow is being loaded. Workflows requested
+    # at the same time are loaded one after another.
+    _loading_lock: threading.Lock
+    # Held while the pipeline is being processed. Processing requested
+    # while the pipeline is being processed waits for it. Reentrant:
+    # processing a step may process the pipeline on the same thread.
+    _processing_lock: threading.RLock
+    # Number of `run_processing` calls in progress. Processing a step
+    # triggers processing of the steps that depend on it.
+    _processing_depth: int = 0
+
+    def __init__(self, *args, **kwargs):
+        self._loading_lock = threading.Lock()
+        self._processing_lock = threading.RLock()
+        self._processing_depth_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
 
     def load_workflow(
         self,
@@ -105,18 +135,11 @@ class KiaraAppContext(AppContext, PipelineController):
         '''
         AppContext
         '''
-        try:
-            if self._is_loading_workflow:
-                msg = 'Another workflow is being loaded.'
-                yield MsgWorkflowLumyWorkflowLoadProgress(
-                    status=MsgWorkflowLumyWorkflowLoadProgressStatus
-                    .NOT_LOADED,
-                    type=TypeEnum.ERROR,
-                    message=msg
-                )
-                raise Exception(msg)
+        if not self._loading_lock.acquire(blocking=False):
+            logger.debug('Waiting for another workflow to be loaded.')
+            self._loading_lock.acquire()
 
-            self._is_loading_workflow = True
+        try:
             if isinstance(workflow_path_or_content, Path):
                 workflow_path_or_content = load_lumy_workflow_from_file(
                     workflow_path_or_content)
@@ -171,6 +194,7 @@ class KiaraAppContext(AppContext, PipelineController):
                 # been installed
                 reset_cache()
                 reset_kiara_cache(self._kiara)
+                CODECS.reset_plugins()
 
             self._kiara_workflow = self._kiara.create_workflow(
                 kiara_workflow_name,
@@ -194,10 +218,12 @@ class KiaraAppContext(AppContext, PipelineController):
                     # raises an exception. Can we ignore it?
                     pass
 
-            self._workflow = workflow_path_or_content
-            self._workflow_metadata = workflow_metadata
+            # Mappings are set first: handlers running concurrently
+            # check the workflow before using the mappings.
             self._reverse_io_mappings = build_reverse_io_mappings(
-                self._workflow)
+                workflow_path_or_content)
+            self._workflow_metadata = workflow_metadata
+            self._workflow = workflow_path_or_content
 
             yield MsgWorkflowLumyWorkflowLoadProgress(
                 status=MsgWorkflowLumyWorkflowLoadProgressStatus.LOADING,
@@ -230,7 +256,7 @@ class KiaraAppContext(AppContext, PipelineController):
             )
             raise e
         finally:
-            self._is_loading_workflow = False
+            self._loading_lock.release()
 
     @property
     def current_workflow(self) -> Optional[LumyWorkflow]:
@@ -252,73 +278,93 @@ class KiaraAppContext(AppContext, PipelineController):
         '''
         Returns value transformed according to the rules.
         '''
-        if self._workflow is None:
-            return (None, None)
+        return self._get_step_io_value(step_id, input_id, True, filter)
 
-        workflow_step_id, workflow_input_id = \
-            self._get_workflow_input_id_for_page(
-                step_id, input_id) or (None, None)
-        if workflow_step_id is None or workflow_input_id is None:
-            return (None, None)
+    def get_step_output_value(
+        self,
+        step_id: str,  # a page ID
+        output_id: str,  # a page output ID
+        filter: Optional[DataTabularDataFilter] = None
+    ) -> Tuple[Any, Any]:
+        return self._get_step_io_value(step_id, output_id, False, filter)
 
-        inputs = self.get_current_pipeline_state(
-        ).step_inputs[workflow_step_id]
-        if inputs is None:
-            return (None, None)
+    def get_step_input_value_id(
+        self,
+        step_id: str,  # a page ID
+        input_id: str  # a page input ID
+    ) -> Optional[str]:
+        item = self._get_step_io_value_obj(step_id, input_id, True)
+        return get_value_id(*item) if item is not None else None
+
+    def get_step_output_value_id(
+        self,
+        step_id: str,  # a page ID
+        output_id: str  # a page output ID
+    ) -> Optional[str]:
+        item = self._get_step_io_value_obj(step_id, output_id, False)
+        return get_value_id(*item) if item is not None else None
 
-        if workflow_input_id not in inputs.values:
+    def _get_step_io_value(
+        self,
+        step_id: str,  # a page ID
+        io_id: str,  # a page input or output ID
+        is_input: bool,
+        filter: Optional[DataTabularDataFilter] = None
+    ) -> Tuple[Any, Any]:
+        item = self._get_step_io_value_obj(step_id, io_id, is_input)
+        if item is None:
             return (None, None)
 
-        value = self.get_step_input(workflow_step_id, workflow_input_id)
-        transformation_descriptor = get_transformation_method(
-            self._workflow,
-            step_id,
-            input_id,
-            is_input=True,
-            value=value
-        )
+        value, transformation_descriptor = item
         if transformation_descriptor is not None:
             value = transform_value(
                 self._kiara, value, transformation_descriptor)
 
-        return get_value_data(value, filter)
+        return get_value_data(
+            value, filter,
+            value_id=get_value_id(*item),
+            tag=('input' if is_input else 'output', step_id, io_id))
 
-    def get_step_output_value(
+    def _get_step_io_value_obj(
         self,
         step_id: str,  # a page ID
-        output_id: str,  # a page output ID
-        filter: Optional[DataTabularDataFilter] = None
-    ) -> Tuple[Any, Any]:
+        io_id: str,  # a page input or output ID
+        is_input: bool
+    ) -> Optional[Tuple[Value, Optional[DataTransformationDescriptor]]]:
+        '''
+        Returns workflow value mapped to a page input or output and
+        the transformation that needs to be applied to the value
+        before it is returned to the page.
+        '''
         if self._workflow is None:
-            return (None, None)
+            return None
 
-        workflow_step_id, workflow_output_id = \
-            self._get_workflow_output_id_for_page(
-                step_id, output_id) or (None, None)
-        if workflow_step_id is None or workflow_output_id is None:
-            return (None, None)
+        workflow_step_id, workflow_io_id = \
+            self._get_workflow_io_id_for_page(
+                step_id, io_id, is_input) or (None, None)
+        if workflow_step_id is None or workflow_io_id is None:
+            return None
 
-        outputs = self.get_current_pipeline_state(
-        ).step_outputs[workflow_step_id]
-        if outputs is None:
-            return (None, None)
+        state = self.get_current_pipeline_state()
+        values = state.step_inputs[workflow_step_id] if is_input \
+            else state.step_outputs[workflow_step_id]
+        if values is None:
+            return None
 
-        if workflow_output_id not in outputs.values:
-            return (None, None)
+        if workflow_io_id not in values.values:
+            return None
 
-        value = self.get_step_output(workflow_step_id, workflow_output_id)
+        value = self.get_step_input(workflow_step_id, workflow_io_id) \
+            if is_input \
+            else self.get_step_output(workflow_step_id, workflow_io_id)
         transformation_descriptor = get_transformation_method(
             self._workflow,
             step_id,
-            output_id,
-            is_input=False,
+            io_id,
+            is_input=is_input,
             value=value
         )
-        if transformation_descriptor is not None:
-            value = transform_value(
-                self._kiara, value, transformation_descriptor)
-
-        return get_value_data(value, filter)
+        return (value, transformation_descriptor)
 
     def update_step_input_values(
         self,
@@ -361,8 +407,12 @@ class KiaraAppContext(AppContext, PipelineController):
         self._kiara_workflow.inputs.set_values(**updated_values)
 
     def run_processing(self, step_id: Optional[str] = None):
+        # BUSY and IDLE are only published around the outermost run
+        with self._processing_depth_lock:
+            self._processing_depth += 1
+            if self._processing_depth == 1:
+                self.processing_state_changed.publish(State.BUSY)
         try:
-            self.processing_state_changed.publish(State.BUSY)
             if step_id is not None:
                 # only process step if all items are valid
                 # NOTE: This check is done in kiara, but it raises a generic
@@ -372,7 +422,10 @@ class KiaraAppContext(AppContext, PipelineController):
             else:
                 self._process_pipeline(self.processing_stages[0] or [])
         finally:
-            self.processing_state_changed.publish(State.IDLE)
+            with self._processing_depth_lock:
+                self._processing_depth -= 1
+                if self._processing_depth == 0:
+                    self.processing_state_changed.publish(State.IDLE)
 
     def set_default_values(self):
         inputs = self.get_current_pipeline_state() \
@@ -404,6 +457,8 @@ class KiaraAppContext(AppContext, PipelineController):
                     page_id_to_input_ids[page_id].append(page_input_id)
 
         for page_id, input_ids in page_id_to_input_ids.items():
+            for input_id in input_ids:
+                invalidate_table_views(('input', page_id, input_id))
             msg = UpdatedIO(step_id=page_id, io_ids=input_ids)
             self.step_input_values_updated.publish(msg)
 
@@ -412,9 +467,6 @@ class KiaraAppContext(AppContext, PipelineController):
         PipelineController
         '''
 
-        if self.pipeline_is_finished():
-            self._is_running = False
-
         page_id_to_output_ids: Dict[str, List[str]] = defaultdict(list)
 
         for step_id, output_ids in event.updated_step_outputs.items():
@@ -425,20 +477,19 @@ class KiaraAppContext(AppContext, PipelineController):
                     page_id_to_output_ids[page_id].append(page_output_id)
 
         for page_id, output_ids in page_id_to_output_ids.items():
+            for output_id in output_ids:
+                invalidate_table_views(('output', page_id, output_id))
             msg = UpdatedIO(step_id=page_id, io_ids=output_ids)
             self.step_output_values_updated.publish(msg)
 
     def _process_pipeline(self, steps_ids: List[str]):
-        if self._is_running:
-            logger.warn(
-                "Pipeline running, not starting pipeline processing now.")
-            raise Exception("Pipeline already running.")
-
-        if len(steps_ids) == 0:
-            return
+        if not self._processing_lock.acquire(blocking=False):
+            logger.debug('Waiting for pipeline processing to finish.')
+            self._processing_lock.acquire()
 
-        self._is_running = True
         try:
+            if len(steps_ids) == 0:
+                return
             job_ids = [
                 self.process_step(step_id)
                 for step_id in steps_ids
@@ -449,7 +500,7 @@ class KiaraAppContext(AppContext, PipelineController):
         except Exception:
             logger.exception('Unexpected error while processing steps')
         finally:
-            self._is_running = False
+            self._processing_lock.release()
 
     @property
     def data_registry(self) -> DataRegistry:
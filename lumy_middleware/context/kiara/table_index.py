@@ -0,0 +1,301 @@
+'''
+Secondary indexes of table columns.
+
+Indexes are built lazily: a column of a table is scanned by the filter
+kernels until it has been scanned `INDEX_BUILD_SCANS` times for the same
+kind of filter item, then an index is built and used for next filters.
+Indexes are attached to the table ID (the value ID) and kept in an LRU
+cache until the value changes.
+
+* `SortedIndex` - `equals`, `in`, range comparisons and `startsWith`.
+* `TrigramIndex` - `contains` and `containsIgnoreCase`.
+
+Indexes return boolean masks of matching rows. Rows with null values
+never match.
+'''
+import bisect
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import (Any, Callable, Dict, Hashable, List, Optional, Sequence,
+                    Union)
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from lumy_middleware.utils.cache import LRUCache, SingleFlight
+from lumy_middleware.utils.cancellation import check_cancelled
+from pyarrow import ChunkedArray
+
+# Number of scans of a column with the same kind of filter item
+# after which an index of the column is built. Indexes are not built if 0.
+INDEX_BUILD_SCANS = int(os.environ.get('LUMY_INDEX_BUILD_SCANS', 2))
+# Max size of indexes kept in cache (bytes)
+INDEX_CACHE_SIZE = int(
+    os.environ.get('LUMY_INDEX_CACHE_SIZE', 256 * 1024 * 1024))
+
+Column = Union[pa.Array, ChunkedArray]
+
+SORTED = 'sorted'
+TRIGRAM = 'trigram'
+
+
+def _combine(column: Column) -> pa.Array:
+    if isinstance(column, ChunkedArray):
+        column = column.combine_chunks()
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    return column
+
+
+def _is_nan(value: Any) -> bool:
+    return value != value
+
+
+class _Values(Sequence):
+    # python values of an arrow array for `bisect`
+    def __init__(self, array: pa.Array):
+        self._array = array
+
+    def __getitem__(self, idx):
+        return self._array[idx].as_py()
+
+    def __len__(self):
+        return len(self._array)
+
+
+class SortedIndex:
+    '''
+    Row numbers of a column ordered by value. Rows equal to values,
+    in a range of values or with a prefix are found with a binary search.
+    '''
+
+    def __init__(self, column: Column):
+        array = _combine(column)
+        order = pc.array_sort_indices(array, null_placement='at_end')
+        # NaNs are ordered after other values and before nulls
+        valid_count = len(array) - array.null_count
+        if pa.types.is_floating(array.type):
+            valid_count -= pc.sum(pc.is_nan(array)).as_py() or 0
+        self.values = array.take(order).slice(0, valid_count)
+        self.order: np.ndarray = order.to_numpy()
+        self.null_count = array.null_count
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.order.nbytes
+
+    def is_in(self, values: List[Any], match_nulls: bool) -> np.ndarray:
+        '''
+        Rows with one of the values. Rows with null values match if
+        `match_nulls` is set and there is a null among the values.
+        '''
+        sorted_values = _Values(self.values)
+        mask = np.zeros(len(self.order), dtype=bool)
+        for value in values:
+            if value is None:
+                if match_nulls and self.null_count > 0:
+                    mask[self.order[-self.null_count:]] = True
+            elif not _is_nan(value):
+                start = bisect.bisect_left(sorted_values, value)
+                end = bisect.bisect_right(sorted_values, value, lo=start)
+                mask[self.order[start:end]] = True
+        return mask
+
+    def range(self,
+              lower: Any = None,
+              lower_inclusive: bool = True,
+              upper: Any = None,
+              upper_inclusive: bool = True) -> np.ndarray:
+        '''
+        Rows with values between the bounds. No rows match a NaN bound.
+        '''
+        values = _Values(self.values)
+        start, end = 0, len(values)
+        if _is_nan(lower) or _is_nan(upper):
+            start = end
+        if lower is not None and start < end:
+            start = bisect.bisect_left(values, lower) if lower_inclusive \
+                else bisect.bisect_right(values, lower)
+        if upper is not None and start < end:
+            end = bisect.bisect_right(values, upper) if upper_inclusive \
+                else bisect.bisect_left(values, upper)
+        return self._rows_mask(start, max(start, end))
+
+    def prefix(self, prefix: str) -> np.ndarray:
+        '''
+        Rows starting with `prefix`. The index must be of a string column.
+        '''
+        values = _Values(self.values)
+        start = bisect.bisect_left(values, prefix)
+        # values with the prefix follow the first value not less than it
+        lo, hi = start, len(values)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if values[mid].startswith(prefix):
+                lo = mid + 1
+            else:
+                hi = mid
+        return self._rows_mask(start, lo)
+
+    def _rows_mask(self, start: int, end: int) -> np.ndarray:
+        mask = np.zeros(len(self.order), dtype=bool)
+        mask[self.order[start:end]] = True
+        return mask
+
+
+def _trigrams(value: str) -> List[str]:
+    return list({value[idx:idx + 3] for idx in range(len(value) - 2)})
+
+
+class TrigramIndex:
+    '''
+    Distinct values of a string column and trigrams of their lower case
+    versions. Values containing a substring are looked up among values
+    that have all trigrams of the substring and then checked with the
+    substring kernel.
+
+    Only ASCII values are split into trigrams (case insensitive matching of
+    other characters is not a simple mapping), values with other characters
+    are always checked with the kernel. So are all values if the
+    substring is not ASCII or is shorter than a trigram.
+    '''
+
+    def __init__(self, column: Column):
+        encoded = pc.dictionary_encode(_combine(column))
+        self.dictionary: pa.Array = encoded.dictionary
+        # null values have the code of the last (always false) entry
+        # of the lookup table of matching codes
+        self.codes: np.ndarray = pc.fill_null(
+            encoded.indices, len(self.dictionary)).to_numpy()
+
+        is_ascii = pc.string_is_ascii(self.dictionary)
+        self.non_ascii_codes: np.ndarray = pc.indices_nonzero(
+            pc.invert(is_ascii)).to_numpy().astype(np.int32)
+        ascii_codes = pc.indices_nonzero(is_ascii).to_numpy().astype(np.int32)
+        values = pc.ascii_lower(self.dictionary.take(pa.array(ascii_codes)))
+        lengths = pc.utf8_length(values).to_numpy()
+
+        # (trigram, code) of all trigrams of all values
+        trigrams, trigrams_codes = [], []
+        for start in range(int(lengths.max(initial=0)) - 2):
+            idx = np.flatnonzero(lengths >= start + 3)
+            trigrams.append(pc.utf8_slice_codeunits(
+                values.take(pa.array(idx)), start, start + 3))
+            trigrams_codes.append(ascii_codes[idx])
+            check_cancelled()
+        encoded_trigrams = pc.dictionary_encode(
+            pa.chunked_array(trigrams, pa.string())).combine_chunks()
+
+        # codes of values grouped by trigram, sorted and unique
+        keys = np.sort(
+            encoded_trigrams.indices.to_numpy().astype(np.int64)
+            * len(self.dictionary)
+            + np.concatenate(trigrams_codes + [np.array([], np.int32)]))
+        is_first = np.empty(len(keys), dtype=bool)
+        is_first[:1] = True
+        np.not_equal(keys[1:], keys[:-1], out=is_first[1:])
+        keys = keys[is_first]
+        trigrams_ids = keys // max(len(self.dictionary), 1)
+        self.postings: np.ndarray = \
+            (keys % max(len(self.dictionary), 1)).astype(np.int32)
+        self.offsets: np.ndarray = np.searchsorted(
+            trigrams_ids, np.arange(len(encoded_trigrams.dictionary) + 1))
+        self.trigrams: Dict[str, int] = {
+            trigram: idx
+            for idx, trigram in enumerate(
+                encoded_trigrams.dictionary.to_pylist())
+        }
+
+    @property
+    def nbytes(self) -> int:
+        # with a rough estimate of the size of a trigram dict entry
+        return self.dictionary.nbytes + self.codes.nbytes \
+            + self.non_ascii_codes.nbytes + self.postings.nbytes \
+            + self.offsets.nbytes + 100 * len(self.trigrams)
+
+    def contains(self, substring: str, ignore_case: bool) -> np.ndarray:
+        candidates = self._candidates(substring)
+        matches = pc.match_substring(
+            self.dictionary.take(pa.array(candidates)),
+            substring, ignore_case=ignore_case)
+        matching_codes = candidates[matches.to_numpy(zero_copy_only=False)]
+
+        lookup = np.zeros(len(self.dictionary) + 1, dtype=bool)
+        lookup[matching_codes] = True
+        return lookup[self.codes]
+
+    def _candidates(self, substring: str) -> np.ndarray:
+        trigrams = _trigrams(substring.lower()) if substring.isascii() \
+            else []
+        if len(trigrams) == 0:
+            return np.arange(len(self.dictionary), dtype=np.int32)
+
+        candidates: Optional[np.ndarray] = None
+        for trigram in trigrams:
+            idx = self.trigrams.get(trigram, None)
+            if idx is None:
+                candidates = np.array([], dtype=np.int32)
+                break
+            codes = self.postings[self.offsets[idx]:self.offsets[idx + 1]]
+            candidates = codes if candidates is None \
+                else np.intersect1d(candidates, codes, assume_unique=True)
+        return np.union1d(candidates, self.non_ascii_codes)
+
+
+Index = Union[SortedIndex, TrigramIndex]
+
+INDEX_TYPES: Dict[str, Callable[[Column], Index]] = {
+    SORTED: SortedIndex,
+    TRIGRAM: TrigramIndex,
+}
+
+# Indexes by table ID, column and kind of index.
+# Entries are tagged by the caller, i.e. with the step input or output
+# the table comes from.
+_index_cache: LRUCache[tuple, Index] = \
+    LRUCache(INDEX_CACHE_SIZE, name='table_index')
+_index_builds: SingleFlight[tuple, Index] = SingleFlight()
+# tag -> number of scans by table ID, column and kind of index
+_scans: Dict[Hashable, Counter] = defaultdict(Counter)
+_scans_lock = threading.Lock()
+
+
+def get_index(kind: str,
+              table_id: Hashable,
+              column_name: str,
+              column: Column,
+              tag: Hashable = None) -> Optional[Index]:
+    '''
+    Returns index of the column or `None` if it has not been built yet.
+    Every call without an index counts as a scan of the column: the index
+    is built when the column has been scanned often enough.
+    '''
+    key = (table_id, column_name, kind)
+    index = _index_cache.get(key)
+    if index is not None or INDEX_BUILD_SCANS <= 0:
+        return index
+
+    with _scans_lock:
+        _scans[tag][key] += 1
+        if _scans[tag][key] <= INDEX_BUILD_SCANS:
+            return None
+
+    def build() -> Index:
+        index = INDEX_TYPES[kind](column)
+        _index_cache.put(key, index, index.nbytes, tag)
+        # an evicted index is built again after as many scans
+        with _scans_lock:
+            _scans[tag].pop(key, None)
+        return index
+
+    return _index_builds.do(key, build)
+
+
+def invalidate_indexes(tag: Hashable) -> None:
+    '''
+    Forget indexes of tables with tag `tag`.
+    '''
+    _index_cache.invalidate(tag)
+    with _scans_lock:
+        _scans.pop(tag, None)
@@ -0,0 +1,221 @@
+'''
+Stats of table columns: number of nulls, min and max values, approximate
+number of distinct values (HyperLogLog) and histograms of numeric columns.
+
+Stats are computed chunk by chunk with vectorized Arrow and numpy kernels.
+'''
+import datetime
+import decimal
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from lumy_middleware.types.generated import ColumnHistogram, ColumnStats
+from lumy_middleware.utils.cancellation import check_cancelled
+from pyarrow import Table
+
+# Number of bins of histograms of numeric columns
+HISTOGRAM_BINS = int(os.environ.get('LUMY_HISTOGRAM_BINS', 10))
+# Number of bits of a hash that select a HyperLogLog register.
+# 2^12 registers estimate distinct counts with ~1.6% standard error.
+HLL_PRECISION = 12
+
+_UINT64_MAX = np.uint64(0xffffffffffffffff)
+
+
+def _mix(hashes: np.ndarray) -> np.ndarray:
+    '''
+    SplitMix64 finalizer: spreads bits of 64 bit integers
+    over the whole range.
+    '''
+    hashes = hashes ^ (hashes >> np.uint64(30))
+    hashes = hashes * np.uint64(0xbf58476d1ce4e5b9)
+    hashes = hashes ^ (hashes >> np.uint64(27))
+    hashes = hashes * np.uint64(0x94d049bb133111eb)
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+def _binary_hashes(array: pa.Array) -> np.ndarray:
+    '''
+    Hashes of values of a string or binary array without nulls.
+    Values are hashed 8 bytes at a time.
+    '''
+    offsets_type = np.int64 if pa.types.is_large_string(array.type) \
+        or pa.types.is_large_binary(array.type) else np.int32
+    _, offsets_buffer, data_buffer = array.buffers()
+    offsets = np.frombuffer(offsets_buffer, dtype=offsets_type)[
+        array.offset:array.offset + len(array) + 1].astype(np.int64)
+    data = np.frombuffer(data_buffer, dtype=np.uint8) \
+        if data_buffer is not None else np.zeros(0, dtype=np.uint8)
+    # 8 byte little endian words starting at every byte of the data
+    padded = np.concatenate([data, np.zeros(8, dtype=np.uint8)])
+    words = np.ndarray(shape=(len(data) + 1,), dtype='<u8',
+                       buffer=padded, strides=(1,))
+
+    starts = offsets[:-1]
+    lengths = np.diff(offsets)
+    hashes = _mix(lengths.astype(np.uint64))
+    for position in range(0, int(lengths.max(initial=0)), 8):
+        idx = np.flatnonzero(lengths > position)
+        remaining = np.minimum(lengths[idx] - position, 8).astype(np.uint64)
+        # bytes of the next values are masked out
+        mask = _UINT64_MAX >> ((np.uint64(8) - remaining) * np.uint64(8))
+        hashes[idx] = _mix(
+            hashes[idx] ^ (words[starts[idx] + position] & mask))
+    return hashes
+
+
+def _hashes(array: pa.Array) -> Optional[np.ndarray]:
+    '''
+    64 bit hashes of non-null values of the array or `None`
+    if values of its type are not hashed.
+    '''
+    array = array.drop_null()
+    data_type = array.type
+    if pa.types.is_string(data_type) or pa.types.is_large_string(data_type) \
+            or pa.types.is_binary(data_type) \
+            or pa.types.is_large_binary(data_type):
+        return _binary_hashes(array)
+    if pa.types.is_floating(data_type):
+        # -0.0 and 0.0 are the same value
+        values = array.to_numpy(zero_copy_only=False).astype(np.float64)
+        return _mix((values + 0.0).view(np.uint64))
+    if pa.types.is_integer(data_type) or pa.types.is_boolean(data_type):
+        return _mix(
+            array.to_numpy(zero_copy_only=False).astype(np.int64)
+            .view(np.uint64))
+    if pa.types.is_temporal(data_type) and data_type.bit_width in (32, 64):
+        integer_type = pa.int64() if data_type.bit_width == 64 \
+            else pa.int32()
+        return _mix(
+            array.view(integer_type).to_numpy().astype(np.int64)
+            .view(np.uint64))
+    return None
+
+
+class HyperLogLog:
+    '''
+    HyperLogLog sketch estimating the number of distinct values.
+    '''
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self._precision = precision
+        self._registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray) -> None:
+        '''
+        Add 64 bit hashes of values.
+        '''
+        precision = np.uint64(self._precision)
+        registers = (hashes >> (np.uint64(64) - precision)).astype(np.intp)
+        # rank: position of the leftmost 1 bit in the rest of the hash.
+        # The guard bit limits it to 64 - precision + 1.
+        rest = (hashes << precision) \
+            | (np.uint64(1) << (precision - np.uint64(1)))
+        _, exponents = np.frexp(rest.astype(np.float64))
+        ranks = (65 - exponents).astype(np.uint8)
+        np.maximum.at(self._registers, registers, ranks)
+
+    def count(self) -> int:
+        m = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(
+            np.exp2(-self._registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self._registers == 0))
+        if estimate <= 2.5 * m and zeros > 0:
+            # linear counting is more accurate for small counts
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+def _as_json_value(value: Any) -> Any:
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, datetime.timedelta)):
+        return str(value)
+    if isinstance(value, bytes):
+        return None
+    if isinstance(value, float) and not np.isfinite(value):
+        # not representable in JSON
+        return None
+    return value
+
+
+def _is_numeric(data_type: pa.DataType) -> bool:
+    return pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+
+
+def _histogram(column: pa.ChunkedArray,
+               min_value: Any,
+               max_value: Any,
+               bins: int) -> Optional[ColumnHistogram]:
+    if min_value is None or max_value is None \
+            or not np.isfinite([min_value, max_value]).all():
+        return None
+    edges = np.linspace(float(min_value), float(max_value), bins + 1)
+    if not (np.diff(edges) > 0).all():
+        # the range cannot be split in float64 (i.e. a single value or
+        # large integers close to each other): one bin holds all values
+        edges = np.array([float(min_value), float(max_value)])
+    counts = np.zeros(len(edges) - 1, dtype=np.int64)
+    for chunk in column.chunks:
+        values = chunk.drop_null().to_numpy(zero_copy_only=False) \
+            .astype(np.float64)
+        values = values[~np.isnan(values)]
+        if edges[0] == edges[-1]:
+            counts[0] += len(values)
+        else:
+            counts += np.histogram(values, bins=edges)[0]
+    return ColumnHistogram(counts=counts.tolist(), edges=edges.tolist())
+
+
+def column_stats(column: pa.ChunkedArray,
+                 bins: int = HISTOGRAM_BINS) -> ColumnStats:
+    '''
+    Stats of a table column.
+    '''
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+
+    distinct_count: Optional[int] = None
+    sketch = HyperLogLog()
+    for chunk in column.chunks:
+        hashes = _hashes(chunk)
+        if hashes is None:
+            break
+        sketch.add(hashes)
+    else:
+        distinct_count = sketch.count()
+
+    min_value = max_value = None
+    try:
+        min_max = pc.min_max(column)
+        min_value = min_max['min'].as_py()
+        max_value = min_max['max'].as_py()
+    except (pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        # values are not ordered
+        pass
+
+    histogram = _histogram(column, min_value, max_value, bins) \
+        if _is_numeric(column.type) else None
+    return ColumnStats(
+        null_count=column.null_count,
+        distinct_count=distinct_count,
+        histogram=histogram,
+        min=_as_json_value(min_value),
+        max=_as_json_value(max_value)
+    )
+
+
+def table_stats(table: Table,
+                bins: int = HISTOGRAM_BINS) -> Dict[str, ColumnStats]:
+    '''
+    Stats of columns of a table by column name.
+    '''
+    stats: Dict[str, ColumnStats] = {}
+    for name, column in zip(table.column_names, table.columns):
+        check_cancelled()
+        stats[name] = column_stats(column, bins)
+    return stats
@@ -1,24 +1,230 @@
-from typing import List, Optional
+import os
+from typing import (Any, Callable, Dict, Hashable, List, Optional, Tuple,
+                    Union, cast)
 
+import numpy as np
+import pyarrow as pa
 import pyarrow.compute as pc
-from lumy_middleware.types.generated import (DataTabularDataFilter,
+from lumy_middleware.context.kiara.table_index import (SORTED, TRIGRAM,
+                                                       Index, get_index,
+                                                       invalidate_indexes)
+from lumy_middleware.context.kiara.table_stats import table_stats
+from lumy_middleware.types.generated import (ColumnStats,
+                                             DataTabularDataFilter,
                                              DataTabularDataFilterCondition,
                                              DataTabularDataFilterItem,
                                              DataTabularDataSortingMethod,
-                                             Direction)
-from pyarrow import Table
+                                             Direction, NullPlacement,
+                                             Operator)
+from lumy_middleware.utils.cache import LRUCache, canonical_hash
+from lumy_middleware.utils.cancellation import check_cancelled
+from lumy_middleware.utils.dataclasses import to_dict
+from pyarrow import ChunkedArray, Table
 
+# Sorting of at most this fraction of rows of a table selects the first
+# rows with a top-k kernel instead of sorting the whole table.
+TOP_K_MAX_FRACTION = 0.25
 
-def row_matches(
+# Max size of cached row indices of filtered and sorted tables (bytes)
+ROW_INDICES_CACHE_SIZE = int(
+    os.environ.get('LUMY_ROW_INDICES_CACHE_SIZE', 64 * 1024 * 1024))
+# Estimated size of cached stats of a column (bytes)
+_STATS_SIZE = 1024
+
+Column = Union[pa.Array, ChunkedArray]
+# Builds a boolean mask of a column from the value of a filter item
+ItemMask = Callable[[Column, Any], Column]
+# Finds rows of a column matching the value of a filter item in an index
+IndexLookup = Callable[[Index, Column, Any], np.ndarray]
+
+
+def _value_type(column: Column) -> pa.DataType:
+    if pa.types.is_dictionary(column.type):
+        return column.type.value_type
+    return column.type
+
+
+def _as_string(column: Column) -> Column:
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    if pa.types.is_string(column.type) \
+            or pa.types.is_large_string(column.type):
+        return column
+    return column.cast(pa.string())
+
+
+def _as_column_type(column: Column, value: Any) -> pa.Scalar:
+    value_type = _value_type(column)
+    try:
+        return pa.scalar(value).cast(value_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise ValueError(
+            f'Value "{value}" cannot be compared with values '
+            f'of type "{value_type}"') from e
+
+
+def _as_value_set(column: Column, value: Any) -> pa.Array:
+    values = value if isinstance(value, list) else [value]
+    return pa.array(values).cast(_value_type(column))
+
+
+def _is_in(column: Column, value: Any) -> Column:
+    return pc.is_in(column, value_set=_as_value_set(column, value))
+
+
+def _comparison(compare: Callable[[Column, Any], Column]) -> ItemMask:
+    return lambda column, value: compare(
+        column, _as_column_type(column, value))
+
+
+# Filter operators by name. String operators work on string
+# representation of values of other types.
+OPERATORS: Dict[str, ItemMask] = {
+    'contains': lambda column, value: pc.match_substring(
+        _as_string(column), str(value)),
+    'containsIgnoreCase': lambda column, value: pc.match_substring(
+        _as_string(column), str(value), ignore_case=True),
+    'startsWith': lambda column, value: pc.starts_with(
+        _as_string(column), str(value)),
+    'endsWith': lambda column, value: pc.ends_with(
+        _as_string(column), str(value)),
+    'regex': lambda column, value: pc.match_substring_regex(
+        _as_string(column), str(value)),
+    'equals': _comparison(pc.equal),
+    'notEquals': _comparison(pc.not_equal),
+    'greaterThan': _comparison(pc.greater),
+    'greaterThanOrEqual': _comparison(pc.greater_equal),
+    'lessThan': _comparison(pc.less),
+    'lessThanOrEqual': _comparison(pc.less_equal),
+    'in': _is_in,
+    'isNull': lambda column, _: pc.is_null(column),
+    'isNotNull': lambda column, _: pc.is_valid(column),
+}
+
+OPERATOR_ALIASES = {
+    '=': 'equals',
+    '==': 'equals',
+    '!=': 'notEquals',
+    '>': 'greaterThan',
+    '>=': 'greaterThanOrEqual',
+    '<': 'lessThan',
+    '<=': 'lessThanOrEqual',
+}
+
+
+def _is_orderable(data_type: pa.DataType) -> bool:
+    return pa.types.is_integer(data_type) \
+        or pa.types.is_boolean(data_type) \
+        or pa.types.is_floating(data_type) \
+        or pa.types.is_string(data_type) \
+        or pa.types.is_large_string(data_type) \
+        or pa.types.is_date(data_type)
+
+
+def _is_string(data_type: pa.DataType) -> bool:
+    return pa.types.is_string(data_type) \
+        or pa.types.is_large_string(data_type)
+
+
+def _range_lookup(is_lower_bound: bool, inclusive: bool) -> IndexLookup:
+    def lookup(index: Index, column: Column, value: Any) -> np.ndarray:
+        bound = _as_column_type(column, value).as_py()
+        if bound is None:
+            # comparisons with null never match
+            return np.zeros(len(column), dtype=bool)
+        if is_lower_bound:
+            return index.range(lower=bound, lower_inclusive=inclusive)
+        return index.range(upper=bound, upper_inclusive=inclusive)
+    return lookup
+
+
+# Indexes used by filter operators: kind of the index, types of columns
+# the index is used for and the lookup of matching rows in the index.
+INDEX_LOOKUPS: Dict[str, Tuple[str,
+                               Callable[[pa.DataType], bool],
+                               IndexLookup]] = {
+    'equals': (SORTED, _is_orderable, lambda index, column, value: index.is_in(
+        [_as_column_type(column, value).as_py()], match_nulls=False)),
+    'in': (SORTED, _is_orderable, lambda index, column, value: index.is_in(
+        _as_value_set(column, value).to_pylist(), match_nulls=True)),
+    'greaterThan': (SORTED, _is_orderable, _range_lookup(True, False)),
+    'greaterThanOrEqual': (SORTED, _is_orderable, _range_lookup(True, True)),
+    'lessThan': (SORTED, _is_orderable, _range_lookup(False, False)),
+    'lessThanOrEqual': (SORTED, _is_orderable, _range_lookup(False, True)),
+    'startsWith': (SORTED, _is_string, lambda index, _, value: index.prefix(
+        str(value))),
+    'contains': (TRIGRAM, _is_string, lambda index, _, value: index.contains(
+        str(value), ignore_case=False)),
+    'containsIgnoreCase': (TRIGRAM, _is_string,
+                           lambda index, _, value: index.contains(
+                               str(value), ignore_case=True)),
+}
+
+
+def _index_mask(table: Table,
+                item: DataTabularDataFilterItem,
+                table_id: Hashable,
+                tag: Hashable) -> Optional[Column]:
+    '''
+    Boolean mask of rows of the table matching the filter item found in an
+    index of the column or `None` if the column has not been indexed.
+    '''
+    operator = OPERATOR_ALIASES.get(item.operator, item.operator)
+    lookup = INDEX_LOOKUPS.get(operator, None)
+    if lookup is None or item.column not in table.column_names:
+        return None
+    kind, is_indexed_type, find_rows = lookup
+    column = table.column(item.column)
+    if not is_indexed_type(_value_type(column)):
+        return None
+    index = get_index(kind, table_id, item.column, column, tag)
+    if index is None:
+        return None
+    return pa.array(find_rows(index, column, item.value))
+
+
+def item_mask(table: Table, item: DataTabularDataFilterItem) -> Column:
+    '''
+    Boolean mask of rows of the table matching the filter item.
+    '''
+    operator = OPERATOR_ALIASES.get(item.operator, item.operator)
+    mask_fn = OPERATORS.get(operator, None)
+    if mask_fn is None:
+        raise ValueError(f'Unsupported filter operator "{item.operator}"')
+    if item.column not in table.column_names:
+        raise ValueError(f'Column "{item.column}" not found')
+    return mask_fn(table.column(item.column), item.value)
+
+
+def condition_mask(
     table: Table,
-    idx: int,
-    filter_items: List[DataTabularDataFilterItem]
-) -> bool:
-    matches = [
-        str(item.value) in str(table[item.column][idx])
-        for item in filter_items
-    ]
-    return all(matches)
+    condition: Optional[DataTabularDataFilterCondition],
+    table_id: Optional[Hashable] = None,
+    tag: Hashable = None
+) -> Optional[Column]:
+    '''
+    Boolean mask of rows of the table matching the condition or `None`
+    if the condition matches all rows. Rows where the condition is null
+    (i.e. comparisons with null values) do not match.
+
+    If `table_id` is set, columns that are filtered repeatedly are
+    indexed (see `table_index`) and the indexes are used instead of
+    scanning the columns.
+    '''
+    if condition is None or len(condition.items) == 0:
+        return None
+
+    combine = pc.or_kleene if condition.operator == Operator.OR \
+        else pc.and_kleene
+    mask: Optional[Column] = None
+    for item in condition.items:
+        check_cancelled()
+        next_mask = _index_mask(table, item, table_id, tag) \
+            if table_id is not None else None
+        if next_mask is None:
+            next_mask = item_mask(table, item)
+        mask = next_mask if mask is None else combine(mask, next_mask)
+    return mask
 
 
 def filter_table(
@@ -26,50 +232,268 @@ def filter_table(
     condition: Optional[DataTabularDataFilterCondition]
 ) -> Table:
     '''
-    NOTE: This method is here while filtering workflow and data registry
-    are not ready in kiara. It only supports 'contains' filter for strings
-    for demonstration purposes.
+    Returns rows of the table matching the condition.
+    Filter items are evaluated with vectorized Arrow compute kernels
+    (see `OPERATORS`) and combined with the condition operator.
     '''
-    if condition is None:
+    mask = condition_mask(table, condition)
+    if mask is None:
         return table
+    return table.filter(mask)
 
-    filter_items = [
-        item
-        for item in condition.items
-        if item.operator == 'contains'
-    ]
 
-    if len(filter_items) == 0:
-        return table
+def get_sorting(
+    filter: Optional[DataTabularDataFilter]
+) -> List[DataTabularDataSortingMethod]:
+    '''
+    Sorting keys of the filter, in order of precedence.
+    '''
+    if filter is None:
+        return []
+    if filter.sorting_keys:
+        return filter.sorting_keys
+    return [filter.sorting] if filter.sorting is not None else []
 
-    mask = [
-        row_matches(table, idx, filter_items)
-        for idx in range(0, len(table))
-    ]
-    return pc.filter(table, mask)
+
+def _sort_keys_table(
+    table: Table,
+    sorting: List[DataTabularDataSortingMethod]
+) -> Tuple[Optional[Table], List[Tuple[str, str]]]:
+    '''
+    Returns a table of columns to sort by and the sort keys. Nulls are
+    placed first by sorting on a validity column before the value column.
+    '''
+    columns: Dict[str, Column] = {}
+    sort_keys: List[Tuple[str, str]] = []
+    for idx, method in enumerate(sorting):
+        if method.direction is None or method.direction == Direction.DEFAULT:
+            continue
+        if method.column not in table.column_names:
+            raise ValueError(f'Column "{method.column}" not found')
+        column = table.column(method.column)
+        if pa.types.is_dictionary(column.type):
+            # dictionary arrays cannot be sorted
+            column = column.cast(column.type.value_type)
+        if method.null_placement == NullPlacement.FIRST:
+            columns[f'valid_{idx}'] = pc.is_valid(column)
+            sort_keys.append((f'valid_{idx}', 'ascending'))
+        columns[f'key_{idx}'] = column
+        sort_keys.append((
+            f'key_{idx}',
+            'ascending' if method.direction == Direction.ASC
+            else 'descending'
+        ))
+    if len(sort_keys) == 0:
+        return None, sort_keys
+    return pa.table(columns), sort_keys
+
+
+def sort_indices(
+    table: Table,
+    sorting: List[DataTabularDataSortingMethod],
+    limit: Optional[int] = None
+) -> Optional[pa.Array]:
+    '''
+    Indices of rows of the sorted table or `None` if the table does not
+    need to be sorted. Sorting is stable.
+
+    If `limit` is set, only indices of the first `limit` rows are
+    returned. When they make up a small part of the table they are
+    selected with a top-k kernel instead of sorting the whole table.
+    '''
+    keys_table, sort_keys = _sort_keys_table(table, sorting)
+    if keys_table is None:
+        return None
+
+    check_cancelled()
+    if limit is not None and limit < table.num_rows * TOP_K_MAX_FRACTION:
+        # row number makes top-k selection deterministic and consistent
+        # with the stable sort across pages
+        keys_table = keys_table.append_column(
+            'row', pa.array(np.arange(table.num_rows)))
+        return pc.select_k_unstable(
+            keys_table, k=limit,
+            sort_keys=sort_keys + [('row', 'ascending')])
+    return pc.sort_indices(keys_table, sort_keys=sort_keys)
 
 
 def sort_table(
     table: Table,
-    sorting: Optional[DataTabularDataSortingMethod]
+    sorting: Union[None,
+                   DataTabularDataSortingMethod,
+                   List[DataTabularDataSortingMethod]],
+    limit: Optional[int] = None
 ) -> Table:
-    if sorting is None \
-        or sorting.direction == Direction.DEFAULT \
-            or sorting.direction is None:
+    '''
+    Sort the table. If `limit` is set, only the first `limit` rows of
+    the sorted table are guaranteed to be returned.
+    '''
+    if sorting is None:
         return table
-
-    sort_opts = (
-        sorting.column,
-        'ascending' if sorting.direction == Direction.ASC else 'descending'
-    )
-
-    indices = pc.sort_indices(
+    indices = sort_indices(
         table,
-        sort_keys=[sort_opts]
-    )
+        sorting if isinstance(sorting, list) else [sorting],
+        limit)
+    if indices is None:
+        return table
     return table.take(indices)
 
 
+# Row indices of table views (filtered and sorted tables) by table ID,
+# condition and sorting. Entries are tagged by the caller, i.e. with
+# the step input or output the table comes from.
+_row_indices_cache: LRUCache[Tuple, Tuple[Optional[pa.Array], bool]] = \
+    LRUCache(ROW_INDICES_CACHE_SIZE, name='row_indices')
+
+
+def invalidate_table_views(tag: Hashable) -> None:
+    '''
+    Forget cached row indices of views and indexes of tables
+    with tag `tag`.
+    '''
+    _row_indices_cache.invalidate(tag)
+    invalidate_indexes(tag)
+
+
+# Rows of a table matching a condition (`None` if all rows match)
+# and stats of their columns if they have been computed
+Selection = Tuple[Optional[pa.Array], Optional[Dict[str, ColumnStats]]]
+
+
+def _selection(
+    table: Table,
+    condition: Optional[DataTabularDataFilterCondition],
+    table_id: Optional[Hashable] = None,
+    tag: Hashable = None,
+    with_stats: bool = False
+) -> Selection:
+    mask = condition_mask(table, condition, table_id, tag)
+    if mask is None:
+        return None, table_stats(table) if with_stats else None
+    # stats are computed from the mask, while the filtered table is at hand
+    stats = table_stats(table.filter(mask)) if with_stats else None
+    return pc.indices_nonzero(mask), stats
+
+
+def _view_selection(
+    table: Table,
+    condition: Optional[DataTabularDataFilterCondition],
+    table_id: Optional[Hashable],
+    tag: Hashable,
+    with_stats: bool
+) -> Selection:
+    if table_id is None:
+        return _selection(table, condition, with_stats=with_stats)
+
+    key = ('selection', table_id, canonical_hash(condition))
+    cached_selection = _row_indices_cache.get(key)
+    if cached_selection is not None \
+            and (cached_selection[1] is not None or not with_stats):
+        return cached_selection
+
+    if cached_selection is None:
+        selection, stats = _selection(
+            table, condition, table_id, tag, with_stats)
+    else:
+        selection = cached_selection[0]
+        stats = table_stats(
+            table if selection is None else table.take(selection))
+    _row_indices_cache.put(
+        key,
+        (selection, stats),
+        _indices_size(selection) + _STATS_SIZE * len(stats or {}),
+        tag)
+    return selection, stats
+
+
+def _sorted_selection(
+    table: Table,
+    selection: Optional[pa.Array],
+    sorting: List[DataTabularDataSortingMethod],
+    limit: Optional[int]
+) -> Optional[pa.Array]:
+    # only sort columns of selected rows are taken
+    columns = [
+        column for column in table.column_names
+        if any(method.column == column for method in sorting)
+    ]
+    keys_table = table.select(columns)
+    if selection is not None:
+        keys_table = keys_table.take(selection)
+    indices = sort_indices(keys_table, sorting, limit)
+    if indices is None or selection is None:
+        return indices
+    return selection.take(indices)
+
+
+def view_indices(
+    table: Table,
+    condition: Optional[DataTabularDataFilterCondition],
+    sorting: List[DataTabularDataSortingMethod],
+    limit: Optional[int] = None,
+    table_id: Optional[Hashable] = None,
+    tag: Hashable = None
+) -> Tuple[Optional[pa.Array], int]:
+    '''
+    Returns indices of rows of the table that make up the table view
+    (rows matching the condition, sorted) and the number of rows in the
+    view. Indices are `None` if the view is the table itself.
+    If `limit` is set, only the first `limit` indices are guaranteed
+    to be returned.
+
+    If `table_id` is set, selected rows and sort permutations are cached,
+    so that next pages of the same view are taken without filtering or
+    sorting the table again. The first page of a view is sorted with a
+    top-k kernel, the whole view is sorted once when a later page is
+    requested.
+    '''
+    selection, _ = _view_selection(
+        table, condition, table_id, tag, with_stats=False)
+    rows_count = table.num_rows if selection is None else len(selection)
+    if table_id is None:
+        indices = _sorted_selection(table, selection, sorting, limit)
+        return (selection if indices is None else indices), rows_count
+
+    sorting_key = ('sorting', table_id, canonical_hash(condition),
+                   canonical_hash([to_dict(m) for m in sorting]))
+    cached_indices = _row_indices_cache.get(sorting_key)
+    if cached_indices is not None:
+        indices, is_complete = cached_indices
+        if is_complete or indices is None \
+                or (limit is not None and len(indices) >= limit):
+            return (selection if indices is None else indices), rows_count
+
+    # a page beyond the first one sorts the whole view
+    indices = _sorted_selection(
+        table, selection, sorting,
+        limit if cached_indices is None else None)
+    is_complete = indices is None or len(indices) == rows_count
+    _row_indices_cache.put(
+        sorting_key, (indices, is_complete), _indices_size(indices), tag)
+    return (selection if indices is None else indices), rows_count
+
+
+def view_stats(
+    table: Table,
+    condition: Optional[DataTabularDataFilterCondition],
+    table_id: Optional[Hashable] = None,
+    tag: Hashable = None
+) -> Dict[str, ColumnStats]:
+    '''
+    Stats of columns of rows of the table matching the condition.
+    If `table_id` is set, stats are cached with the selected rows
+    (see `view_indices`). Stats are computed while the table is filtered
+    if the selected rows are not cached yet.
+    '''
+    _, stats = _view_selection(
+        table, condition, table_id, tag, with_stats=True)
+    return cast(Dict[str, ColumnStats], stats)
+
+
+def _indices_size(indices: Optional[pa.Array]) -> int:
+    return 0 if indices is None else indices.nbytes
+
+
 def filter_table_with_pagination(
     table: Table,
     filter: Optional[DataTabularDataFilter]
@@ -1,7 +1,9 @@
 import logging
-from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
 from kiara.data.values import Value
-from lumy_middleware.context.kiara.table_utils import filter_table, sort_table
+from lumy_middleware.context.kiara.table_utils import (get_sorting,
+                                                       view_indices,
+                                                       view_stats)
 from lumy_middleware.types.generated import DataTabularDataFilter, TableStats
 from pyarrow import Table
 
@@ -25,29 +27,51 @@ def is_lumy_supported_type(type_name: str) -> bool:
 
 def filter_table_fn(
     table: Table,
-    filter: Optional[DataTabularDataFilter]
+    filter: Optional[DataTabularDataFilter],
+    table_id: Optional[Hashable] = None,
+    tag: Hashable = None
 ) -> Tuple[Optional[Table], Optional[TableStats]]:
     '''
     TODO: Perform filtering using a Kiara pipeline
+
+    If `table_id` is set, row indices of the filtered and sorted table
+    (and stats of its columns) are cached (tagged with `tag`) and reused
+    for other pages.
     '''
     if table is None:
         return (None, None)
-    if filter is None or filter.full_value:
+    if filter is None:
         return (table, TableStats(rows_count=table.num_rows))
-
-    filtered_table = filter_table(table, filter.condition)
-    sorted_table = sort_table(filtered_table, filter.sorting)
+    if filter.full_value:
+        return (table, TableStats(
+            rows_count=table.num_rows,
+            columns=view_stats(table, None, table_id, tag)
+            if filter.column_stats else None))
 
     offset = filter.offset or 0
     page_size = filter.page_size or 5
-    table_page = sorted_table.slice(offset, page_size)
-    return (table_page, TableStats(rows_count=sorted_table.num_rows))
+
+    # computed first: rows are selected in the same pass
+    columns_stats = view_stats(table, filter.condition, table_id, tag) \
+        if filter.column_stats else None
+
+    # only rows up to the end of the page are guaranteed to be sorted
+    indices, rows_count = view_indices(
+        table, filter.condition, get_sorting(filter),
+        limit=offset + page_size, table_id=table_id, tag=tag)
+
+    if indices is None:
+        table_page = table.slice(offset, page_size)
+    else:
+        table_page = table.take(indices.slice(offset, page_size))
+    return (table_page, TableStats(
+        rows_count=rows_count, columns=columns_stats))
 
 
 V = TypeVar('V')
 F = TypeVar('F')
 
-FilterFn = Callable[[V, Optional[F]], V]
+FilterFn = Callable[[V, Optional[F], Optional[Hashable], Hashable], V]
 
 FILTERS: Dict[str, FilterFn] = {
     'table': filter_table_fn
@@ -56,7 +80,9 @@ FILTERS: Dict[str, FilterFn] = {
 
 def get_value_data(
     value: Value,
-    filter: Optional[DataTabularDataFilter]
+    filter: Optional[DataTabularDataFilter],
+    value_id: Optional[Hashable] = None,
+    tag: Hashable = None
 ) -> Tuple[Any, Any]:
     filter_fn = FILTERS.get(value.type_name, None)
     if not value.is_set:
@@ -65,4 +91,4 @@ def get_value_data(
     if filter_fn is None:
         return (value.get_value_data(), None)
 
-    return filter_fn(value.get_value_data(), filter)
+    return filter_fn(value.get_value_data(), filter, value_id, tag)
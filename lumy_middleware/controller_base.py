@@ -1,11 +1,15 @@
-import json
 import logging
+import time
 import traceback
 from abc import ABC, abstractmethod
-from enum import Enum
-from typing import Any, Dict, Optional
+from concurrent.futures import Future
+from contextvars import ContextVar, copy_context
+from inspect import isawaitable
+from pathlib import Path
+from typing import Any, Awaitable, Dict, Hashable, List, Optional
 from uuid import uuid4
 
+from lumy_middleware.batching import BATCH_ACTION, NotificationBatcher
 from lumy_middleware.context.context import AppContext
 from lumy_middleware.jupyter.base import (MessageEnvelope, MessageHandler,
                                           Target, TargetPublisher)
@@ -14,31 +18,39 @@ from lumy_middleware.jupyter.message_handlers import (ActivityHandler,
                                                       ModuleIOHandler,
                                                       NotesHandler,
                                                       WorkflowMessageHandler)
-from lumy_middleware.types.generated import MsgError
+from lumy_middleware.priorities import get_priority, is_read_only
+from lumy_middleware.types.generated import (ActionMetrics, MessagesBatch,
+                                             MsgCancelled, MsgError)
+from lumy_middleware.utils.binary import encode_message
+from lumy_middleware.utils.cancellation import (Cancelled,
+                                                CancellationToken,
+                                                SupersedeRegistry,
+                                                cancellation_scope)
 from lumy_middleware.utils.dataclasses import to_dict
-from lumy_middleware.utils.json import object_as_json
+from lumy_middleware.utils.dispatch import (OrderedExecutor, QueueStats,
+                                            priority_name)
+from lumy_middleware.utils.json import JsonPreview, object_as_json
+from lumy_middleware.utils.metrics import (DECODE, ENCODE, HANDLER,
+                                           METRICS_FILE, PUBLISH,
+                                           MetricsKey, MetricsRegistry,
+                                           PrometheusFileExporter)
+from lumy_middleware.utils.trace import TRACE_FILE, TraceRecorder
+from lumy_middleware.utils.watchdog import (WATCHDOG_THRESHOLD, Watchdog,
+                                            watched_request)
 
 logger = logging.getLogger(__name__)
 
+# Metrics key (target and action) of the client message being handled.
+# Messages published while it is handled are measured under this key.
+_current_request: ContextVar[Optional[MetricsKey]] = \
+    ContextVar('lumy_request', default=None)
 
-def preprocess_dict(d):
-    if d is None:
-        return d
 
-    def val(v):
-        if isinstance(v, dict):
-            return preprocess_dict(v)
-        elif isinstance(v, list):
-            return [val(i) for i in v]
-        elif isinstance(v, Enum):
-            return v.value
-        else:
-            return v
-
-    return {
-        k: val(v)
-        for k, v in d.items()
-    }
+def get_supersede_key(msg_envelope: MessageEnvelope) -> Optional[str]:
+    content = msg_envelope.content
+    if isinstance(content, dict):
+        return content.get('supersedeKey', None)
+    return getattr(content, 'supersede_key', None)
 
 
 class ControllerBase(TargetPublisher, ABC):
@@ -53,11 +65,45 @@ class ControllerBase(TargetPublisher, ABC):
     '''
     _context: AppContext
     _handlers: Dict[Target, MessageHandler] = {}
+    _executor: Optional[OrderedExecutor] = None
+    _supersede_registry: SupersedeRegistry
+    _batcher: Optional[NotificationBatcher] = None
+    _metrics: MetricsRegistry
+    _exporter: Optional[PrometheusFileExporter] = None
+    _trace: Optional[TraceRecorder] = None
+    _watchdog: Optional[Watchdog] = None
 
-    def __init__(self, context: AppContext):
+    def __init__(self,
+                 context: AppContext,
+                 executor: Optional[OrderedExecutor] = None,
+                 batch_window: Optional[float] = None,
+                 watchdog: Optional[Watchdog] = None):
+        '''
+        Messages are handled synchronously on the transport thread
+        unless an `executor` is provided.
+        Notifications are sent as soon as they are published unless
+        a `batch_window` (seconds) is provided.
+        Slow messages are profiled by the `watchdog`, if provided or
+        configured in the environment (see `utils.watchdog`).
+        '''
         super().__init__()
 
         self._context = context
+        self._executor = executor
+        if batch_window:
+            self._batcher = NotificationBatcher(
+                self._send_batch, batch_window)
+        self._supersede_registry = SupersedeRegistry()
+        self._metrics = MetricsRegistry()
+        if METRICS_FILE:
+            self._exporter = PrometheusFileExporter(
+                self._metrics, Path(METRICS_FILE))
+            self._exporter.start()
+        if TRACE_FILE:
+            self._trace = TraceRecorder(Path(TRACE_FILE))
+        if watchdog is None and WATCHDOG_THRESHOLD:
+            watchdog = Watchdog(float(WATCHDOG_THRESHOLD))
+        self._watchdog = watchdog
         self._handlers = {
             Target.Workflow: WorkflowMessageHandler(
                 self._context, self, Target.Workflow),
@@ -74,10 +120,27 @@ class ControllerBase(TargetPublisher, ABC):
         for target in self._handlers.keys():
             self.subscribe_to_client(target)
 
+    def shutdown(self) -> None:
+        '''
+        Stop background threads of the controller. Metrics are written
+        one last time when the exporter stops. The watchdog is shut down
+        also if it was passed to the controller.
+        '''
+        if self._exporter is not None:
+            self._exporter.stop()
+            self._exporter = None
+        if self._watchdog is not None:
+            self._watchdog.shutdown()
+            self._watchdog = None
+
     @abstractmethod
-    def as_transport_message(self, msg_envelope: Dict) -> Any:
+    def as_transport_message(self,
+                             msg_envelope: Dict,
+                             buffers: List[memoryview]) -> Any:
         '''
         Wrap preprocessed message envelope into a transport envelope.
+        Buffers are binary values referenced from the envelope. They
+        are only present if the client supports binary buffers.
         '''
         ...
 
@@ -85,6 +148,8 @@ class ControllerBase(TargetPublisher, ABC):
     def from_transport_message(self, msg: Any) -> Optional[MessageEnvelope]:
         '''
         Get actual message from a transport envelope.
+        Buffer references in the message should be replaced with
+        the binary values (see `utils.binary.merge_buffers`).
         '''
         ...
 
@@ -95,6 +160,15 @@ class ControllerBase(TargetPublisher, ABC):
         '''
         ...
 
+    @abstractmethod
+    def run_coroutine(self, coro: Awaitable[None]) -> Optional[Future]:
+        '''
+        Run a coroutine (a response of an async handler) on the event
+        loop of the controller. May be called from any thread.
+        Returns a future of the result if the coroutine is still running.
+        '''
+        ...
+
     @abstractmethod
     def subscribe_to_client(self, target: Target):
         '''
@@ -106,67 +180,251 @@ class ControllerBase(TargetPublisher, ABC):
         '''
         Publish on target.
         '''
-        msg_envelope = preprocess_dict(to_dict(msg))
+        if self._batcher is not None:
+            self._batcher.publish(target, msg, self._send_on_target)
+        else:
+            self._send_on_target(target, msg)
+
+    def _send_batch(self,
+                    target: Target,
+                    messages: List[MessageEnvelope]) -> None:
+        if len(messages) == 1 or not self.client_capabilities.batches:
+            for msg in messages:
+                self._send_on_target(target, msg)
+        else:
+            self._send_on_target(target, MessageEnvelope(
+                action=BATCH_ACTION,
+                content=MessagesBatch(messages=messages)
+            ))
+
+    def _send_on_target(self, target: Target, msg: MessageEnvelope) -> None:
+        key = _current_request.get() or (target.value, msg.action)
+        started_at = time.perf_counter()
+        msg_envelope, buffers = encode_message(
+            msg, bool(self.client_capabilities.binary_buffers))
+        transport_msg = self.as_transport_message(msg_envelope, buffers)
+        encoded_at = time.perf_counter()
 
-        if logger.getEffectiveLevel() <= logging.DEBUG:
-            # do not serialise message if debug logging is not enabled
-            msg_str = json.dumps(msg_envelope)
-            if len(msg_str) > 1000:
-                msg_str = msg_str[0:997] + '...'
-            logger.debug(
-                f'Message published on "{target}": {msg_str}')
+        logger.debug(
+            'Message published on "%s" with %d buffer(s): %s',
+            target, len(buffers), JsonPreview(msg_envelope))
 
-        transport_msg = self.as_transport_message(msg_envelope)
         self.publish_to_client(target, transport_msg)
+        published_at = time.perf_counter()
+        payload_size = self.payload_size(msg_envelope, buffers)
+
+        self._metrics.observe_phase(key, ENCODE, encoded_at - started_at)
+        self._metrics.observe_phase(key, PUBLISH, published_at - encoded_at)
+        self._metrics.observe_payload(key, payload_size)
+        if self._trace is not None:
+            self._trace.record_outbound(target, msg.action, payload_size)
+
+    def payload_size(self,
+                     msg_envelope: Dict,
+                     buffers: List[memoryview]) -> int:
+        '''
+        Size of a published message in bytes: the JSON envelope
+        (with embedded base64 values if the client does not support
+        binary buffers) and binary buffers.
+        '''
+        # ASCII only JSON: one byte per character
+        return len(object_as_json(msg_envelope)) \
+            + sum(buffer.nbytes for buffer in buffers)
+
+    def dispatch_key(self, target: Target, msg: MessageEnvelope) -> Hashable:
+        '''
+        Messages with the same dispatch key are handled one at a time,
+        in the order they were received. By default messages are ordered
+        per target. Consecutive read only messages (see `priorities`) with
+        the same key can be handled concurrently, and a read only message
+        can be handled ahead of queued messages with the same key that
+        have lower priority (see `OrderedExecutor`).
+        '''
+        return target
+
+    def get_queues_stats(self) -> Optional[Dict[str, QueueStats]]:
+        if self._executor is None:
+            return None
+        return {
+            priority_name(priority): stats
+            for priority, stats in self._executor.stats().items()
+        }
+
+    def get_metrics(self, reset: bool = False) -> List[ActionMetrics]:
+        return self._metrics.snapshot(reset)
 
     def handle_client_message(self,
                               target: Target,
                               transport_msg: Any) -> Optional[Any]:
-        msg_envelope = None
+        started_at = time.perf_counter()
         try:
             msg_envelope = self.from_transport_message(transport_msg)
+        except Exception as e:
+            self._publish_error(target, e, transport_msg)
+            return None
+
+        if msg_envelope is None:
+            logger.warn(
+                'Received a message that cannot be parsed on ' +
+                f'target "{target}": {object_as_json(transport_msg)}'
+            )
+            return None
+
+        self._metrics.observe_phase(
+            (target.value, msg_envelope.action), DECODE,
+            time.perf_counter() - started_at)
+
+        logger.debug('Message received on "%s": %s',
+                     target, JsonPreview(msg_envelope))
+        if self._trace is not None:
+            self._trace.record_inbound(target, msg_envelope)
 
-            if msg_envelope is None:
-                logger.warn(
-                    'Received a message that cannot be parsed on ' +
-                    f'target "{target}": {object_as_json(transport_msg)}'
-                )
-                return None
+        supersede_key = get_supersede_key(msg_envelope)
+        token = self._supersede_registry.register((target, supersede_key)) \
+            if supersede_key is not None else None
 
-            if logger.getEffectiveLevel() <= logging.DEBUG:
-                # do not serialise message if debug logging is not enabled
-                msg_str = json.dumps(to_dict(msg_envelope))
-                logger.debug(
-                    f'Message received on "{target}": {msg_str}')
+        if self._executor is None:
+            self._handle_message(target, msg_envelope, token)
+        else:
+            # context variables of the transport (i.e. client session)
+            # are visible to the handler on the worker thread
+            context = copy_context()
+            self._executor.submit(
+                self.dispatch_key(target, msg_envelope),
+                lambda: context.run(
+                    self._handle_message, target, msg_envelope, token),
+                get_priority(target, msg_envelope.action),
+                shared=is_read_only(target, msg_envelope.action)
+            )
+        return None
 
+    def _handle_message(self,
+                        target: Target,
+                        msg_envelope: MessageEnvelope,
+                        token: Optional[CancellationToken] = None):
+        key = (target.value, msg_envelope.action)
+        request = _current_request.set(key)
+        watchdog = self._watchdog
+        watched = None
+        if watchdog is not None:
+            # visible to `run_blocking` and to the async response
+            watched = watched_request.set((watchdog, watchdog.watch(
+                msg_envelope.action, msg_envelope.content)))
+        started_at = time.perf_counter()
+        is_async = False
+        failed = False
+        try:
             handler = self._handlers[target]
 
             if handler is None:
                 logger.warn(f'No handler found for target "{target}"')
             else:
-                response_msg = handler(msg_envelope)
-                if response_msg is not None:
-                    data = preprocess_dict(to_dict(response_msg))
-                    logger.debug(
-                        f'Sending response on {target.value} {data}')
-                    self.publish_on_target(target, data)
+                if token is not None:
+                    # superseded while queued
+                    token.raise_if_cancelled()
+                with cancellation_scope(token):
+                    response_msg = handler(msg_envelope)
+                if isawaitable(response_msg):
+                    # the request is done when the async response is
+                    # handled, this thread only waits for it
+                    self._detach_watchdog()
+                    future = self.run_coroutine(self._handle_async_response(
+                        target, msg_envelope, response_msg, started_at,
+                        token))
+                    is_async = True
+                    if future is not None and self._executor is not None:
+                        # keep the order of messages with the same
+                        # dispatch key: wait on the worker thread.
+                        future.result()
+                else:
+                    self._metrics.observe_phase(
+                        key, HANDLER, time.perf_counter() - started_at)
+                    if response_msg is not None:
+                        self.publish_on_target(target, response_msg)
+        except Cancelled:
+            self._publish_cancelled(target, msg_envelope)
+        except Exception as e:
+            failed = True
+            self._publish_error(target, e, to_dict(msg_envelope))
+        finally:
+            if not is_async:
+                self._release_token(target, msg_envelope, token)
+                self._metrics.count(key, error=failed)
+                self._done_watchdog()
+            if watched is not None:
+                watched_request.reset(watched)
+            _current_request.reset(request)
 
+    async def _handle_async_response(
+        self,
+        target: Target,
+        msg_envelope: MessageEnvelope,
+        response: Awaitable[Optional[MessageEnvelope]],
+        started_at: float,
+        token: Optional[CancellationToken] = None
+    ):
+        key = (target.value, msg_envelope.action)
+        failed = False
+        try:
+            with cancellation_scope(token):
+                response_msg = await response
+            self._metrics.observe_phase(
+                key, HANDLER, time.perf_counter() - started_at)
+            if response_msg is not None:
+                self.publish_on_target(target, response_msg)
+        except Cancelled:
+            self._publish_cancelled(target, msg_envelope)
         except Exception as e:
-            stack = '\n'.join(traceback.format_exception(
-                None, e, e.__traceback__))
-            error_id = str(uuid4())
-            msg_obj = to_dict(msg_envelope) \
-                if msg_envelope is not None \
-                else object_as_json(transport_msg)
-            logger.exception(
-                f'''{error_id}: Error occured while processing a message
-                handler for target "{target}" and message
-                {json.dumps(msg_obj)}'''
-            )
-            self.publish(MsgError(
-                id=error_id,
-                message=f'Error occured while executing a message \
-                        handler for target "{target}": {str(e)}',
-                extended_message=stack
-            ))
-        return None
+            failed = True
+            self._publish_error(target, e, to_dict(msg_envelope))
+        finally:
+            self._release_token(target, msg_envelope, token)
+            self._metrics.count(key, error=failed)
+            self._done_watchdog()
+
+    def _detach_watchdog(self):
+        current = watched_request.get()
+        if current is not None:
+            watchdog, request_id = current
+            watchdog.detach(request_id)
+
+    def _done_watchdog(self):
+        current = watched_request.get()
+        if current is not None:
+            watchdog, request_id = current
+            watchdog.done(request_id)
+
+    def _release_token(self,
+                       target: Target,
+                       msg_envelope: MessageEnvelope,
+                       token: Optional[CancellationToken]):
+        supersede_key = get_supersede_key(msg_envelope)
+        if token is not None and supersede_key is not None:
+            self._supersede_registry.release((target, supersede_key), token)
+
+    def _publish_cancelled(self,
+                           target: Target,
+                           msg_envelope: MessageEnvelope):
+        logger.debug('Request "%s" on "%s" has been superseded',
+                     msg_envelope.action, target)
+        self.publish(MsgCancelled(
+            action=msg_envelope.action,
+            supersede_key=get_supersede_key(msg_envelope) or '',
+            target=target.value
+        ))
+
+    def _publish_error(self, target: Target, e: Exception, msg_obj: Any):
+        stack = '\n'.join(traceback.format_exception(
+            None, e, e.__traceback__))
+        error_id = str(uuid4())
+        logger.exception(
+            f'''{error_id}: Error occured while processing a message
+            handler for target "{target}" and message
+            {object_as_json(msg_obj)}'''
+        )
+        self.publish(MsgError(
+            id=error_id,
+            message=f'Error occured while executing a message \
+                    handler for target "{target}": {str(e)}',
+            extended_message=stack
+        ))
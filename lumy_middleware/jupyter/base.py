@@ -1,21 +1,33 @@
+import asyncio
 import logging
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from inspect import signature
-from typing import Any, Dict, Optional
+from inspect import isawaitable, signature
+from typing import (Any, Awaitable, Callable, Dict, List, Optional, Type,
+                    TypeVar)
 
 from lumy_middleware.context.context import AppContext
 from lumy_middleware.target import Target
 from lumy_middleware.types import target_action_mapping
-from lumy_middleware.utils.dataclasses import from_dict, to_dict
+from lumy_middleware.types.generated import (ActionMetrics,
+                                             ClientCapabilities,
+                                             DataStreamOptions)
+from lumy_middleware.utils.codec import (DEFAULT_CHUNK_SIZE, CodecOptions,
+                                         serialize_chunks)
+from lumy_middleware.utils.dataclasses import from_dict
+from lumy_middleware.utils.watchdog import watched
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
 
 @dataclass
 class MessageEnvelope:
     action: str
-    content: Optional[Dict] = None
+    # A dict or a message dataclass. Outgoing messages are converted
+    # to dicts by the controller when they are sent.
+    content: Optional[Any] = None
 
 
 def prepare_result(message: Any) -> Optional[MessageEnvelope]:
@@ -26,15 +38,63 @@ def prepare_result(message: Any) -> Optional[MessageEnvelope]:
         does not have "_action" property'
     return MessageEnvelope(
         action=action,
-        content=to_dict(message)
+        content=message
     )
 
 
+async def prepare_async_result(
+    result: Awaitable[Any]
+) -> Optional[MessageEnvelope]:
+    return prepare_result(await result)
+
+
+def prepare_handler_result(result: Any) -> Any:
+    '''
+    Wrap handler result into a message envelope. Results of
+    coroutine handlers are wrapped when the coroutine completes.
+    '''
+    if isawaitable(result):
+        return prepare_async_result(result)
+    return prepare_result(result)
+
+
 class TargetPublisher(ABC):
+    _client_capabilities: Optional[ClientCapabilities] = None
+
+    @property
+    def client_capabilities(self) -> ClientCapabilities:
+        '''
+        Data transport features supported by the client.
+        Nothing is supported until the client advertises its
+        capabilities.
+        '''
+        if self._client_capabilities is None:
+            self._client_capabilities = ClientCapabilities()
+        return self._client_capabilities
+
+    @client_capabilities.setter
+    def client_capabilities(self, capabilities: ClientCapabilities):
+        self._client_capabilities = capabilities
+
     @abstractmethod
     def publish_on_target(self, target: Target, msg: MessageEnvelope) -> None:
         ...
 
+    def get_queues_stats(self) -> Optional[Dict[str, Any]]:
+        '''
+        Stats of queues of client messages by priority class or `None`
+        if messages are not queued.
+        '''
+        return None
+
+    def get_metrics(self,
+                    reset: bool = False) -> Optional[List[ActionMetrics]]:
+        '''
+        Metrics of handled messages or `None` if
+        messages are not measured.
+        '''
+        return None
+
     def publish(self, message: Any) -> None:
         '''A convenience method that picks action and target
         from the "message" class. See `types.__init__` for more
@@ -51,7 +111,7 @@ class TargetPublisher(ABC):
             target,
             MessageEnvelope(
                 action=action,
-                content=to_dict(message)
+                content=message
             )
         )
 
@@ -86,6 +146,49 @@ class MessageHandler(ABC):
     def context(self):
         return self._context
 
+    @property
+    def codec_options(self) -> CodecOptions:
+        '''
+        Value serialization options negotiated with the client.
+        '''
+        return CodecOptions.for_client(self.publisher.client_capabilities)
+
+    async def run_blocking(self, fn: Callable[..., T], *args: Any) -> T:
+        '''
+        Run a blocking function (subprocess, disk or network I/O) in a
+        thread so that async handlers do not block the event loop.
+        The thread is sampled by the watchdog with the request being
+        handled (see `utils.watchdog`).
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, watched(fn), *args)
+
+    def stream_value(self,
+                     chunk_message_class: Type,
+                     stream: DataStreamOptions,
+                     value: Any) -> int:
+        '''
+        Serialize value in chunks and publish every chunk as soon as
+        it is ready. Chunk message class must have "request_id",
+        "sequence", "type" and "value" fields.
+        Returns number of published chunks.
+        '''
+        chunks = serialize_chunks(
+            value,
+            stream.chunk_size or DEFAULT_CHUNK_SIZE,
+            self.codec_options
+        )
+        chunks_count = 0
+        for chunk in chunks:
+            self.publisher.publish(chunk_message_class(
+                request_id=stream.request_id,
+                sequence=chunks_count,
+                type=chunk.data_type.value,
+                value=chunk.value
+            ))
+            chunks_count += 1
+        return chunks_count
+
     def __handler_needs_message(self, handler: Any):
         if handler not in self._handler_method_args_count_cache:
             sig = signature(handler)
@@ -94,6 +197,11 @@ class MessageHandler(ABC):
         return self._handler_method_args_count_cache[handler] > 0
 
     def handle_message(self, msg: MessageEnvelope):
+        '''
+        Call handler of the message. Handlers can be coroutine functions:
+        in this case an awaitable resolving to the response is returned
+        and the controller runs it on its event loop.
+        '''
         handler = getattr(self, f'_handle_{msg.action}', None)
         if handler:
             message_class = target_action_mapping[self._target].get(
@@ -103,7 +211,7 @@ class MessageHandler(ABC):
                 # the handler does not need a message.
                 if not self.__handler_needs_message(handler):
                     result = handler()
-                    return prepare_result(result)
+                    return prepare_handler_result(result)
                 else:
                     logger.warn(
                         f'{self.__class__}: \
@@ -112,7 +220,7 @@ class MessageHandler(ABC):
             else:
                 message = from_dict(message_class, msg.content)
                 result = handler(message)
-                return prepare_result(result)
+                return prepare_handler_result(result)
         else:
             logger.warn(
                 f'{self.__class__}: \
@@ -1,14 +1,19 @@
+import asyncio
 import logging
 import sys
-from typing import Any, Dict, Optional
+from concurrent.futures import Future
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
 
 from ipykernel.comm import Comm
 from IPython import get_ipython
+from lumy_middleware.batching import BATCH_WINDOW
 from lumy_middleware.context.context import AppContext
 from lumy_middleware.context.kiara.app_context import KiaraAppContext
 from lumy_middleware.controller_base import ControllerBase
 from lumy_middleware.jupyter.base import (
     MessageEnvelope, MessageHandler, Target)
+from lumy_middleware.utils.binary import merge_buffers
+from lumy_middleware.utils.dispatch import DEFAULT_WORKERS, OrderedExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -62,13 +67,26 @@ class IpythonKernelController(ControllerBase):
             context = KiaraAppContext()
         self._comms = {}
         self._is_ready = False
-        super().__init__(context)
+        # Messages are handled on worker threads, responses are sent
+        # from the kernel IO loop.
+        self._io_loop = get_ipython().kernel.io_loop
+        executor = OrderedExecutor(DEFAULT_WORKERS) \
+            if DEFAULT_WORKERS > 0 else None
+        # Notifications are batched from a timer thread, so they are
+        # only batched when messages are sent from the IO loop.
+        batch_window = BATCH_WINDOW if executor is not None else None
+        super().__init__(context, executor, batch_window)
         self._is_ready = True
 
-    def as_transport_message(self, msg_envelope: Dict) -> Any:
+    def as_transport_message(
+        self,
+        msg_envelope: Dict,
+        buffers: List[memoryview]
+    ) -> Tuple[Dict, List[memoryview]]:
         # IPython kernel CommManager will do the job of
         # creating a transport level message out of this message
-        return msg_envelope
+        # and sending buffers as binary frames.
+        return (msg_envelope, buffers)
 
     def from_transport_message(self, msg: Any) -> Optional[MessageEnvelope]:
         if msg is None:
@@ -78,6 +96,7 @@ class IpythonKernelController(ControllerBase):
             return None
         if content.get('action') is None:
             return None
+        content = merge_buffers(content, msg.get('buffers', None) or [])
         return MessageEnvelope(**content)
 
     def publish_to_client(self, target: Target, transport_msg: Any) -> None:
@@ -85,7 +104,21 @@ class IpythonKernelController(ControllerBase):
             logger.warning('Cannot publish to client. ' +
                            f'No channel found for target "{target.value}".')
             return None
-        self._comms[target].send(transport_msg)
+        data, buffers = transport_msg
+        comm = self._comms[target]
+        if self._executor is None:
+            comm.send(data, buffers=buffers or None)
+        else:
+            # Comm is not thread safe: the message is sent from
+            # the kernel IO loop. `add_callback` can be called from
+            # any thread.
+            self._io_loop.add_callback(
+                lambda: comm.send(data, buffers=buffers or None))
+
+    def run_coroutine(self, coro: Awaitable[None]) -> Optional[Future]:
+        # Coroutines run on the asyncio loop of the kernel.
+        return asyncio.run_coroutine_threadsafe(
+            coro, self._io_loop.asyncio_loop)
 
     def subscribe_to_client(self, target: Target):
         def _open_handler(comm: Comm, open_msg: Any):
@@ -4,8 +4,10 @@ from kiara import get_version as get_kiara_version
 from lumy_middleware import version
 from lumy_middleware.jupyter.base import MessageHandler
 from lumy_middleware.types.generated import (MsgExecutionState,
-                                             MsgGetSystemInfo, MsgSystemInfo,
-                                             State)
+                                             MsgGetMetrics, MsgGetSystemInfo,
+                                             MsgMetrics, MsgSystemInfo, State)
+from lumy_middleware.utils.cache import get_caches_stats
+from lumy_middleware.utils.dataclasses import to_dict
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +21,33 @@ class ActivityHandler(MessageHandler):
         self.publisher.publish(MsgExecutionState(state))
 
     def _handle_GetSystemInfo(self, msg: MsgGetSystemInfo):
-        return MsgSystemInfo(versions={
-            'middleware': version,
-            'backend': get_kiara_version()
-        })
+        if msg.capabilities is not None:
+            self.publisher.client_capabilities = msg.capabilities
+
+        caches = None
+        if 'caches' in (msg.fields or []):
+            caches = {
+                name: to_dict(stats)
+                for name, stats in get_caches_stats().items()
+            }
+
+        queues = None
+        if 'queues' in (msg.fields or []):
+            queues = {
+                name: to_dict(stats)
+                for name, stats in
+                (self.publisher.get_queues_stats() or {}).items()
+            }
+
+        return MsgSystemInfo(
+            versions={
+                'middleware': version,
+                'backend': get_kiara_version()
+            },
+            caches=caches,
+            queues=queues
+        )
+
+    def _handle_GetMetrics(self, msg: MsgGetMetrics):
+        return MsgMetrics(
+            actions=self.publisher.get_metrics(bool(msg.reset)) or [])
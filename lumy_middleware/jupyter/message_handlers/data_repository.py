@@ -1,5 +1,5 @@
 import logging
-from typing import Any, Dict, List, cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 import pyarrow as pa
 from kiara.data.values import Value
@@ -7,16 +7,20 @@ from lumy_middleware.context.dataregistry import DataRegistryItem, IsIn
 from lumy_middleware.context.kiara.table_utils import \
     filter_table_with_pagination
 from lumy_middleware.jupyter.base import MessageHandler
-from lumy_middleware.types.generated import (MsgDataRepositoryFindItems,
-                                             MsgDataRepositoryGetItemValue,
-                                             MsgDataRepositoryItems,
-                                             MsgDataRepositoryItemValue,
-                                             TableStats)
+from lumy_middleware.types.generated import (
+    DataTabularDataFilter, MsgDataRepositoryFindItems,
+    MsgDataRepositoryGetItemValue, MsgDataRepositoryItems,
+    MsgDataRepositoryItemValue, MsgDataRepositoryItemValueChunk,
+    MsgDataRepositoryItemValueStreamEnd, TableStats)
+from lumy_middleware.utils.cache import SingleFlight, canonical_hash
 from lumy_middleware.utils.codec import serialize
 from lumy_middleware.utils.dataclasses import to_dict
 
 logger = logging.getLogger(__name__)
 
+# serialized value and its stats
+SerializedItem = Tuple[Any, TableStats]
+
 
 def get_column_names(metadata: Dict[str, Any]) -> List[str]:
     return metadata.get('table', {}).get('column_names', [])
@@ -47,6 +51,11 @@ def as_table(items: List[DataRegistryItem]) -> pa.Table:
 
 
 class DataRepositoryHandler(MessageHandler):
+    _flights: SingleFlight[Tuple, Optional[SerializedItem]]
+
+    def initialize(self):
+        self._flights = SingleFlight()
+
     def _handle_FindItems(self, msg: MsgDataRepositoryFindItems):
         if msg.filter.types is not None and len(msg.filter.types) > 0:
             batch = self.context.data_registry.find(
@@ -61,7 +70,8 @@ class DataRepositoryHandler(MessageHandler):
         filtered_items: List[DataRegistryItem] = batch[offset:offset+page_size]
         filtered_items_table = as_table(filtered_items)
 
-        serialized_filtered_items = serialize(filtered_items_table)
+        serialized_filtered_items = serialize(
+            filtered_items_table, self.codec_options)
         stats = TableStats(rows_count=len(batch))
 
         return MsgDataRepositoryItems(
@@ -69,18 +79,64 @@ class DataRepositoryHandler(MessageHandler):
             items=serialized_filtered_items.value,
             stats=cast(Any, to_dict(stats)))
 
-    def _handle_GetItemValue(self, msg: MsgDataRepositoryGetItemValue):
-        value: Value = self.context.data_registry.get_item_value(msg.item_id)
+    def _get_filtered_table(
+        self,
+        item_id: str,
+        filter: Optional[DataTabularDataFilter]
+    ) -> Optional[Tuple[pa.Table, TableStats]]:
+        value: Value = self.context.data_registry.get_item_value(item_id)
         # TODO: This will be updated when abstract filtering is implemented
         # For now we just support original "table" values
-        if value.type_name == 'table':
-            table: pa.Table = value.get_value_data()
-            data = filter_table_with_pagination(table, msg.filter)
+        if value.type_name != 'table':
+            return None
+        table: pa.Table = value.get_value_data()
+        data = filter_table_with_pagination(table, filter)
+        return data, TableStats(rows_count=len(table))
+
+    def _get_serialized_item(
+        self,
+        item_id: str,
+        filter: Optional[DataTabularDataFilter]
+    ) -> Optional[SerializedItem]:
+        '''
+        Identical requests handled at the same time share the result.
+        '''
+        options = self.codec_options
+        options.value_id = item_id
+
+        def serialize_item() -> Optional[SerializedItem]:
+            result = self._get_filtered_table(item_id, filter)
+            if result is None:
+                return None
+            data, stats = result
+            return serialize(data, options).value, stats
+
+        key = (item_id, canonical_hash(filter), tuple(options.compression))
+        return self._flights.do(key, serialize_item)
 
-            return MsgDataRepositoryItemValue(
+    def _handle_GetItemValue(self, msg: MsgDataRepositoryGetItemValue):
+        if msg.stream is not None:
+            result = self._get_filtered_table(msg.item_id, msg.filter)
+            if result is None:
+                return None
+            data, stats = result
+            return MsgDataRepositoryItemValueStreamEnd(
+                request_id=msg.stream.request_id,
+                chunks_count=self.stream_value(
+                    MsgDataRepositoryItemValueChunk, msg.stream, data),
                 item_id=msg.item_id,
-                type='table',
-                value=serialize(data).value,
                 filter=msg.filter,
-                metadata=cast(Any, to_dict(TableStats(rows_count=len(table))))
+                metadata=cast(Any, to_dict(stats))
             )
+
+        item = self._get_serialized_item(msg.item_id, msg.filter)
+        if item is None:
+            return None
+        value, stats = item
+        return MsgDataRepositoryItemValue(
+            item_id=msg.item_id,
+            type='table',
+            value=value,
+            filter=msg.filter,
+            metadata=cast(Any, to_dict(stats))
+        )
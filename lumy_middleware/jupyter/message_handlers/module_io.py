@@ -1,51 +1,187 @@
 import logging
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 from lumy_middleware.context.context import UpdatedIO
 from lumy_middleware.jupyter.base import MessageHandler
-from lumy_middleware.types.generated import (MsgModuleIOGetInputValue,
+from lumy_middleware.types.generated import (DataTabularDataFilter,
+                                             DataType, DataValueContainer,
+                                             MsgModuleIOGetInputValue,
                                              MsgModuleIOGetOutputValue,
                                              MsgModuleIOInputValue,
                                              MsgModuleIOInputValuesUpdated,
                                              MsgModuleIOOutputValue,
                                              MsgModuleIOOutputValuesUpdated,
-                                             MsgModuleIOUpdateInputValues)
-from lumy_middleware.utils.codec import deserialize, serialize
+                                             MsgModuleIOUpdateInputValues,
+                                             MsgModuleIOUploadAbort,
+                                             MsgModuleIOUploadBegin,
+                                             MsgModuleIOUploadChunk,
+                                             MsgModuleIOUploadCommit,
+                                             MsgModuleIOValueChunk,
+                                             MsgModuleIOValueStreamEnd)
+from lumy_middleware.utils.binary import BinaryData
+from lumy_middleware.utils.cache import (LRUCache, SingleFlight,
+                                         canonical_hash)
+from lumy_middleware.utils.codec import (deserialize, serialize,
+                                         split_table_schema)
 from lumy_middleware.utils.dataclasses import to_dict
+from lumy_middleware.utils.upload import UploadSpool
 
 logger = logging.getLogger(__name__)
 
+# Max size of serialized values kept in cache (bytes)
+PAYLOAD_CACHE_SIZE = int(
+    os.environ.get('LUMY_PAYLOAD_CACHE_SIZE', 128 * 1024 * 1024))
+
+SerializedValue = Tuple[DataValueContainer, Any]
+
+
+def io_tag(step_id: str, io_id: str, is_input: bool):
+    return ('input' if is_input else 'output', step_id, io_id)
+
+
+def omit_known_schema(
+    serialized_value: DataValueContainer,
+    known_schema_id: Optional[str]
+) -> Tuple[Any, Optional[str]]:
+    '''
+    Returns the value to send and its schema ID. For tables whose
+    schema is already known to the client the schema is not sent.
+    '''
+    if serialized_value.data_type != DataType.TABLE \
+            or not isinstance(serialized_value.value, BinaryData):
+        return (serialized_value.value, None)
+
+    schema_id, batches = split_table_schema(serialized_value.value)
+    if schema_id is not None and schema_id == known_schema_id:
+        return (batches, schema_id)
+    return (serialized_value.value, schema_id)
+
 
 class ModuleIOHandler(MessageHandler):
 
+    _payload_cache: LRUCache[Tuple, SerializedValue]
+    _flights: SingleFlight[Tuple, SerializedValue]
+    _upload_spool: UploadSpool
+    # upload ID -> (step ID, input ID)
+    _uploads_inputs: Dict[str, Tuple[str, str]]
+
     def initialize(self):
+        # Serialized values keyed by value ID, filter and codec options.
+        self._payload_cache = LRUCache(PAYLOAD_CACHE_SIZE, name='payload')
+        self._flights = SingleFlight()
+        self._upload_spool = UploadSpool()
+        self._uploads_inputs = {}
+
         self.context.step_input_values_updated.subscribe(
             self._on_inputs_updated)
         self.context.step_output_values_updated.subscribe(
             self._on_outputs_updated)
 
     def _on_inputs_updated(self, msg: UpdatedIO):
+        self._invalidate_cache(msg.step_id, msg.io_ids, is_input=True)
         self.publisher.publish(MsgModuleIOInputValuesUpdated(
             step_id=msg.step_id, input_ids=msg.io_ids))
 
     def _on_outputs_updated(self, msg: UpdatedIO):
+        self._invalidate_cache(msg.step_id, msg.io_ids, is_input=False)
         self.publisher.publish(MsgModuleIOOutputValuesUpdated(
             step_id=msg.step_id, output_ids=msg.io_ids))
 
+    def _invalidate_cache(self,
+                          step_id: str,
+                          io_ids: Iterable[str],
+                          is_input: bool):
+        for io_id in io_ids:
+            self._payload_cache.invalidate(io_tag(step_id, io_id, is_input))
+
+    def _get_serialized_value(
+        self,
+        step_id: str,
+        io_id: str,
+        is_input: bool,
+        filter: Optional[DataTabularDataFilter]
+    ) -> SerializedValue:
+        '''
+        Return serialized value and stats. Binary values are cached until
+        the value changes.
+        '''
+        value_id = self.context.get_step_input_value_id(step_id, io_id) \
+            if is_input \
+            else self.context.get_step_output_value_id(step_id, io_id)
+        filter_hash = canonical_hash(filter)
+        compression = tuple(self.codec_options.compression)
+
+        key: Optional[Tuple] = None
+        if value_id is not None:
+            key = (value_id, filter_hash, compression)
+            cached_value = self._payload_cache.get(key)
+            if cached_value is not None:
+                return cached_value
+
+        # Identical requests handled at the same time share the result.
+        flight_key = key if key is not None \
+            else (io_tag(step_id, io_id, is_input), filter_hash, compression)
+        return self._flights.do(
+            flight_key,
+            lambda: self._serialize_value(
+                step_id, io_id, is_input, filter, key)
+        )
+
+    def _serialize_value(
+        self,
+        step_id: str,
+        io_id: str,
+        is_input: bool,
+        filter: Optional[DataTabularDataFilter],
+        key: Optional[Tuple]
+    ) -> SerializedValue:
+        value, stats = self.context.get_step_input_value(
+            step_id, io_id, filter) \
+            if is_input \
+            else self.context.get_step_output_value(step_id, io_id, filter)
+
+        options = self.codec_options
+        options.value_id = key[0] if key is not None else None
+        serialized_value = serialize(value, options)
+
+        if key is not None and isinstance(serialized_value.value, BinaryData):
+            self._payload_cache.put(
+                key,
+                (serialized_value, stats),
+                serialized_value.value.size,
+                io_tag(step_id, io_id, is_input)
+            )
+        return (serialized_value, stats)
+
     def _handle_GetInputValue(self, msg: MsgModuleIOGetInputValue):
         '''
         Return workflow step input value.
         '''
-        value, stats = self.context.get_step_input_value(
-            msg.step_id, msg.input_id, msg.filter)
+        if msg.stream is not None:
+            value, stats = self.context.get_step_input_value(
+                msg.step_id, msg.input_id, msg.filter)
+            return MsgModuleIOValueStreamEnd(
+                request_id=msg.stream.request_id,
+                chunks_count=self.stream_value(
+                    MsgModuleIOValueChunk, msg.stream, value),
+                step_id=msg.step_id,
+                input_id=msg.input_id,
+                filter=msg.filter,
+                stats=to_dict(stats)
+            )
 
-        serialized_value = serialize(value)
+        serialized_value, stats = self._get_serialized_value(
+            msg.step_id, msg.input_id, True, msg.filter)
+        value, schema_id = omit_known_schema(serialized_value, msg.schema_id)
 
         return MsgModuleIOInputValue(
             step_id=msg.step_id,
             input_id=msg.input_id,
             filter=msg.filter,
-            value=serialized_value.value,
+            value=value,
             type=serialized_value.data_type.value,
+            schema_id=schema_id,
             stats=to_dict(stats)
         )
 
@@ -53,17 +189,30 @@ class ModuleIOHandler(MessageHandler):
         '''
         Return workflow step output value.
         '''
-        value, stats = self.context.get_step_output_value(
-            msg.step_id, msg.output_id, msg.filter)
+        if msg.stream is not None:
+            value, stats = self.context.get_step_output_value(
+                msg.step_id, msg.output_id, msg.filter)
+            return MsgModuleIOValueStreamEnd(
+                request_id=msg.stream.request_id,
+                chunks_count=self.stream_value(
+                    MsgModuleIOValueChunk, msg.stream, value),
+                step_id=msg.step_id,
+                output_id=msg.output_id,
+                filter=msg.filter,
+                stats=to_dict(stats)
+            )
 
-        serialized_value = serialize(value)
+        serialized_value, stats = self._get_serialized_value(
+            msg.step_id, msg.output_id, False, msg.filter)
+        value, schema_id = omit_known_schema(serialized_value, msg.schema_id)
 
         return MsgModuleIOOutputValue(
             step_id=msg.step_id,
             output_id=msg.output_id,
             filter=msg.filter,
-            value=serialized_value.value,
+            value=value,
             type=serialized_value.data_type.value,
+            schema_id=schema_id,
             stats=to_dict(stats)
         )
 
@@ -75,13 +224,37 @@ class ModuleIOHandler(MessageHandler):
             for k, v in values.items()
         }
 
+        self._update_input_values(msg.step_id, input_values)
+
+    def _handle_UploadBegin(self, msg: MsgModuleIOUploadBegin):
+        self._upload_spool.begin(msg.upload_id)
+        self._uploads_inputs[msg.upload_id] = (msg.step_id, msg.input_id)
+
+    def _handle_UploadChunk(self, msg: MsgModuleIOUploadChunk):
+        try:
+            self._upload_spool.append(msg.upload_id, msg.sequence, msg.value)
+        except Exception:
+            self._uploads_inputs.pop(msg.upload_id, None)
+            raise
+
+    def _handle_UploadCommit(self, msg: MsgModuleIOUploadCommit):
+        step_id, input_id = self._uploads_inputs.pop(msg.upload_id)
+        table = self._upload_spool.commit(msg.upload_id)
+        self._update_input_values(step_id, {input_id: table})
+
+    def _handle_UploadAbort(self, msg: MsgModuleIOUploadAbort):
+        self._uploads_inputs.pop(msg.upload_id, None)
+        self._upload_spool.abort(msg.upload_id)
+
+    def _update_input_values(self, step_id: str, input_values: Dict[str, Any]):
         self.context.update_step_input_values(
-            msg.step_id,
+            step_id,
             input_values
         )
+        self._invalidate_cache(step_id, input_values.keys(), True)
 
         if len(input_values) > 0:
             self.publisher.publish(MsgModuleIOInputValuesUpdated(
-                step_id=msg.step_id,
+                step_id=step_id,
                 input_ids=list(input_values.keys())
             ))
@@ -38,7 +38,10 @@ class WorkflowMessageHandler(MessageHandler):
             metadata=self._context.current_workflow_metadata
         ))
 
-    def _handle_LoadLumyWorkflow(self, msg: MsgWorkflowLoadLumyWorkflow):
+    async def _handle_LoadLumyWorkflow(
+        self,
+        msg: MsgWorkflowLoadLumyWorkflow
+    ):
         '''
         Load a workflow:
             - install dependencies
@@ -55,7 +58,8 @@ class WorkflowMessageHandler(MessageHandler):
             metadata = Metadata(uri=msg.workflow)
         else:
             # find the workflow
-            workflows = list(get_workflows(include_body=True))
+            workflows = await self.run_blocking(
+                lambda: list(get_workflows(include_body=True)))
             workflow_str = json.dumps(to_dict(msg.workflow))
             for w in workflows:
                 w_str = json.dumps(to_dict(w.body), cls=EnhancedJSONEncoder)
@@ -65,7 +69,14 @@ class WorkflowMessageHandler(MessageHandler):
 
         last_status_update: Optional[MsgWorkflowLumyWorkflowLoadProgress] = \
             None
-        for status_update in self.context.load_workflow(workflow, metadata):
+        # Loading steps install packages and load modules: every step
+        # runs in a thread.
+        status_updates = self.context.load_workflow(workflow, metadata)
+        while True:
+            status_update = await self.run_blocking(
+                next, status_updates, None)
+            if status_update is None:
+                break
             last_status_update = status_update
             self.publisher.publish(status_update)
 
@@ -74,10 +85,10 @@ class WorkflowMessageHandler(MessageHandler):
                 MsgWorkflowLumyWorkflowLoadProgressStatus.LOADED:
             self._handle_GetCurrent()
 
-    def _handle_GetWorkflowList(self, msg: MsgWorkflowGetWorkflowList):
-        self.publisher.publish(MsgWorkflowWorkflowList(
-            workflows=list(get_workflows(msg.include_workflow or False))
-        ))
+    async def _handle_GetWorkflowList(self, msg: MsgWorkflowGetWorkflowList):
+        workflows = await self.run_blocking(
+            lambda: list(get_workflows(msg.include_workflow or False)))
+        self.publisher.publish(MsgWorkflowWorkflowList(workflows=workflows))
 
     def _handle_Execute(self, msg: MsgWorkflowExecute):
         # TODO: This can be better encapsulated into context
@@ -129,8 +140,10 @@ class WorkflowMessageHandler(MessageHandler):
 
         self.publisher.publish(response)
 
-    def _handle_GetPageComponentsCode(self):
-        code = [] if self._context.current_workflow is None \
-            else get_specific_components_code(self._context.current_workflow)
+    async def _handle_GetPageComponentsCode(self):
+        workflow = self._context.current_workflow
+        code = [] if workflow is None \
+            else await self.run_blocking(
+                get_specific_components_code, workflow)
         response = MsgWorkflowPageComponentsCode(code=code)
         self.publisher.publish(response)
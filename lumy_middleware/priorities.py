@@ -0,0 +1,123 @@
+'''
+Priorities of client messages.
+
+When all workers are busy, queued messages are handled in order of
+priority: interactive reads first, then mutations, then everything
+else and heavy jobs last.
+
+Priorities can be overridden per action name with the `LUMY_PRIORITIES`
+environment variable (`"Execute=default,GetNotes=heavy"`) or with
+`set_priority`.
+'''
+import logging
+import os
+from typing import Dict, Optional, Tuple, Type
+
+from lumy_middleware.target import Target
+from lumy_middleware.types import (MsgDataRepositoryFindItems,
+                                   MsgDataRepositoryGetItemValue,
+                                   MsgGetMetrics, MsgGetSystemInfo,
+                                   MsgModuleIOExecute,
+                                   MsgModuleIOGetInputValue,
+                                   MsgModuleIOGetOutputValue,
+                                   MsgModuleIOGetPreview,
+                                   MsgModuleIOUpdateInputValues,
+                                   MsgModuleIOUpdatePreviewParameters,
+                                   MsgModuleIOUploadAbort,
+                                   MsgModuleIOUploadBegin,
+                                   MsgModuleIOUploadChunk,
+                                   MsgModuleIOUploadCommit, MsgNotesAdd,
+                                   MsgNotesDelete, MsgNotesGetNotes,
+                                   MsgNotesUpdate, MsgWorkflowExecute,
+                                   MsgWorkflowLoadLumyWorkflow)
+from lumy_middleware.utils.dispatch import Priority
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRIORITIES: Dict[Type, Priority] = {
+    MsgModuleIOGetInputValue: Priority.INTERACTIVE,
+    MsgModuleIOGetOutputValue: Priority.INTERACTIVE,
+    MsgModuleIOGetPreview: Priority.INTERACTIVE,
+    MsgDataRepositoryGetItemValue: Priority.INTERACTIVE,
+    MsgDataRepositoryFindItems: Priority.INTERACTIVE,
+    MsgNotesGetNotes: Priority.INTERACTIVE,
+    MsgGetSystemInfo: Priority.INTERACTIVE,
+    MsgGetMetrics: Priority.INTERACTIVE,
+
+    MsgModuleIOUpdateInputValues: Priority.MUTATION,
+    MsgModuleIOUpdatePreviewParameters: Priority.MUTATION,
+    MsgModuleIOUploadBegin: Priority.MUTATION,
+    MsgModuleIOUploadChunk: Priority.MUTATION,
+    MsgModuleIOUploadCommit: Priority.MUTATION,
+    MsgModuleIOUploadAbort: Priority.MUTATION,
+    MsgNotesAdd: Priority.MUTATION,
+    MsgNotesUpdate: Priority.MUTATION,
+    MsgNotesDelete: Priority.MUTATION,
+
+    MsgModuleIOExecute: Priority.HEAVY,
+    MsgWorkflowExecute: Priority.HEAVY,
+    MsgWorkflowLoadLumyWorkflow: Priority.HEAVY,
+}
+
+# Messages that do not change state. Consecutive read only messages
+# on a target can be handled concurrently.
+READ_ONLY_MESSAGES = [
+    MsgModuleIOGetInputValue,
+    MsgModuleIOGetOutputValue,
+    MsgDataRepositoryGetItemValue,
+    MsgDataRepositoryFindItems,
+    MsgNotesGetNotes,
+]
+
+# (target, action) -> priority
+_priorities: Dict[Tuple[Target, str], Priority] = {
+    (getattr(cls, '_target'), getattr(cls, '_action')): priority
+    for cls, priority in DEFAULT_PRIORITIES.items()
+}
+_read_only = set(
+    (getattr(cls, '_target'), getattr(cls, '_action'))
+    for cls in READ_ONLY_MESSAGES
+)
+# action -> priority. Overrides priorities of actions on all targets.
+_overrides: Dict[str, Priority] = {}
+
+
+def parse_priorities(value: str) -> Dict[str, Priority]:
+    '''
+    Parse "<action>=<priority class>,..." string.
+    '''
+    priorities: Dict[str, Priority] = {}
+    for item in value.split(','):
+        if item.strip() == '':
+            continue
+        action, _, name = item.partition('=')
+        try:
+            priorities[action.strip()] = Priority[name.strip().upper()]
+        except KeyError:
+            logger.warning(f'Unknown priority class "{name}" of "{action}"')
+    return priorities
+
+
+def set_priority(action: str, priority: Optional[Priority]) -> None:
+    '''
+    Set priority of an action on all targets.
+    `None` restores the default priority.
+    '''
+    if priority is None:
+        _overrides.pop(action, None)
+    else:
+        _overrides[action] = priority
+
+
+def get_priority(target: Target, action: str) -> Priority:
+    priority = _overrides.get(action, None)
+    if priority is not None:
+        return priority
+    return _priorities.get((target, action), Priority.DEFAULT)
+
+
+def is_read_only(target: Target, action: str) -> bool:
+    return (target, action) in _read_only
+
+
+_overrides.update(parse_priorities(os.environ.get('LUMY_PRIORITIES', '')))
@@ -0,0 +1,49 @@
+'''
+Run Lumy middleware as a standalone server.
+
+python -m lumy_middleware.server --port 8765
+python -m lumy_middleware.server --path /tmp/lumy.sock
+python -m lumy_middleware.server --websocket --port 8765
+'''
+import argparse
+import asyncio
+import logging
+from typing import Any
+
+from lumy_middleware.server.controller import ServerController
+from lumy_middleware.utils.dispatch import DEFAULT_WORKERS
+
+
+async def serve(args: argparse.Namespace) -> None:
+    controller = ServerController(workers=args.workers)
+    if args.websocket:
+        server: Any = await controller.serve_websocket(
+            args.host, args.port, args.path)
+    else:
+        server = await controller.serve(args.host, args.port, args.path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        controller.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lumy middleware server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--path', default=None,
+                        help='Unix socket path (instead of host and port)')
+    parser.add_argument('--websocket', action='store_true',
+                        help='Serve WebSocket clients (i.e. browsers or '
+                        'clients behind an HTTP reverse proxy)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    asyncio.run(serve(args))
+
+
+if __name__ == '__main__':
+    main()
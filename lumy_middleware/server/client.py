@@ -0,0 +1,62 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from lumy_middleware.jupyter.base import Target
+from lumy_middleware.server.protocol import (TARGET_FIELD, encode_frame,
+                                             read_frame)
+
+
+class ServerClient:
+    '''
+    Minimal asyncio client of `ServerController`. Messages are sent
+    and received as JSON envelopes (camel case content) with buffers.
+    '''
+    _reader: asyncio.StreamReader
+    _writer: asyncio.StreamWriter
+
+    def __init__(self,
+                 reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+
+    @staticmethod
+    async def connect(host: str = '127.0.0.1',
+                      port: int = 8765,
+                      path: Optional[str] = None) -> 'ServerClient':
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return ServerClient(reader, writer)
+
+    async def send(self,
+                   target: Target,
+                   action: str,
+                   content: Optional[Dict[str, Any]] = None,
+                   buffers: Sequence[memoryview] = ()) -> None:
+        envelope = {
+            TARGET_FIELD: target.value,
+            'action': action,
+            'content': content or {}
+        }
+        self._writer.writelines(encode_frame(envelope, buffers))
+        await self._writer.drain()
+
+    async def receive(self) -> Optional[Tuple[Target,
+                                              Dict[str, Any],
+                                              List[memoryview]]]:
+        '''
+        Returns target, envelope and buffers of the next message or
+        `None` if the server closed the connection.
+        '''
+        frame = await read_frame(self._reader)
+        if frame is None:
+            return None
+        envelope, buffers = frame
+        target = Target(envelope.pop(TARGET_FIELD))
+        return target, envelope, buffers
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
@@ -0,0 +1,140 @@
+'''
+Client connections of `ServerController`: a byte stream (TCP or Unix
+socket) or a WebSocket. Both carry frames described in `server.protocol`.
+'''
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Sequence, Union
+
+from lumy_middleware.server.protocol import (MAX_FRAME_SIZE, Frame,
+                                             decode_frame, encode_frame,
+                                             read_frame)
+from lumy_middleware.utils.json import object_as_json
+from websockets.asyncio.server import ServerConnection
+from websockets.exceptions import ConnectionClosed, ConnectionClosedOK
+
+logger = logging.getLogger(__name__)
+
+
+class Connection(ABC):
+    '''
+    Frames are encoded on the publishing thread with `encode` and
+    written with `write` on the event loop of the server.
+    '''
+
+    @abstractmethod
+    async def read(self) -> Optional[Frame]:
+        '''
+        Read the next frame. Returns `None` when the client closed
+        the connection.
+        '''
+        ...
+
+    @abstractmethod
+    def encode(self,
+               envelope: Dict[str, Any],
+               buffers: Sequence[memoryview]) -> Any:
+        ...
+
+    @abstractmethod
+    def write(self, data: Any) -> None:
+        '''
+        Write an encoded frame without waiting.
+        '''
+        ...
+
+    async def drain(self) -> None:
+        '''
+        Wait until written frames are sent if the client is slow.
+        '''
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        ...
+
+
+class StreamConnection(Connection):
+    def __init__(self,
+                 reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter,
+                 max_frame_size: int = MAX_FRAME_SIZE):
+        self._reader = reader
+        self._writer = writer
+        self._max_frame_size = max_frame_size
+
+    async def read(self) -> Optional[Frame]:
+        return await read_frame(self._reader, self._max_frame_size)
+
+    def encode(self,
+               envelope: Dict[str, Any],
+               buffers: Sequence[memoryview]) -> Any:
+        return encode_frame(envelope, buffers)
+
+    def write(self, data: Any) -> None:
+        self._writer.writelines(data)
+
+    async def drain(self) -> None:
+        await self._writer.drain()
+
+    async def close(self) -> None:
+        self._writer.close()
+
+
+class WebSocketConnection(Connection):
+    '''
+    Frames with buffers are sent as binary messages, other frames as
+    text messages with the JSON envelope.
+    '''
+    _outbox: 'asyncio.Queue[Union[str, bytes]]'
+
+    def __init__(self,
+                 websocket: ServerConnection,
+                 max_frame_size: int = MAX_FRAME_SIZE):
+        self._websocket = websocket
+        self._max_frame_size = max_frame_size
+        # frames are sent one at a time in the order they were written
+        self._outbox = asyncio.Queue()
+        self._sender = asyncio.get_running_loop().create_task(
+            self._send_all())
+
+    async def read(self) -> Optional[Frame]:
+        try:
+            message = await self._websocket.recv()
+        except ConnectionClosedOK:
+            return None
+        except ConnectionClosed as e:
+            raise ConnectionResetError(str(e)) from e
+        if isinstance(message, str):
+            return json.loads(message), []
+        return decode_frame(message, self._max_frame_size)
+
+    def encode(self,
+               envelope: Dict[str, Any],
+               buffers: Sequence[memoryview]) -> Union[str, bytes]:
+        if len(buffers) == 0:
+            return object_as_json(envelope)
+        return b''.join(encode_frame(envelope, buffers))
+
+    def write(self, data: Union[str, bytes]) -> None:
+        self._outbox.put_nowait(data)
+
+    async def drain(self) -> None:
+        await self._outbox.join()
+
+    async def close(self) -> None:
+        self._sender.cancel()
+        await self._websocket.close()
+
+    async def _send_all(self) -> None:
+        while True:
+            data = await self._outbox.get()
+            try:
+                await self._websocket.send(data)
+            except ConnectionClosed as e:
+                # the session ends when its next read fails
+                logger.debug('Frame not sent: %s', e)
+            finally:
+                self._outbox.task_done()
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+from concurrent.futures import Future
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from itertools import count
+from typing import (Any, Awaitable, Callable, Dict, List, Optional, Set,
+                    Tuple)
+
+from lumy_middleware.batching import BATCH_WINDOW, NOTIFICATION_ACTIONS
+from lumy_middleware.context.context import AppContext
+from lumy_middleware.context.kiara.app_context import KiaraAppContext
+from lumy_middleware.controller_base import ControllerBase
+from lumy_middleware.jupyter.base import MessageEnvelope, Target
+from lumy_middleware.server.connection import (Connection,
+                                               StreamConnection,
+                                               WebSocketConnection)
+from lumy_middleware.server.protocol import MAX_FRAME_SIZE, TARGET_FIELD
+from lumy_middleware.types.generated import ClientCapabilities
+from lumy_middleware.utils.binary import merge_buffers
+from lumy_middleware.utils.dispatch import DEFAULT_WORKERS, OrderedExecutor
+from websockets.asyncio.server import Server as WebSocketServer
+from websockets.asyncio.server import ServerConnection, serve, unix_serve
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Session:
+    id: int
+    connection: Connection
+    # advertised by the client in "GetSystemInfo"
+    capabilities: ClientCapabilities = field(
+        default_factory=ClientCapabilities)
+
+
+# Session of the client whose message is being handled
+_current_session: ContextVar[Optional[Session]] = \
+    ContextVar('session', default=None)
+# Session a notification is being encoded for and sent to
+_recipient: ContextVar[Optional[Session]] = \
+    ContextVar('recipient', default=None)
+
+
+class ServerController(ControllerBase):
+    '''
+    Controller serving clients connected over WebSocket (i.e. browsers
+    or clients behind an HTTP reverse proxy), TCP or a Unix socket.
+    Messages are framed as described in `server.protocol`. Sessions of
+    clients sending frames larger than `max_frame_size` are closed.
+
+    Any number of clients can be connected at the same time. They share
+    the app context, client capabilities are kept per session. Messages
+    published while a client message is handled are sent to that client
+    only, notifications (see `batching`) are encoded for and sent to
+    every client.
+
+    Used for headless deployments and load testing
+    (see `benchmark.load`).
+    '''
+    _sessions: Dict[int, Session]
+    _targets: Set[Target]
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __init__(self,
+                 context: Optional[AppContext] = None,
+                 workers: int = DEFAULT_WORKERS,
+                 max_frame_size: int = MAX_FRAME_SIZE):
+        if context is None:
+            context = KiaraAppContext()
+        self._max_frame_size = max_frame_size
+        self._sessions = {}
+        self._targets = set()
+        self._session_ids = count()
+        executor = OrderedExecutor(workers) if workers > 0 else None
+        batch_window = BATCH_WINDOW if executor is not None else None
+        super().__init__(context, executor, batch_window)
+
+    async def serve(self,
+                    host: str = '127.0.0.1',
+                    port: int = 8765,
+                    path: Optional[str] = None) -> asyncio.AbstractServer:
+        '''
+        Start accepting clients on `host`:`port` or on Unix socket `path`.
+        '''
+        self._loop = asyncio.get_running_loop()
+        if path is not None:
+            server = await asyncio.start_unix_server(
+                self._handle_stream, path)
+        else:
+            server = await asyncio.start_server(
+                self._handle_stream, host, port)
+        logger.info('Serving Lumy clients on %s',
+                    path or f'{host}:{port}')
+        return server
+
+    async def serve_websocket(self,
+                              host: str = '127.0.0.1',
+                              port: int = 8765,
+                              path: Optional[str] = None) -> WebSocketServer:
+        '''
+        Start accepting WebSocket clients on `host`:`port` or on Unix
+        socket `path`. Connections are accepted on any URL path so that
+        the server can be mounted anywhere behind a reverse proxy.
+        '''
+        self._loop = asyncio.get_running_loop()
+        if path is not None:
+            server = await unix_serve(
+                self._handle_websocket, path,
+                max_size=self._max_frame_size)
+        else:
+            server = await serve(
+                self._handle_websocket, host, port,
+                max_size=self._max_frame_size)
+        logger.info('Serving Lumy WebSocket clients on %s',
+                    path or f'ws://{host}:{port}')
+        return server
+
+    @property
+    def client_capabilities(self) -> ClientCapabilities:
+        '''
+        Capabilities of the client the message is sent to or of the client
+        whose message is being handled.
+        '''
+        session = _recipient.get() or _current_session.get()
+        if session is None:
+            return ClientCapabilities()
+        return session.capabilities
+
+    @client_capabilities.setter
+    def client_capabilities(self, capabilities: ClientCapabilities):
+        session = _current_session.get()
+        if session is None:
+            logger.warning('Client capabilities set outside of a session.')
+            return
+        session.capabilities = capabilities
+
+    def as_transport_message(
+        self,
+        msg_envelope: Dict,
+        buffers: List[memoryview]
+    ) -> Tuple[Dict, List[memoryview]]:
+        return (msg_envelope, buffers)
+
+    def from_transport_message(self, msg: Any) -> Optional[MessageEnvelope]:
+        content, buffers = msg
+        if content.get('action') is None:
+            return None
+        content = merge_buffers(content, buffers)
+        return MessageEnvelope(**content)
+
+    def publish_to_client(self, target: Target, transport_msg: Any) -> None:
+        if self._loop is None:
+            logger.warning('Cannot publish to client. Server is not started.')
+            return None
+        session = _recipient.get() or _current_session.get()
+        if session is None:
+            return None
+        data, buffers = transport_msg
+        # serialized on the publishing thread
+        frame = session.connection.encode(
+            {TARGET_FIELD: target.value, **data}, buffers)
+        self._loop.call_soon_threadsafe(self._send, session, frame)
+
+    def run_coroutine(self, coro: Awaitable[None]) -> Optional[Future]:
+        assert self._loop is not None, 'Server is not started'
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is self._loop:
+            # messages are handled synchronously on the loop
+            self._loop.create_task(coro)  # type: ignore
+            return None
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def subscribe_to_client(self, target: Target):
+        self._targets.add(target)
+
+    def _send_batch(self,
+                    target: Target,
+                    messages: List[MessageEnvelope]) -> None:
+        self._for_each_session(super()._send_batch, target, messages)
+
+    def _send_on_target(self, target: Target, msg: MessageEnvelope) -> None:
+        if _recipient.get() is None and (
+                _current_session.get() is None
+                or msg.action in NOTIFICATION_ACTIONS):
+            self._for_each_session(super()._send_on_target, target, msg)
+        else:
+            super()._send_on_target(target, msg)
+
+    def _for_each_session(self,
+                          send: Callable[..., None],
+                          *args: Any) -> None:
+        # encoded separately for every client with its capabilities
+        for session in list(self._sessions.values()):
+            recipient = _recipient.set(session)
+            try:
+                send(*args)
+            finally:
+                _recipient.reset(recipient)
+
+    def _send(self, session: Session, frame: Any) -> None:
+        if session.id in self._sessions:
+            session.connection.write(frame)
+
+    async def _handle_stream(self,
+                             reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter):
+        await self._handle_session(
+            StreamConnection(reader, writer, self._max_frame_size))
+
+    async def _handle_websocket(self, websocket: ServerConnection):
+        await self._handle_session(
+            WebSocketConnection(websocket, self._max_frame_size))
+
+    async def _handle_session(self, connection: Connection):
+        session = Session(next(self._session_ids), connection)
+        self._sessions[session.id] = session
+        # set in the context of this connection only
+        _current_session.set(session)
+        logger.debug('Client session %d started', session.id)
+        try:
+            while True:
+                frame = await connection.read()
+                if frame is None:
+                    break
+                content, buffers = frame
+                target_name = content.pop(TARGET_FIELD, None)
+                target = next(
+                    (t for t in self._targets if t.value == target_name),
+                    None)
+                if target is None:
+                    logger.warning(
+                        f'Received a message for unknown target '
+                        f'"{target_name}" in session {session.id}')
+                    continue
+                self.handle_client_message(target, (content, buffers))
+                # let other sessions and responses through
+                await connection.drain()
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.debug('Client session %d failed: %s', session.id, e)
+        except ValueError as e:
+            # frame too large or malformed
+            logger.warning('Client session %d sent an invalid frame: %s',
+                           session.id, e)
+        finally:
+            del self._sessions[session.id]
+            await connection.close()
+            logger.debug('Client session %d closed', session.id)
@@ -0,0 +1,120 @@
+'''
+Framing of Lumy messages on a byte stream (TCP or Unix socket).
+
+A frame is made of:
+ - a header: length of the JSON envelope and number of buffers (`!II`)
+ - length of every buffer (`!Q` each)
+ - the JSON envelope (UTF-8): `{"target": ..., "action": ..., "content": ...}`
+ - the buffers
+
+Binary values in the envelope reference buffers by index, the same way
+they do in Jupyter Comm messages (see `utils.binary`).
+
+Over WebSocket a frame is sent as a binary message. Messages without
+buffers can be sent as text messages with the JSON envelope only.
+
+Frames larger than `LUMY_MAX_FRAME_SIZE` bytes (envelope and buffers)
+are rejected before they are read.
+'''
+import asyncio
+import json
+import os
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from lumy_middleware.utils.json import object_as_json
+
+HEADER = struct.Struct('!II')
+BUFFER_LENGTH = struct.Struct('!Q')
+
+# Max size of a frame received from a client (bytes)
+MAX_FRAME_SIZE = int(
+    os.environ.get('LUMY_MAX_FRAME_SIZE', 256 * 1024 * 1024))
+
+TARGET_FIELD = 'target'
+
+Frame = Tuple[Dict[str, Any], List[memoryview]]
+
+
+def encode_frame(envelope: Dict[str, Any],
+                 buffers: Sequence[memoryview] = ()) -> List[Any]:
+    '''
+    Returns parts of the frame. Buffers are not copied.
+    '''
+    data = object_as_json(envelope).encode('utf-8')
+    parts: List[Any] = [HEADER.pack(len(data), len(buffers))]
+    parts.extend(BUFFER_LENGTH.pack(memoryview(b).nbytes) for b in buffers)
+    parts.append(data)
+    parts.extend(memoryview(b).cast('B') for b in buffers)
+    return parts
+
+
+class FrameTooLarge(ValueError):
+    pass
+
+
+def check_frame_size(size: int, max_size: int) -> None:
+    if size > max_size:
+        raise FrameTooLarge(
+            f'Frame of at least {size} bytes exceeds '
+            f'the limit of {max_size} bytes')
+
+
+async def read_frame(reader: asyncio.StreamReader,
+                     max_size: int = MAX_FRAME_SIZE) -> Optional[Frame]:
+    '''
+    Read the next frame. Returns `None` when the stream is closed.
+    Raises `FrameTooLarge` as soon as the lengths in the frame exceed
+    `max_size`, before the envelope and buffers are read.
+    '''
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if len(e.partial) == 0:
+            return None
+        raise
+    data_length, buffers_count = HEADER.unpack(header)
+    lengths_size = BUFFER_LENGTH.size * buffers_count
+    size = HEADER.size + lengths_size + data_length
+    check_frame_size(size, max_size)
+
+    lengths = [
+        length for length, in
+        BUFFER_LENGTH.iter_unpack(await reader.readexactly(lengths_size))
+    ]
+    check_frame_size(size + sum(lengths), max_size)
+
+    envelope = json.loads(await reader.readexactly(data_length))
+    buffers = [memoryview(await reader.readexactly(n)) for n in lengths]
+    return envelope, buffers
+
+
+def decode_frame(data: Union[bytes, bytearray, memoryview],
+                 max_size: int = MAX_FRAME_SIZE) -> Frame:
+    '''
+    Decode a frame received as a whole (a binary WebSocket message).
+    Buffers are views of `data`, they are not copied.
+    '''
+    view = memoryview(data).cast('B')
+    check_frame_size(len(view), max_size)
+    if len(view) < HEADER.size:
+        raise ValueError(f'Frame of {len(view)} bytes has no header')
+    data_length, buffers_count = HEADER.unpack_from(view)
+    data_start = HEADER.size + BUFFER_LENGTH.size * buffers_count
+    if data_start > len(view):
+        raise ValueError('Frame is shorter than its header')
+    lengths = [
+        length for length, in
+        BUFFER_LENGTH.iter_unpack(view[HEADER.size:data_start])
+    ]
+    data_end = data_start + data_length
+    if data_end + sum(lengths) != len(view):
+        raise ValueError('Frame length does not match its header')
+
+    envelope = json.loads(bytes(view[data_start:data_end]))
+    buffers = []
+    offset = data_end
+    for length in lengths:
+        buffers.append(view[offset:offset + length])
+        offset += length
+    return envelope, buffers
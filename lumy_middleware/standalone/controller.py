@@ -1,12 +1,16 @@
+import asyncio
 import logging
+from concurrent.futures import Future
 from enum import Enum
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
 from lumy_middleware.context.context import AppContext
 from lumy_middleware.context.kiara.app_context import KiaraAppContext
-from lumy_middleware.controller_base import ControllerBase, preprocess_dict
+from lumy_middleware.controller_base import ControllerBase
 from lumy_middleware.jupyter.base import MessageEnvelope, Target
-from lumy_middleware.utils.dataclasses import to_dict
+from lumy_middleware.utils.binary import encode_message, merge_buffers
+from lumy_middleware.utils.dispatch import OrderedExecutor
+from lumy_middleware.utils.watchdog import Watchdog
 from tinypubsub import Subscription
 from tinypubsub.simple import SimplePublisher
 
@@ -20,6 +24,7 @@ class Sender(Enum):
 
 SENDER_FIELD = 'sender'
 CONTENT_FIELD = 'content'
+BUFFERS_FIELD = 'buffers'
 
 
 class StandaloneControllerClient:
@@ -41,8 +46,9 @@ class StandaloneControllerClient:
         return self._controller._channels[target].subscribe(_handler)
 
     def publish(self, target: Target, msg: MessageEnvelope):
-        msg_envelope = preprocess_dict(to_dict(msg))
-        transport_msg = self._controller.as_transport_message(msg_envelope)
+        msg_envelope, buffers = encode_message(msg, True)
+        transport_msg = self._controller.as_transport_message(
+            msg_envelope, buffers)
         transport_msg[SENDER_FIELD] = Sender.Client.value
         self._controller._channels[target].publish(transport_msg)
 
@@ -53,29 +59,42 @@ class StandaloneController(ControllerBase):
     tinypubsub.
 
     This controller is used in unit tests where we do not need
-    to set up IPython transport.
+    to set up IPython transport. Messages are handled synchronously
+    unless an `executor` is provided. Slow messages are profiled by
+    the `watchdog`, if provided.
     '''
     _channels: Dict[Target, SimplePublisher]
     _client: StandaloneControllerClient
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _tasks: List['asyncio.Task[None]']
 
-    def __init__(self, context: Optional[AppContext] = None):
+    def __init__(self,
+                 context: Optional[AppContext] = None,
+                 executor: Optional[OrderedExecutor] = None,
+                 watchdog: Optional[Watchdog] = None):
         if context is None:
             context = KiaraAppContext()
         self._channels = {}
+        self._tasks = []
 
-        super().__init__(context)
+        super().__init__(context, executor, watchdog=watchdog)
         self._client = StandaloneControllerClient(self)
 
-    def as_transport_message(self, msg_envelope: Dict) -> Any:
+    def as_transport_message(self,
+                             msg_envelope: Dict,
+                             buffers: List[memoryview]) -> Any:
+        # Buffers are passed around as is, without copying
         return {
             SENDER_FIELD: Sender.Server.value,
-            CONTENT_FIELD: msg_envelope
+            CONTENT_FIELD: msg_envelope,
+            BUFFERS_FIELD: buffers
         }
 
     def from_transport_message(self, msg: Any) -> Optional[MessageEnvelope]:
         content = msg.get(CONTENT_FIELD, None)
         if content is None:
             return None
+        content = merge_buffers(content, msg.get(BUFFERS_FIELD, None) or [])
         return MessageEnvelope(**content)
 
     def publish_to_client(self, target: Target, transport_msg: Any) -> None:
@@ -85,6 +104,31 @@ class StandaloneController(ControllerBase):
             return None
         self._channels[target].publish(transport_msg)
 
+    def run_coroutine(self, coro: Awaitable[None]) -> Optional[Future]:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            # Called from a coroutine (i.e. an async test):
+            # the caller awaits the task.
+            self._tasks.append(loop.create_task(coro))  # type: ignore
+            return None
+        # Otherwise the coroutine runs to completion on the controller's
+        # own loop which keeps handling of messages synchronous.
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(coro)
+        return None
+
+    async def drain(self) -> None:
+        '''
+        Wait until coroutines scheduled on the running loop complete.
+        '''
+        while self._tasks:
+            tasks, self._tasks = self._tasks, []
+            await asyncio.gather(*tasks)
+
     def subscribe_to_client(self, target: Target):
         if target not in self._channels:
             self._channels[target] = SimplePublisher()
@@ -2,7 +2,7 @@ from collections import defaultdict
 from dataclasses import is_dataclass
 from typing import Dict, Type
 
-from dataclasses_json import LetterCase, dataclass_json
+from lumy_middleware.utils.dataclass_compiler import compile_dataclasses
 
 from ..target import Target
 from .generated import *  # noqa
@@ -13,8 +13,6 @@ target_action_mapping: Dict[Target, Dict[str, Type]] = defaultdict(dict)
 # to make it easier to deal with publishing of the messages
 
 for k, v in list(globals().items()):
-    if is_dataclass(v):
-        dataclass_json(v, letter_case=LetterCase.CAMEL)
     if k.startswith('Msg'):
         if k.startswith('MsgModuleIO'):
             v._action = k.replace('MsgModuleIO', '')
@@ -36,3 +34,7 @@ for k, v in list(globals().items()):
             v._target = Target.Activity
 
         target_action_mapping[v._target][v._action] = v
+
+# Encoders and decoders of all message classes are compiled
+# once, when the types are imported.
+compile_dataclasses([v for v in list(globals().values()) if is_dataclass(v)])
@@ -19,6 +19,22 @@ class MsgError:
     extended_message: Optional[str] = None
 
 
+@dataclass
+class MsgCancelled:
+    """Target: "activity"
+    Message type: "Cancelled"
+    
+    Sent instead of a response to a request that has been superseded by a newer request
+    with the same supersede key.
+    """
+    """Action of the cancelled request."""
+    action: str
+    """Supersede key of the cancelled request."""
+    supersede_key: str
+    """Target of the cancelled request."""
+    target: str
+
+
 class State(Enum):
     """Current state."""
     BUSY = "busy"
@@ -37,6 +53,35 @@ class MsgExecutionState:
     state: State
 
 
+@dataclass
+class ClientCapabilities:
+    """Data transport features supported by the client."""
+    """Whether the client can receive and send binary buffers attached to the message.
+    If not set or false, binary values are embedded into the message as base64 strings.
+    """
+    binary_buffers: Optional[bool] = None
+    """Compression codecs supported by the client for Arrow IPC payloads ("zstd", "lz4"),
+    in order of preference.
+    """
+    compression: Optional[List[str]] = None
+    """Whether the client can receive "Batch" messages. If not set or false, batched
+    notifications are sent as separate messages.
+    """
+    batches: Optional[bool] = None
+
+
+@dataclass
+class MessagesBatch:
+    """Target: any
+    Message type: "Batch"
+    
+    Notifications published on a target within a short time window, merged and sent
+    together. The client handles the messages in order, as if they were sent separately.
+    """
+    """Message envelopes ("action" and "content") of the batched messages."""
+    messages: List[Any]
+
+
 @dataclass
 class MsgGetSystemInfo:
     """Target: "activity"
@@ -44,6 +89,8 @@ class MsgGetSystemInfo:
     
     Get System information
     """
+    """Data transport features supported by the client."""
+    capabilities: Optional[ClientCapabilities] = None
     fields: Optional[List[str]] = None
 
 
@@ -67,6 +114,67 @@ class MsgSystemInfo:
     """
     """Versions of backend components."""
     versions: Dict[str, Any]
+    """Stats of middleware caches. Included if "caches" field has been requested."""
+    caches: Optional[Dict[str, Any]] = None
+    """Stats of queues of client messages by priority class. Included if "queues" field has
+    been requested.
+    """
+    queues: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class MsgGetMetrics:
+    """Target: "activity"
+    Message type: "GetMetrics"
+    
+    Get latency and payload size metrics of handled messages.
+    """
+    """Reset metrics after they are returned."""
+    reset: Optional[bool] = None
+
+
+@dataclass
+class MetricsHistogram:
+    """Histogram of observed values."""
+    """Upper bounds of buckets. The last bucket has no upper bound and is not listed."""
+    bounds: List[float]
+    """Number of observed values in every bucket (not cumulative), including the last
+    bucket.
+    """
+    counts: List[int]
+    """Number of observed values."""
+    count: int
+    """Sum of observed values."""
+    sum: float
+
+
+@dataclass
+class ActionMetrics:
+    """Metrics of messages of one action on a target."""
+    """Message type."""
+    action: str
+    """Number of handled messages."""
+    count: int
+    """Number of messages that failed with an error."""
+    errors: int
+    """Size of published messages: JSON envelope and binary buffers (bytes)."""
+    payload_bytes: MetricsHistogram
+    """Time spent in every phase of handling (seconds): "decode", "handler", "encode" and
+    "publish".
+    """
+    phases: Dict[str, MetricsHistogram]
+    """Target of the messages."""
+    target: str
+
+
+@dataclass
+class MsgMetrics:
+    """Target: "activity"
+    Message type: "Metrics"
+    
+    Latency and payload size metrics of handled messages.
+    """
+    actions: List[ActionMetrics]
 
 
 @dataclass
@@ -128,6 +236,12 @@ class DataTabularDataFilterCondition:
     operator: Operator
 
 
+class NullPlacement(Enum):
+    """Placement of null values"""
+    FIRST = "first"
+    LAST = "last"
+
+
 class Direction(Enum):
     """sorting direction"""
     ASC = "asc"
@@ -142,6 +256,8 @@ class DataTabularDataSortingMethod:
     column: str
     """sorting direction"""
     direction: Optional[Direction] = None
+    """Placement of null values. Nulls are placed last by default."""
+    null_placement: Optional[NullPlacement] = None
 
 
 @dataclass
@@ -155,6 +271,8 @@ class DataTabularDataFilter:
     Filter applied to the value
     """
     condition: Optional[DataTabularDataFilterCondition] = None
+    """Whether to include stats of columns of the filtered table in stats of the value."""
+    column_stats: Optional[bool] = None
     """Whether to ignore other filter items and return full value."""
     full_value: Optional[bool] = None
     """Offset of the page"""
@@ -162,6 +280,22 @@ class DataTabularDataFilter:
     """Size of the page"""
     page_size: Optional[int] = None
     sorting: Optional[DataTabularDataSortingMethod] = None
+    """Sorting by multiple columns, in order of precedence. Used instead of "sorting" if
+    set.
+    """
+    sorting_keys: Optional[List[DataTabularDataSortingMethod]] = None
+
+
+@dataclass
+class DataStreamOptions:
+    """Options of sending a value in chunks.
+    If set, the value is sent as a sequence of chunk messages followed by a stream end
+    message instead of a single value message.
+    """
+    """Unique ID of the request. Chunks and the stream end message are tagged with it."""
+    request_id: str
+    """Approximate size of a chunk in bytes."""
+    chunk_size: Optional[int] = None
 
 
 @dataclass
@@ -178,6 +312,12 @@ class MsgDataRepositoryGetItemValue:
     which will depend on the data type.
     """
     filter: Optional[DataTabularDataFilter] = None
+    """If set, the value is streamed in chunks."""
+    stream: Optional[DataStreamOptions] = None
+    """Requests with the same supersede key cancel each other: when a new request arrives,
+    the previous one is cancelled and a "Cancelled" message is sent instead of its response.
+    """
+    supersede_key: Optional[str] = None
 
 
 @dataclass
@@ -205,6 +345,43 @@ class MsgDataRepositoryItemValue:
     metadata: Optional[Dict[str, Any]] = None
 
 
+@dataclass
+class MsgDataRepositoryItemValueChunk:
+    """Target: "dataRepository"
+    Message type: "ItemValueChunk"
+    
+    A chunk of a streamed item value.
+    For tables the first chunk contains Arrow IPC schema and the following chunks contain
+    record batches. Concatenated chunks make an Arrow IPC stream.
+    """
+    """ID of the request the value is streamed for."""
+    request_id: str
+    """Sequence number of the chunk, starting from 0."""
+    sequence: int
+    """Type of the value"""
+    type: str
+    """Serialized chunk of the value."""
+    value: Any
+
+
+@dataclass
+class MsgDataRepositoryItemValueStreamEnd:
+    """Target: "dataRepository"
+    Message type: "ItemValueStreamEnd"
+    
+    Indicates that all chunks of a streamed item value have been sent.
+    """
+    """ID of the request the value has been streamed for."""
+    request_id: str
+    """Number of chunks sent."""
+    chunks_count: int
+    """ID of the item."""
+    item_id: str
+    filter: Optional[DataTabularDataFilter] = None
+    """Value metadata. Contains table stats for tables."""
+    metadata: Optional[Dict[str, Any]] = None
+
+
 @dataclass
 class MsgDataRepositoryItems:
     """Target: "dataRepository"
@@ -262,6 +439,16 @@ class MsgModuleIOGetInputValue:
     """Unique ID of the step within the workflow that we are getting parameters for."""
     step_id: str
     filter: Optional[DataTabularDataFilter] = None
+    """ID of the Arrow schema of the value that the client already has.
+    If it matches the schema of the table value, the value is sent without the schema.
+    """
+    schema_id: Optional[str] = None
+    """If set, the value is streamed in chunks."""
+    stream: Optional[DataStreamOptions] = None
+    """Requests with the same supersede key cancel each other: when a new request arrives,
+    the previous one is cancelled and a "Cancelled" message is sent instead of its response.
+    """
+    supersede_key: Optional[str] = None
 
 
 @dataclass
@@ -281,6 +468,16 @@ class MsgModuleIOGetOutputValue:
     """Unique ID of the step within the workflow that we are getting parameters for."""
     step_id: str
     filter: Optional[DataTabularDataFilter] = None
+    """ID of the Arrow schema of the value that the client already has.
+    If it matches the schema of the table value, the value is sent without the schema.
+    """
+    schema_id: Optional[str] = None
+    """If set, the value is streamed in chunks."""
+    stream: Optional[DataStreamOptions] = None
+    """Requests with the same supersede key cancel each other: when a new request arrives,
+    the previous one is cancelled and a "Cancelled" message is sent instead of its response.
+    """
+    supersede_key: Optional[str] = None
 
 
 @dataclass
@@ -314,6 +511,11 @@ class MsgModuleIOInputValue:
     """
     value: Any
     filter: Optional[DataTabularDataFilter] = None
+    """ID of the Arrow schema of a table value.
+    If it is the same as the schema ID in the request, the value is an Arrow IPC stream
+    without the schema message. The client should prepend the schema it already has.
+    """
+    schema_id: Optional[str] = None
     """Stats of the value if applicable. Simple types usually do not include stats.
     Complex ones like table do.
     """
@@ -353,6 +555,11 @@ class MsgModuleIOOutputValue:
     """
     value: Any
     filter: Optional[DataTabularDataFilter] = None
+    """ID of the Arrow schema of a table value.
+    If it is the same as the schema ID in the request, the value is an Arrow IPC stream
+    without the schema message. The client should prepend the schema it already has.
+    """
+    schema_id: Optional[str] = None
     """Stats of the value if applicable. Simple types usually do not include stats.
     Complex ones like table do.
     """
@@ -387,10 +594,106 @@ class MsgModuleIOPreviewUpdated:
     outputs: Dict[str, Any]
 
 
+@dataclass
+class MsgModuleIOUploadAbort:
+    """Target: "moduleIO"
+    Message type: "UploadAbort"
+    
+    Abort an upload and discard the data received so far.
+    """
+    """ID of the upload."""
+    upload_id: str
+
+
+@dataclass
+class MsgModuleIOUploadBegin:
+    """Target: "moduleIO"
+    Message type: "UploadBegin"
+    
+    Start uploading a table value of a step input in chunks.
+    Used for large tables instead of UpdateInputValues.
+    """
+    """ID of the input"""
+    input_id: str
+    """Unique ID of the step within the workflow."""
+    step_id: str
+    """Unique ID of the upload generated by the client."""
+    upload_id: str
+
+
+@dataclass
+class MsgModuleIOUploadChunk:
+    """Target: "moduleIO"
+    Message type: "UploadChunk"
+    
+    A chunk of an uploaded table. Concatenated chunks make an Arrow IPC stream.
+    """
+    """ID of the upload."""
+    upload_id: str
+    """Sequence number of the chunk, starting from 0."""
+    sequence: int
+    """Serialized chunk of the value."""
+    value: Any
+
+
+@dataclass
+class MsgModuleIOUploadCommit:
+    """Target: "moduleIO"
+    Message type: "UploadCommit"
+    
+    Indicates that all chunks of an upload have been sent.
+    The uploaded table is set as the value of the input.
+    """
+    """ID of the upload."""
+    upload_id: str
+
+
+@dataclass
+class MsgModuleIOValueChunk:
+    """Target: "moduleIO"
+    Message type: "ValueChunk"
+    
+    A chunk of a streamed input or output value.
+    For tables the first chunk contains Arrow IPC schema and the following chunks contain
+    record batches. Concatenated chunks make an Arrow IPC stream.
+    """
+    """ID of the request the value is streamed for."""
+    request_id: str
+    """Sequence number of the chunk, starting from 0."""
+    sequence: int
+    """Type of the value"""
+    type: str
+    """Serialized chunk of the value."""
+    value: Any
+
+
+@dataclass
+class MsgModuleIOValueStreamEnd:
+    """Target: "moduleIO"
+    Message type: "ValueStreamEnd"
+    
+    Indicates that all chunks of a streamed input or output value have been sent.
+    """
+    """ID of the request the value has been streamed for."""
+    request_id: str
+    """Number of chunks sent."""
+    chunks_count: int
+    """Unique ID of the step within the workflow."""
+    step_id: str
+    filter: Optional[DataTabularDataFilter] = None
+    """ID of the input. Set if an input value has been streamed."""
+    input_id: Optional[str] = None
+    """ID of the output. Set if an output value has been streamed."""
+    output_id: Optional[str] = None
+    """Stats of the value if applicable."""
+    stats: Optional[Dict[str, Any]] = None
+
+
 class DataType(Enum):
     """Type of the data value."""
     SIMPLE = "simple"
     TABLE = "table"
+    TENSOR = "tensor"
 
 
 @dataclass
@@ -849,11 +1152,37 @@ class MsgWorkflowWorkflowList:
     workflows: List[WorkflowListItem]
 
 
+@dataclass
+class ColumnHistogram:
+    """Histogram of values of a numeric column with bins of equal width"""
+    """Number of values in every bin"""
+    counts: List[int]
+    """Edges of bins: one more than the number of bins"""
+    edges: List[float]
+
+
+@dataclass
+class ColumnStats:
+    """Stats of a table column"""
+    """Number of null values"""
+    null_count: int
+    """Approximate number of distinct non-null values (HyperLogLog estimate)"""
+    distinct_count: Optional[int] = None
+    """Histogram of values of a numeric column"""
+    histogram: Optional[ColumnHistogram] = None
+    """Largest value"""
+    max: Any = None
+    """Smallest value"""
+    min: Any = None
+
+
 @dataclass
 class TableStats:
     """Stats object for arrow table"""
     """Number of rows."""
     rows_count: int
+    """Stats of columns by column name. Included if requested by the filter."""
+    columns: Optional[Dict[str, ColumnStats]] = None
 
 
 @dataclass
@@ -0,0 +1,146 @@
+import base64
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from lumy_middleware.utils.dataclass_compiler import (custom_encoder,
+                                                      encode_value)
+
+# Key of the placeholder object that replaces a binary value in a message
+# when the value is sent as a separate transport buffer:
+# `{"__buffer__": <index of the buffer in the transport message>}`.
+BUFFER_REFERENCE_KEY = '__buffer__'
+
+
+class BinaryData:
+    '''
+    A binary value that is a part of a message.
+
+    Wraps any object that supports the buffer protocol (`bytes`,
+    `memoryview`, `pyarrow.Buffer`, ...) without copying it. Depending on
+    what the client supports, the transport either sends the buffer as is
+    alongside the message or embeds it into the message as a base64 string.
+
+    **NOTE**: Messages are deep copied when converted to dicts. Binary data
+    is treated as immutable and is never copied.
+    '''
+    __slots__ = ('_buffer',)
+
+    def __init__(self, buffer: Any):
+        self._buffer = buffer
+
+    @property
+    def buffer(self) -> Any:
+        return self._buffer
+
+    @property
+    def size(self) -> int:
+        return memoryview(self._buffer).nbytes
+
+    def as_memoryview(self) -> memoryview:
+        return memoryview(self._buffer)
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.as_memoryview()).decode('ascii')
+
+    @staticmethod
+    def from_base64(value: Union[str, bytes]) -> 'BinaryData':
+        return BinaryData(base64.b64decode(value))
+
+    def __copy__(self) -> 'BinaryData':
+        return self
+
+    def __deepcopy__(self, memo: Dict) -> 'BinaryData':
+        return self
+
+    def __repr__(self) -> str:
+        return f'<BinaryData: {self.size} bytes>'
+
+
+def _is_buffer_reference(value: Dict) -> bool:
+    return len(value) == 1 and BUFFER_REFERENCE_KEY in value
+
+
+def split_buffers(msg: Any) -> Tuple[Any, List[memoryview]]:
+    '''
+    Replace binary values in the message with buffer references.
+    Returns the updated message and the list of buffers.
+    '''
+    buffers: List[memoryview] = []
+
+    def val(v):
+        if isinstance(v, BinaryData):
+            buffers.append(v.as_memoryview())
+            return {BUFFER_REFERENCE_KEY: len(buffers) - 1}
+        elif isinstance(v, dict):
+            return {k: val(i) for k, i in v.items()}
+        elif isinstance(v, list):
+            return [val(i) for i in v]
+        return v
+
+    return val(msg), buffers
+
+
+def merge_buffers(msg: Any, buffers: List[Any]) -> Any:
+    '''
+    Replace buffer references in the message with binary values
+    from the list of buffers.
+    '''
+    if not buffers:
+        return msg
+
+    def val(v):
+        if isinstance(v, dict):
+            if _is_buffer_reference(v):
+                return BinaryData(buffers[v[BUFFER_REFERENCE_KEY]])
+            return {k: val(i) for k, i in v.items()}
+        elif isinstance(v, list):
+            return [val(i) for i in v]
+        return v
+
+    return val(msg)
+
+
+def embed_buffers(msg: Any) -> Any:
+    '''
+    Replace binary values in the message with base64 strings.
+    This is a fallback for clients that do not support binary buffers.
+    '''
+    def val(v):
+        if isinstance(v, BinaryData):
+            return v.to_base64()
+        elif isinstance(v, dict):
+            return {k: val(i) for k, i in v.items()}
+        elif isinstance(v, list):
+            return [val(i) for i in v]
+        return v
+
+    return val(msg)
+
+
+def encode_message(
+    msg: Any,
+    binary_buffers: bool,
+    on_binary: Optional[Callable[[BinaryData], None]] = None
+) -> Tuple[Any, List[memoryview]]:
+    '''
+    Convert a message (a dataclass or a dict that may contain dataclasses)
+    into its transport form in a single pass: dataclasses become dicts
+    with camelCase keys, enums are replaced with their values and binary
+    values are either replaced with buffer references (`binary_buffers`
+    is `True`) or embedded as base64 strings.
+    `on_binary` is called with every binary value of the message.
+    Returns the message and the list of buffers.
+    '''
+    buffers: List[memoryview] = []
+
+    def encode_binary(v: Any) -> Any:
+        if not isinstance(v, BinaryData):
+            return v
+        if on_binary is not None:
+            on_binary(v)
+        if not binary_buffers:
+            return v.to_base64()
+        buffers.append(v.as_memoryview())
+        return {BUFFER_REFERENCE_KEY: len(buffers) - 1}
+
+    with custom_encoder(encode_binary):
+        return encode_value(msg), buffers
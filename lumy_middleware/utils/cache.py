@@ -0,0 +1,221 @@
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import asdict, dataclass
+from hashlib import blake2b
+from typing import (Any, Callable, Dict, Generic, Hashable, Optional, Set,
+                    Tuple, TypeVar, cast)
+from weakref import WeakValueDictionary
+
+from lumy_middleware.utils.cancellation import Cancelled
+from lumy_middleware.utils.dataclasses import EnhancedJSONEncoder, to_dict
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+def canonical_hash(obj: Any) -> str:
+    '''
+    Returns a hash of a dataclass, a dict or a JSON compatible value
+    that does not depend on the order of keys.
+    '''
+    if obj is not None and not isinstance(obj, (dict, list, str, int, float)):
+        obj = to_dict(obj)
+    h = blake2b(digest_size=16)
+    h.update(str.encode(
+        json.dumps(obj, sort_keys=True, cls=EnhancedJSONEncoder)))
+    return h.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    # number of entries currently in cache
+    entries: int = 0
+    # size of entries currently in cache
+    size: int = 0
+    max_size: int = 0
+
+
+class LRUCache(Generic[K, V]):
+    '''
+    Least recently used cache with a size budget.
+
+    Every entry has a size (usually in bytes) provided when it is added.
+    Least recently used entries are evicted when the total size of
+    entries exceeds the budget. Entries larger than the budget are not
+    cached.
+
+    Entries can be tagged and invalidated by tag.
+
+    The cache is thread safe.
+    '''
+    _entries: 'OrderedDict[K, Tuple[V, int, Hashable]]'
+    _tags: Dict[Hashable, Set[K]]
+
+    def __init__(self, max_size: int, name: Optional[str] = None):
+        self._entries = OrderedDict()
+        self._tags = defaultdict(set)
+        self._lock = threading.RLock()
+        self._stats = CacheStats(max_size=max_size)
+
+        if name is not None:
+            register_cache(name, self)
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry[0]
+
+    def get_or_create(self,
+                      key: K,
+                      create: Callable[[], Tuple[V, int]],
+                      tag: Hashable = None) -> V:
+        '''
+        Return cached value or create it and add to cache.
+        `create` returns the value and its size.
+        '''
+        value = self.get(key)
+        if value is None:
+            value, size = create()
+            self.put(key, value, size, tag)
+        return value
+
+    def put(self, key: K, value: V, size: int, tag: Hashable = None) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self._stats.max_size:
+                return
+            self._entries[key] = (value, size, tag)
+            self._stats.size += size
+            if tag is not None:
+                self._tags[tag].add(key)
+
+            while self._stats.size > self._stats.max_size:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._stats.evictions += 1
+
+            self._stats.entries = len(self._entries)
+
+    def invalidate(self, tag: Hashable) -> None:
+        '''
+        Remove all entries with tag `tag`.
+        '''
+        with self._lock:
+            for key in list(self._tags.pop(tag, set())):
+                self._remove(key)
+            self._stats.entries = len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._stats.size = 0
+            self._stats.entries = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(**asdict(self._stats))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def _remove(self, key: K) -> None:
+        _, size, tag = self._entries.pop(key)
+        self._stats.size -= size
+        if tag is not None:
+            keys = self._tags.get(tag, None)
+            if keys is not None:
+                keys.discard(key)
+                if len(keys) == 0:
+                    del self._tags[tag]
+
+
+class _Call(Generic[V]):
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[V] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[K, V]):
+    '''
+    Coalesces concurrent calls with the same key: while a value is being
+    computed, callers with the same key wait for it instead of computing
+    it again. The value is not kept after the computation completes.
+    '''
+    _calls: Dict[K, _Call[V]]
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._coalesced = 0
+
+    def do(self, key: K, compute: Callable[[], V]) -> V:
+        with self._lock:
+            call = self._calls.get(key, None)
+            is_leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                self._coalesced += 1
+
+        if not is_leader:
+            call.done.wait()
+            if isinstance(call.error, Cancelled):
+                # the leading request has been superseded,
+                # but this one has not.
+                return self.do(key, compute)
+            if call.error is not None:
+                raise call.error
+            return cast(V, call.result)
+
+        try:
+            call.result = compute()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    @property
+    def coalesced(self) -> int:
+        '''
+        Number of calls that have been served by another call.
+        '''
+        return self._coalesced
+
+
+_caches: 'WeakValueDictionary[str, LRUCache]' = WeakValueDictionary()
+
+
+def register_cache(name: str, cache: LRUCache) -> None:
+    '''
+    Register a cache to make its stats available to the client.
+    '''
+    _caches[name] = cache
+
+
+def get_caches_stats() -> Dict[str, CacheStats]:
+    return {
+        name: cache.stats
+        for name, cache in list(_caches.items())
+    }
@@ -0,0 +1,94 @@
+'''
+Cooperative cancellation of requests.
+
+Requests can carry a supersede key. A newer request with the same key
+cancels the older one: if it is still queued it is not handled at all,
+if it is being handled, long running code (i.e. table filtering) stops
+at the next `check_cancelled` call.
+'''
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Hashable, Iterator, Optional
+
+
+class Cancelled(Exception):
+    '''
+    Raised when a request has been cancelled.
+    '''
+    pass
+
+
+class CancellationToken:
+    __slots__ = ('_event',)
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.is_cancelled:
+            raise Cancelled()
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = \
+    ContextVar('cancellation_token', default=None)
+
+
+@contextmanager
+def cancellation_scope(token: Optional[CancellationToken]) -> Iterator[None]:
+    '''
+    Make `token` the token checked by `check_cancelled` within the scope.
+    '''
+    reset_token = _current_token.set(token)
+    try:
+        yield
+    finally:
+        _current_token.reset(reset_token)
+
+
+def check_cancelled() -> None:
+    '''
+    Raise `Cancelled` if the request being handled has been cancelled.
+    '''
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class SupersedeRegistry:
+    '''
+    Keeps the token of the latest request for every supersede key.
+    '''
+    _tokens: Dict[Hashable, CancellationToken]
+
+    def __init__(self):
+        self._tokens = {}
+        self._lock = threading.Lock()
+
+    def register(self, key: Hashable) -> CancellationToken:
+        '''
+        Returns token of a new request with supersede key `key` and
+        cancels the previous request with this key.
+        '''
+        token = CancellationToken()
+        with self._lock:
+            previous_token = self._tokens.get(key, None)
+            self._tokens[key] = token
+        if previous_token is not None:
+            previous_token.cancel()
+        return token
+
+    def release(self, key: Hashable, token: CancellationToken) -> None:
+        '''
+        Forget the token when the request is complete.
+        '''
+        with self._lock:
+            if self._tokens.get(key, None) is token:
+                del self._tokens[key]
@@ -1,20 +1,90 @@
-import base64
 import logging
+import struct
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Generic, List, TypeVar, Union
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from typing import (Any, Callable, Dict, Generic, Hashable, Iterator, List,
+                    Optional, Tuple, Type, TypeVar, Union)
 
+import numpy as np
+import pandas as pd
 import pyarrow as pa
-from lumy_middleware.types.generated import DataType, DataValueContainer
+from lumy_middleware.types.generated import (ClientCapabilities, DataType,
+                                             DataValueContainer)
+from lumy_middleware.utils.binary import BinaryData
+from lumy_middleware.utils.dictionary_encoding import \
+    dictionary_encode_low_cardinality
+from stevedore import ExtensionManager
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 W = TypeVar('W')
 
+# Compression codecs supported by Arrow IPC format.
+IPC_COMPRESSION_CODECS = ['zstd', 'lz4']
+# Alternative names clients may use for the codecs above.
+IPC_COMPRESSION_CODECS_ALIASES = {
+    'lz4_frame': 'lz4'
+}
+# Tables smaller than this (uncompressed, in bytes) are not compressed.
+# Compressing them does not make the payload much smaller but costs time.
+DEFAULT_COMPRESSION_THRESHOLD = 64 * 1024
+# Default size of a chunk (uncompressed, in bytes) when a value is streamed.
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class CodecOptions:
+    '''
+    Options of serializing a value for a particular client.
+    '''
+    # Compression codecs accepted by the client in order of preference.
+    compression: List[str] = field(default_factory=list)
+    compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD
+    # Dictionary encode low cardinality string columns of tables.
+    dictionary_encoding: bool = True
+    # ID of the serialized value. Decisions that depend on the data
+    # (i.e. dictionary encoding of columns) are cached by it.
+    value_id: Optional[Hashable] = None
+
+    @staticmethod
+    def for_client(capabilities: ClientCapabilities) -> 'CodecOptions':
+        return CodecOptions(compression=capabilities.compression or [])
+
+
+_compression_availability_cache: Dict[str, bool] = {}
+
+
+def is_compression_available(name: str) -> bool:
+    if name not in _compression_availability_cache:
+        _compression_availability_cache[name] = \
+            name in IPC_COMPRESSION_CODECS and pa.Codec.is_available(name)
+    return _compression_availability_cache[name]
+
+
+def pick_compression(
+    options: Optional[CodecOptions],
+    size: int
+) -> Optional[str]:
+    '''
+    Pick the first compression codec accepted by the client that is
+    available in this environment. `None` means no compression.
+    '''
+    if options is None or size < options.compression_threshold:
+        return None
+    for name in options.compression:
+        name = name.lower()
+        name = IPC_COMPRESSION_CODECS_ALIASES.get(name, name)
+        if is_compression_available(name):
+            return name
+    return None
+
 
 class Codec(Generic[T, W], ABC):
     @abstractmethod
-    def serialize(self, value: T) -> W:
+    def serialize(self, value: T, options: Optional[CodecOptions] = None) -> W:
         ...
 
     @abstractmethod
@@ -25,21 +95,132 @@ class Codec(Generic[T, W], ABC):
     def supports(self, value: Any) -> bool:
         ...
 
+    def serialize_chunks(self,
+                         value: T,
+                         chunk_size: int,
+                         options: Optional[CodecOptions] = None
+                         ) -> Iterator[W]:
+        '''
+        Serialize value in chunks of roughly `chunk_size` bytes.
+        Codecs that do not support chunking return the whole value
+        as a single chunk.
+        '''
+        yield self.serialize(value, options)
+
+
+class _ChunksSink:
+    '''
+    A writable file-like object that keeps the data written to it
+    until it is drained.
+    '''
+    closed = False
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data: Any) -> int:
+        self._parts.append(bytes(data))
+        return len(self._parts[-1])
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
 
-class TableCodec(Codec[pa.Table, str]):
-    def serialize(self, value: pa.Table) -> str:
+TableWireFormat = Union[BinaryData, str, bytes]
+
+
+class TableCodec(Codec[pa.Table, TableWireFormat]):
+    '''
+    Serializes tables into Arrow IPC stream format.
+
+    The serialized stream is returned as binary data backed by the
+    Arrow buffer it has been written to. The transport decides whether
+    to send it as a binary buffer or as a base64 string.
+    '''
+
+    def _prepare(self,
+                 value: pa.Table,
+                 options: Optional[CodecOptions]) -> pa.Table:
+        if options is None:
+            return dictionary_encode_low_cardinality(value)
+        if options.dictionary_encoding:
+            return dictionary_encode_low_cardinality(value, options.value_id)
+        return value
+
+    def serialize(self,
+                  value: pa.Table,
+                  options: Optional[CodecOptions] = None) -> TableWireFormat:
+        value = self._prepare(value, options)
         sink = pa.BufferOutputStream()
 
-        writer = pa.ipc.new_stream(sink, value.schema)
+        compression = pick_compression(options, value.nbytes)
+        write_options = pa.ipc.IpcWriteOptions(compression=compression)
+
+        writer = pa.ipc.new_stream(sink, value.schema, options=write_options)
         writer.write(value)
         writer.close()
 
-        val = sink.getvalue().to_pybytes()
-        return base64.b64encode(val).decode('ascii')
+        return BinaryData(sink.getvalue())
+
+    def serialize_chunks(self,
+                         value: pa.Table,
+                         chunk_size: int,
+                         options: Optional[CodecOptions] = None
+                         ) -> Iterator[TableWireFormat]:
+        '''
+        Serialize table into a sequence of Arrow IPC stream chunks.
+        The first chunk contains the schema, every following chunk
+        contains record batches (and dictionaries they need) and the
+        last one contains the end of stream marker. Concatenated chunks
+        make a valid Arrow IPC stream.
+
+        Chunks are serialized lazily, so that only one chunk at a time
+        is kept in memory.
+        '''
+        value = self._prepare(value, options)
+        sink = _ChunksSink()
+
+        compression = pick_compression(options, value.nbytes)
+        write_options = pa.ipc.IpcWriteOptions(compression=compression)
+        writer = pa.ipc.new_stream(sink, value.schema, options=write_options)
+
+        schema = value.schema.serialize().to_pybytes()
+        schema_sent = False
 
-    def deserialize(self, value: str) -> pa.Table:
-        table_bytes = base64.b64decode(value)
-        src = pa.BufferReader(table_bytes)
+        def drain() -> Iterator[TableWireFormat]:
+            nonlocal schema_sent
+            data = sink.drain()
+            if not schema_sent and len(data) > 0:
+                # Writer emits schema together with the first batch.
+                schema_sent = True
+                if data.startswith(schema):
+                    yield BinaryData(schema)
+                    data = data[len(schema):]
+            if len(data) > 0:
+                yield BinaryData(data)
+
+        rows_per_chunk = max(
+            1, chunk_size * value.num_rows // max(value.nbytes, 1))
+        for batch in value.to_batches(max_chunksize=rows_per_chunk):
+            writer.write_batch(batch)
+            yield from drain()
+        writer.close()
+        yield from drain()
+
+    def deserialize(self, value: TableWireFormat) -> pa.Table:
+        if isinstance(value, str):
+            value = BinaryData.from_base64(value)
+        if isinstance(value, BinaryData):
+            value = value.buffer
+        src = pa.BufferReader(pa.py_buffer(value))
         reader = pa.ipc.open_stream(src)
         return reader.read_all()
 
@@ -47,42 +228,286 @@ class TableCodec(Codec[pa.Table, str]):
         return isinstance(value, pa.Table)
 
 
+class TensorCodec(Codec[np.ndarray, BinaryData]):
+    '''
+    Serializes numeric NumPy arrays into Arrow tensor IPC format.
+    '''
+
+    def serialize(self,
+                  value: np.ndarray,
+                  options: Optional[CodecOptions] = None) -> BinaryData:
+        tensor = pa.Tensor.from_numpy(value)
+        sink = pa.BufferOutputStream()
+        pa.ipc.write_tensor(tensor, sink)
+        return BinaryData(sink.getvalue())
+
+    def deserialize(self, value: TableWireFormat) -> np.ndarray:
+        if isinstance(value, str):
+            value = BinaryData.from_base64(value)
+        if isinstance(value, BinaryData):
+            value = value.buffer
+        src = pa.BufferReader(pa.py_buffer(value))
+        return pa.ipc.read_tensor(src).to_numpy()
+
+    def supports(self, value: Any) -> bool:
+        # Arrow tensors support numeric types only
+        return isinstance(value, np.ndarray) \
+            and (np.issubdtype(value.dtype, np.number)
+                 or np.issubdtype(value.dtype, np.bool_))
+
+
+class AsTableCodec(Codec[Any, TableWireFormat]):
+    '''
+    Serializes tabular values by converting them to an Arrow table
+    (without copying data where possible) and serializing the table.
+    Serialized values are deserialized as Arrow tables.
+    '''
+    _table_codec = TableCodec()
+
+    def __init__(self, value_type: Type, as_table: Callable[[Any], pa.Table]):
+        self._value_type = value_type
+        self._as_table = as_table
+
+    def serialize(self,
+                  value: Any,
+                  options: Optional[CodecOptions] = None) -> TableWireFormat:
+        return self._table_codec.serialize(self._as_table(value), options)
+
+    def serialize_chunks(self,
+                         value: Any,
+                         chunk_size: int,
+                         options: Optional[CodecOptions] = None
+                         ) -> Iterator[TableWireFormat]:
+        return self._table_codec.serialize_chunks(
+            self._as_table(value), chunk_size, options)
+
+    def deserialize(self, value: TableWireFormat) -> pa.Table:
+        return self._table_codec.deserialize(value)
+
+    def supports(self, value: Any) -> bool:
+        return isinstance(value, self._value_type)
+
+
+# Arrow IPC encapsulated message starts with a continuation marker
+# followed by the size of the message metadata.
+IPC_CONTINUATION_MARKER = 0xFFFFFFFF
+IPC_MESSAGE_PREFIX = struct.Struct('<Ii')
+
+
+def split_table_schema(
+    value: BinaryData
+) -> Tuple[Optional[str], BinaryData]:
+    '''
+    Split Arrow IPC stream into the schema message and the rest of
+    the stream (record batches and dictionaries).
+
+    Returns ID of the schema and the stream without the schema message.
+    Schema ID is a hash of the schema message, so it is the same for
+    all tables with the same schema.
+    If the stream does not start with a schema message, `None` and
+    the original stream are returned.
+    '''
+    buffer = pa.py_buffer(value.buffer)
+    if buffer.size < IPC_MESSAGE_PREFIX.size:
+        return (None, value)
+    marker, metadata_size = IPC_MESSAGE_PREFIX.unpack_from(buffer)
+    if marker != IPC_CONTINUATION_MARKER or metadata_size <= 0:
+        return (None, value)
+
+    # Schema message has no body
+    schema_size = IPC_MESSAGE_PREFIX.size + metadata_size
+    h = blake2b(digest_size=16)
+    h.update(memoryview(buffer)[:schema_size])
+    return (h.hexdigest(), BinaryData(buffer.slice(schema_size)))
+
+
 SupportedSimpleTypes = Union[Dict, List, float, int, str, bool]
-SupportedSimpleTypesClasses = (list, dict, float, int, str, bool)
+SupportedSimpleTypesClasses = (list, dict, float, int, str, bool, type(None))
 
 
 class SimpleValueCodec(Codec[Any, SupportedSimpleTypes]):
-    def serialize(self, value: Any) -> SupportedSimpleTypes:
+    def serialize(self,
+                  value: Any,
+                  options: Optional[CodecOptions] = None
+                  ) -> SupportedSimpleTypes:
         return value
 
     def deserialize(self, value: Any) -> SupportedSimpleTypes:
         return value
 
     def supports(self, value: Any) -> bool:
-        return isinstance(value, SupportedSimpleTypesClasses) or value is None
+        return isinstance(value, SupportedSimpleTypesClasses)
 
 
-CODECS: Dict[DataType, Codec] = {
-    DataType.TABLE: TableCodec(),
-    DataType.SIMPLE: SimpleValueCodec()
-}
+class NumpyScalarCodec(SimpleValueCodec):
+    '''
+    Serializes NumPy scalars as their Python counterparts.
+    '''
+
+    def serialize(self,
+                  value: Any,
+                  options: Optional[CodecOptions] = None
+                  ) -> SupportedSimpleTypes:
+        return value.item()
+
+    def supports(self, value: Any) -> bool:
+        return isinstance(value, np.generic)
+
 
+RegisteredCodec = Tuple[DataType, Codec]
 
-def serialize(value: Any) -> DataValueContainer:
+
+class CodecRegistry:
+    '''
+    Codecs registry.
+
+    Codecs are registered for value classes. A codec for a value
+    is looked up by the exact class of the value first and then by
+    classes from its MRO. Result of the lookup is cached per class.
+
+    Every data type also has one codec that is used to deserialize
+    values of this type coming from the client.
+
+    Codecs can be provided by third party packages via "lumy.codecs"
+    entry point. The entry point should reference a function that
+    accepts the registry and registers codecs in it:
+
+    'lumy.codecs': [
+        'my_codecs = my_package.codecs:register_codecs'
+    ]
+    '''
+    _codecs: Dict[Type, RegisteredCodec]
+    _decoders: Dict[DataType, Codec]
+    _lookup_cache: Dict[Type, Optional[RegisteredCodec]]
+    _plugins_loaded: bool
+
+    def __init__(self):
+        self._codecs = {}
+        self._decoders = {}
+        self._lookup_cache = {}
+        self._plugins_loaded = False
+        self._plugins_lock = threading.Lock()
+
+    def register(self,
+                 value_type: Type,
+                 data_type: DataType,
+                 codec: Codec,
+                 is_decoder: bool = False) -> None:
+        '''
+        Register codec for values of class `value_type`.
+        If `is_decoder` is set, the codec is used to deserialize values
+        of `data_type`. The first registered codec of a data type is
+        its decoder by default.
+        '''
+        self._codecs[value_type] = (data_type, codec)
+        if is_decoder or data_type not in self._decoders:
+            self._decoders[data_type] = codec
+        self._lookup_cache = {}
+
+    def find(self, value: Any) -> Optional[RegisteredCodec]:
+        self._ensure_plugins_loaded()
+
+        value_type = type(value)
+        if value_type not in self._lookup_cache:
+            self._lookup_cache[value_type] = next(
+                (
+                    self._codecs[t]
+                    for t in value_type.__mro__
+                    if t in self._codecs
+                ),
+                None
+            )
+        registered_codec = self._lookup_cache[value_type]
+        if registered_codec is None or not registered_codec[1].supports(value):
+            return None
+        return registered_codec
+
+    def get_decoder(self, data_type: DataType) -> Optional[Codec]:
+        self._ensure_plugins_loaded()
+        return self._decoders.get(data_type, None)
+
+    def reset_plugins(self) -> None:
+        '''
+        Make sure plugins are loaded again on next use.
+        Needed after new packages have been installed.
+        '''
+        self._plugins_loaded = False
+
+    def _ensure_plugins_loaded(self) -> None:
+        if self._plugins_loaded:
+            return
+        # values are not looked up until all plugin codecs are registered
+        with self._plugins_lock:
+            if self._plugins_loaded:
+                return
+            mgr = ExtensionManager(
+                namespace='lumy.codecs',
+                invoke_on_load=False,
+                propagate_map_exceptions=True
+            )
+            for extension in mgr:
+                try:
+                    extension.plugin(self)
+                except Exception:
+                    logger.exception(
+                        f'Could not register codecs from "{extension.name}"')
+            self._lookup_cache = {}
+            self._plugins_loaded = True
+
+
+CODECS = CodecRegistry()
+CODECS.register(pa.Table, DataType.TABLE, TableCodec())
+CODECS.register(pa.RecordBatch, DataType.TABLE, AsTableCodec(
+    pa.RecordBatch, lambda b: pa.Table.from_batches([b])))
+CODECS.register(pa.ChunkedArray, DataType.TABLE, AsTableCodec(
+    pa.ChunkedArray, lambda a: pa.table({'values': a})))
+CODECS.register(pa.Array, DataType.TABLE, AsTableCodec(
+    pa.Array, lambda a: pa.table({'values': a})))
+CODECS.register(pd.DataFrame, DataType.TABLE, AsTableCodec(
+    pd.DataFrame, pa.Table.from_pandas))
+CODECS.register(np.ndarray, DataType.TENSOR, TensorCodec())
+for simple_type in SupportedSimpleTypesClasses:
+    CODECS.register(simple_type, DataType.SIMPLE, SimpleValueCodec())
+CODECS.register(np.generic, DataType.SIMPLE, NumpyScalarCodec())
+
+
+def _find_codec(value: Any) -> RegisteredCodec:
+    registered_codec = CODECS.find(value)
+    if registered_codec is None:
+        raise Exception(
+            f'No codec found that supports {value} ({type(value)})')
+    return registered_codec
+
+
+def serialize(
+    value: Any,
+    options: Optional[CodecOptions] = None
+) -> DataValueContainer:
     '''
     Serialize any value to wire format.
     '''
-    for data_type, codec in CODECS.items():
-        if codec.supports(value):
-            return DataValueContainer(data_type, codec.serialize(value))
-    raise Exception(f'No codec found that supports {value} ({type(value)})')
+    data_type, codec = _find_codec(value)
+    return DataValueContainer(data_type, codec.serialize(value, options))
+
+
+def serialize_chunks(
+    value: Any,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    options: Optional[CodecOptions] = None
+) -> Iterator[DataValueContainer]:
+    '''
+    Serialize any value to wire format in chunks.
+    '''
+    data_type, codec = _find_codec(value)
+    for chunk in codec.serialize_chunks(value, chunk_size, options):
+        yield DataValueContainer(data_type, chunk)
 
 
 def deserialize(container: DataValueContainer) -> Any:
     '''
     Deserialize any value from wire format.
     '''
-    codec = CODECS.get(container.data_type, None)
+    codec = CODECS.get_decoder(container.data_type)
     if codec is None:
         raise Exception(f'No codec found for type {container.data_type.value}')
     return codec.deserialize(container.value)
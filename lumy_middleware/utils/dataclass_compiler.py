@@ -0,0 +1,297 @@
+'''
+Compiles specialized encoders and decoders for dataclasses.
+
+`dataclasses_json` inspects fields and their types every time a message is
+converted. Here the inspection is done once per class: the source of an
+encoding and a decoding function is generated from the field types and
+executed. Generated functions map field names to camelCase keys, flatten
+enums to their values and call encoders/decoders of nested dataclasses
+directly.
+
+Encoding rules match `dataclasses_json` `to_dict` with camelCase keys except
+for enums which are replaced with their values (as they are on the wire).
+'''
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import MISSING, fields, is_dataclass
+from enum import Enum
+from typing import (Any, Callable, Dict, Iterator, List, Optional, Tuple,
+                    Type, Union, get_type_hints)
+
+from stringcase import camelcase
+
+Encoder = Callable[[Any], Dict[str, Any]]
+Decoder = Callable[[Dict[str, Any]], Any]
+
+PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
+_MISSING = object()
+
+# Namespace shared by all generated functions. Encoders and decoders
+# of dataclasses are referred to by name and resolved when called, which
+# makes (mutually) recursive types work.
+_namespace: Dict[str, Any] = {'_MISSING': _MISSING}
+_compiled: Dict[Type, Tuple[str, str]] = {}
+# id of an object -> its name in the namespace
+_names: Dict[int, str] = {}
+_lock = threading.RLock()
+
+# Encoder of values of types not known to the compiler.
+_custom_encoder: ContextVar[Optional[Callable[[Any], Any]]] = \
+    ContextVar('custom_encoder', default=None)
+
+
+@contextmanager
+def custom_encoder(encoder: Callable[[Any], Any]) -> Iterator[None]:
+    '''
+    Use `encoder` for values of types not known to the compiler
+    (anything other than JSON types, enums and dataclasses) encoded
+    within the context. This lets the caller transform such values
+    in the same pass.
+    '''
+    token = _custom_encoder.set(encoder)
+    try:
+        yield
+    finally:
+        _custom_encoder.reset(token)
+
+
+def encode_value(value: Any) -> Any:
+    '''
+    Encode a value of unknown type.
+    '''
+    if isinstance(value, PRIMITIVE_TYPES):
+        return value
+    if isinstance(value, Enum):
+        return value.value
+    if is_dataclass(value) and not isinstance(value, type):
+        return get_encoder(type(value))(value)
+    if isinstance(value, dict):
+        return {encode_value(k): encode_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [encode_value(v) for v in value]
+    encoder = _custom_encoder.get()
+    return value if encoder is None else encoder(value)
+
+
+def _decode_union(
+    value: Any,
+    dataclass_types: List[Type]
+) -> Any:
+    if not isinstance(value, dict):
+        return value
+    for cls in dataclass_types:
+        try:
+            return get_decoder(cls)(value)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            pass
+    return value
+
+
+_namespace['_encode_value'] = encode_value
+_namespace['_decode_union'] = _decode_union
+
+
+def get_origin(t: Any) -> Any:
+    # `typing.get_origin` is not available in Python 3.7
+    return getattr(t, '__origin__', None)
+
+
+def get_args(t: Any) -> Tuple:
+    return getattr(t, '__args__', None) or ()
+
+
+def _unwrap_optional(t: Any) -> Tuple[Any, bool]:
+    if get_origin(t) is Union:
+        args = [a for a in get_args(t) if a is not type(None)]  # noqa: E721
+        if len(args) < len(get_args(t)):
+            if len(args) == 1:
+                return args[0], True
+            return Union[tuple(args)], True
+    return t, False
+
+
+def _register(name: str, value: Any) -> str:
+    with _lock:
+        key = _names.get(id(value), None)
+        if key is None:
+            key = f'_{name}_{len(_namespace)}'
+            _namespace[key] = value
+            _names[id(value)] = key
+        return key
+
+
+def _encode_expression(t: Any, v: str, depth: int = 0) -> str:
+    '''
+    Returns an expression encoding `v` of type `t`.
+    '''
+    t, is_optional = _unwrap_optional(t)
+    expression = _encode_non_optional_expression(t, v, depth)
+    if is_optional and expression != v:
+        return f'(None if {v} is None else {expression})'
+    return expression
+
+
+def _encode_non_optional_expression(t: Any, v: str, depth: int) -> str:
+    if t in PRIMITIVE_TYPES:
+        return v
+    if isinstance(t, type) and issubclass(t, Enum):
+        cls_name = _register(t.__name__, t)
+        return f'({v}.value if {v}.__class__ is {cls_name} ' \
+            f'else _encode_value({v}))'
+    if isinstance(t, type) and is_dataclass(t):
+        cls_name = _register(t.__name__, t)
+        encoder_name, _ = _compile(t)
+        return f'({encoder_name}({v}) if {v}.__class__ is {cls_name} ' \
+            f'else _encode_value({v}))'
+
+    origin, args = get_origin(t), get_args(t)
+    item = f'i{depth}'
+    if origin in (list, List) and len(args) == 1:
+        item_expression = _encode_expression(args[0], item, depth + 1)
+        if item_expression == item:
+            return f'list({v})'
+        return f'[{item_expression} for {item} in {v}]'
+    if origin in (dict, Dict) and len(args) == 2 and args[0] is str:
+        item_expression = _encode_expression(args[1], item, depth + 1)
+        key = f'k{depth}'
+        return f'{{{key}: {item_expression} for {key}, {item} ' \
+            f'in {v}.items()}}'
+    return f'_encode_value({v})'
+
+
+def _decode_expression(t: Any, v: str, depth: int = 0) -> str:
+    '''
+    Returns an expression decoding `v` into type `t`.
+    '''
+    t, is_optional = _unwrap_optional(t)
+    expression = _decode_non_optional_expression(t, v, depth)
+    if is_optional and expression != v:
+        return f'(None if {v} is None else {expression})'
+    return expression
+
+
+def _decode_non_optional_expression(t: Any, v: str, depth: int) -> str:
+    if t in PRIMITIVE_TYPES or t is Any:
+        return v
+    if isinstance(t, type) and issubclass(t, Enum):
+        cls_name = _register(t.__name__, t)
+        return f'{cls_name}({v})'
+    if isinstance(t, type) and is_dataclass(t):
+        cls_name = _register(t.__name__, t)
+        _, decoder_name = _compile(t)
+        return f'({v} if isinstance({v}, {cls_name}) ' \
+            f'else {decoder_name}({v}))'
+
+    origin, args = get_origin(t), get_args(t)
+    item = f'i{depth}'
+    if origin in (list, List) and len(args) == 1:
+        item_expression = _decode_expression(args[0], item, depth + 1)
+        if item_expression == item:
+            return f'list({v})'
+        return f'[{item_expression} for {item} in {v}]'
+    if origin in (dict, Dict) and len(args) == 2:
+        item_expression = _decode_expression(args[1], item, depth + 1)
+        if item_expression == item:
+            return f'dict({v})'
+        key = f'k{depth}'
+        return f'{{{key}: {item_expression} for {key}, {item} ' \
+            f'in {v}.items()}}'
+    if origin is Union:
+        dataclass_types = [
+            a for a in args if isinstance(a, type) and is_dataclass(a)]
+        if len(dataclass_types) == 0:
+            return v
+        types_name = _register('union', dataclass_types)
+        return f'_decode_union({v}, {types_name})'
+    return v
+
+
+def _generate_encoder(cls: Type, name: str) -> str:
+    hints = get_type_hints(cls)
+    lines = [f'def {name}(o):']
+    items = []
+    for idx, f in enumerate(fields(cls)):
+        expression = _encode_expression(hints[f.name], f'v{idx}')
+        if expression == f'v{idx}':
+            expression = f'o.{f.name}'
+        else:
+            # read the attribute once
+            lines.append(f'    v{idx} = o.{f.name}')
+        items.append(f'        {camelcase(f.name)!r}: {expression},')
+    return '\n'.join(lines + ['    return {'] + items + ['    }'])
+
+
+def _generate_decoder(cls: Type, name: str) -> str:
+    hints = get_type_hints(cls)
+    cls_name = _register(cls.__name__, cls)
+    lines = [f'def {name}(d):', '    kw = {}']
+    for f in fields(cls):
+        if not f.init:
+            continue
+        key = camelcase(f.name)
+        lines.append(f'    v = d.get({key!r}, _MISSING)')
+        if key != f.name:
+            lines.append('    if v is _MISSING:')
+            lines.append(f'        v = d.get({f.name!r}, _MISSING)')
+        lines.append('    if v is not _MISSING:')
+        expression = _decode_expression(hints[f.name], 'v')
+        lines.append(f'        kw[{f.name!r}] = {expression}')
+        if f.default is MISSING and f.default_factory is MISSING:
+            lines.append('    else:')
+            lines.append(
+                f'        raise KeyError("{cls.__name__}: '
+                f'missing required field \\"{key}\\"")')
+    lines.append(f'    return {cls_name}(**kw)')
+    return '\n'.join(lines)
+
+
+def _compile(cls: Type) -> Tuple[str, str]:
+    '''
+    Compiles encoder and decoder of a dataclass and returns their names
+    in the generated functions namespace.
+    '''
+    with _lock:
+        names = _compiled.get(cls, None)
+        if names is not None:
+            return names
+
+        suffix = f'{cls.__name__}_{len(_compiled)}'
+        names = (f'encode_{suffix}', f'decode_{suffix}')
+        # Registered before generating code for fields to stop recursion
+        # on recursive types.
+        _compiled[cls] = names
+
+        for source in (_generate_encoder(cls, names[0]),
+                       _generate_decoder(cls, names[1])):
+            exec(compile(source, f'<dataclass {cls.__name__}>', 'exec'),
+                 _namespace)
+
+        cls._lumy_encoder = _namespace[names[0]]
+        cls._lumy_decoder = _namespace[names[1]]
+        return names
+
+
+def get_encoder(cls: Type) -> Encoder:
+    encoder = cls.__dict__.get('_lumy_encoder', None)
+    if encoder is None:
+        _compile(cls)
+        encoder = cls.__dict__['_lumy_encoder']
+    return encoder
+
+
+def get_decoder(cls: Type) -> Decoder:
+    decoder = cls.__dict__.get('_lumy_decoder', None)
+    if decoder is None:
+        _compile(cls)
+        decoder = cls.__dict__['_lumy_decoder']
+    return decoder
+
+
+def compile_dataclasses(classes: List[Type]) -> None:
+    '''
+    Compile encoders and decoders of dataclasses ahead of time.
+    '''
+    for cls in classes:
+        _compile(cls)
@@ -4,7 +4,7 @@ from enum import Enum
 from typing import IO, Any, Dict, Optional, Type, TypeVar, Union, cast
 
 import yaml
-from dataclasses_json import LetterCase, dataclass_json
+from lumy_middleware.utils.dataclass_compiler import get_decoder, get_encoder
 from pydantic import BaseModel  # pylint: disable=no-name-in-module
 from stringcase import camelcase
 
@@ -17,10 +17,6 @@ except ImportError:
 T = TypeVar('T')
 
 
-def is_dataclass_json(data):
-    return hasattr(data, 'to_dict')
-
-
 def from_yaml(
     data_class: Type[T],
     yaml_content: Union[bytes, IO[bytes], str, IO[str]]
@@ -29,15 +25,6 @@ def from_yaml(
     return from_dict(data_class, content)
 
 
-def __ensure_dataclass_json_instance(obj: T) -> T:
-    assert is_dataclass(obj), f'Expected {obj} to be a dataclass'
-    if isinstance(obj, type):
-        return dataclass_json(obj, letter_case=LetterCase.CAMEL)
-    else:
-        dataclass_json(obj.__class__, letter_case=LetterCase.CAMEL)
-        return obj
-
-
 def is_pydantic(obj: Any):
     return isinstance(obj, BaseModel)  # pytype: disable=wrong-arg-types
 
@@ -60,10 +47,7 @@ def to_dict(data: Any) -> Optional[Dict]:
     if data is None:
         return None
     if is_dataclass(data):
-        if is_dataclass_json(data):
-            return data.to_dict()
-        else:
-            return __ensure_dataclass_json_instance(data).to_dict()
+        return get_encoder(type(data))(data)
     elif is_pydantic(data):
         return cast(Dict, pydantic_to_dict(data))
     return dict(data)
@@ -75,12 +59,7 @@ def from_dict(
 ) -> T:
     assert is_dataclass(
         data_class), f'Expected type {data_class} to be a dataclass'
-
-    if not is_dataclass_json(data):
-        cls = __ensure_dataclass_json_instance(data_class)
-    else:
-        cls = data_class
-    return cast(Any, cls).from_dict(data)
+    return get_decoder(data_class)(data)
 
 
 class EnhancedJSONEncoder(json.JSONEncoder):
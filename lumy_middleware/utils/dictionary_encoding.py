@@ -0,0 +1,77 @@
+from typing import Hashable, Optional
+
+import pyarrow as pa
+from lumy_middleware.utils.cache import LRUCache
+
+# Tables with fewer rows are sent as they are: encoding does not pay off.
+MIN_ROWS = 1000
+# Number of values sampled to estimate cardinality of a column.
+SAMPLE_SIZE = 1024
+# A column is encoded if the ratio of distinct values in the sample
+# is lower than this.
+MAX_DISTINCT_RATIO = 0.5
+
+# Encoding decisions keyed by value ID and column name. Pages of the same
+# value share the decision.
+# Every entry has size 1, so the cache size is the number of entries.
+_decisions: LRUCache[Hashable, bool] = LRUCache(4096, name='cardinality')
+
+
+def is_string_column(column: pa.ChunkedArray) -> bool:
+    return pa.types.is_string(column.type) \
+        or pa.types.is_large_string(column.type)
+
+
+def has_low_cardinality(column: pa.ChunkedArray) -> bool:
+    '''
+    Estimate whether the column has few distinct values by
+    counting distinct values in an evenly spaced sample.
+    '''
+    size = len(column)
+    if size == 0:
+        return False
+    step = max(1, size // SAMPLE_SIZE)
+    sample = column.take(pa.array(range(0, size, step)))
+    return len(sample.unique()) < MAX_DISTINCT_RATIO * len(sample)
+
+
+def should_encode(column: pa.ChunkedArray,
+                  key: Optional[Hashable] = None) -> bool:
+    '''
+    Whether to encode the column. The decision is cached by `key`
+    if it is set.
+    '''
+    if not is_string_column(column):
+        return False
+    if key is None:
+        return has_low_cardinality(column)
+    return _decisions.get_or_create(
+        key,
+        lambda: (has_low_cardinality(column), 1)
+    )
+
+
+def dictionary_encode_low_cardinality(
+    table: pa.Table,
+    value_id: Optional[Hashable] = None
+) -> pa.Table:
+    '''
+    Dictionary encode string columns with low cardinality.
+    Dictionary encoded columns are decoded transparently by Arrow
+    readers and are much smaller on the wire when values repeat.
+    If `value_id` is set, decisions are cached for the columns of the value.
+    '''
+    if table.num_rows < MIN_ROWS:
+        return table
+
+    for idx, (name, column) in enumerate(
+            zip(table.column_names, table.columns)):
+        key = (value_id, name) if value_id is not None else None
+        if should_encode(column, key):
+            encoded_column = column.dictionary_encode()
+            table = table.set_column(
+                idx,
+                table.schema.field(idx).with_type(encoded_column.type),
+                encoded_column
+            )
+    return table
@@ -0,0 +1,247 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Number of threads handling client messages.
+# `0` means messages are handled synchronously on the transport thread.
+DEFAULT_WORKERS = int(os.environ.get('LUMY_WORKERS', 4))
+
+# Seconds of waiting that make up for one priority level. A task waits
+# at most this long for every level of priority difference before it
+# runs ahead of newer tasks with higher priority.
+DEFAULT_AGING = float(os.environ.get('LUMY_PRIORITY_AGING', 2.0))
+
+
+class Priority(IntEnum):
+    '''
+    Priority classes of tasks. Lower value runs first.
+    '''
+    INTERACTIVE = 0
+    MUTATION = 1
+    DEFAULT = 2
+    HEAVY = 3
+
+
+def priority_name(priority: int) -> str:
+    try:
+        return Priority(priority).name.lower()
+    except ValueError:
+        return str(priority)
+
+
+@dataclass
+class QueueStats:
+    # tasks waiting to run
+    queued: int = 0
+    # max number of tasks waiting to run at the same time
+    max_queued: int = 0
+    running: int = 0
+    completed: int = 0
+    # time spent by completed tasks in queue (seconds)
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+Task = Callable[[], None]
+
+
+@dataclass
+class _QueuedTask:
+    key: Hashable
+    task: Task
+    priority: int
+    submitted_at: float
+    shared: bool
+
+
+@dataclass
+class _KeyState:
+    # tasks waiting for running tasks with the same key
+    waiting: Deque[_QueuedTask]
+    # number of tasks with this key that are ready or running
+    active: int = 0
+    # whether active tasks are shared
+    shared: bool = False
+
+
+class OrderedExecutor:
+    '''
+    Runs tasks on a bounded pool of threads. Tasks submitted with the
+    same key run one at a time in the order they were submitted. Tasks
+    with different keys run concurrently.
+
+    Consecutive shared tasks (i.e. reads) with the same key may run
+    concurrently. They run after all tasks with the same key submitted
+    before them and before all tasks submitted after them, except that
+    a shared task moves ahead of waiting tasks with the same key that
+    are ranked lower.
+
+    When all threads are busy, tasks ready to run are picked by priority.
+    A task is ranked as if it had been submitted `aging` seconds later
+    for every level of priority, so low priority tasks are not starved
+    by a stream of high priority tasks.
+    '''
+    # A key is present while a task with this key is queued or running.
+    _keys: Dict[Hashable, _KeyState]
+    # heap of (rank, sequence number, task) of tasks ready to run
+    _ready: List[Tuple[float, int, _QueuedTask]]
+    _stats: Dict[int, QueueStats]
+    _threads: List[threading.Thread]
+
+    def __init__(self,
+                 max_workers: int = DEFAULT_WORKERS,
+                 name: str = 'lumy',
+                 aging: float = DEFAULT_AGING):
+        self._max_workers = max_workers
+        self._name = name
+        self._aging = aging
+        self._keys = {}
+        self._ready = []
+        self._stats = {}
+        self._threads = []
+        self._idle_workers = 0
+        self._sequence = itertools.count()
+        self._is_shutdown = False
+        self._condition = threading.Condition()
+
+    def submit(self,
+               key: Hashable,
+               task: Task,
+               priority: int = Priority.DEFAULT,
+               shared: bool = False) -> None:
+        queued_task = _QueuedTask(
+            key, task, int(priority), time.monotonic(), shared)
+        with self._condition:
+            if self._is_shutdown:
+                raise RuntimeError('Executor has been shut down')
+            stats = self._get_stats(queued_task.priority)
+            stats.queued += 1
+            stats.max_queued = max(stats.max_queued, stats.queued)
+
+            state = self._keys.get(key, None)
+            if state is None:
+                state = self._keys[key] = _KeyState(deque())
+            self._enqueue(state, queued_task)
+            self._start_waiting(state)
+
+    def stats(self) -> Dict[int, QueueStats]:
+        '''
+        Queue statistics by priority.
+        '''
+        with self._condition:
+            return {
+                priority: QueueStats(**vars(stats))
+                for priority, stats in self._stats.items()
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._condition:
+            self._is_shutdown = True
+            self._idle_workers = 0
+            self._condition.notify_all()
+        if wait:
+            for thread in list(self._threads):
+                thread.join()
+
+    def _get_stats(self, priority: int) -> QueueStats:
+        stats = self._stats.get(priority, None)
+        if stats is None:
+            stats = self._stats[priority] = QueueStats()
+        return stats
+
+    def _rank(self, queued_task: _QueuedTask) -> float:
+        return queued_task.submitted_at + queued_task.priority * self._aging
+
+    def _enqueue(self, state: _KeyState, queued_task: _QueuedTask) -> None:
+        position = len(state.waiting)
+        if queued_task.shared:
+            # a read does not change what the tasks it overtakes see
+            rank = self._rank(queued_task)
+            while position > 0 \
+                    and rank < self._rank(state.waiting[position - 1]):
+                position -= 1
+        state.waiting.insert(position, queued_task)
+
+    def _push_ready(self, queued_task: _QueuedTask) -> None:
+        heapq.heappush(
+            self._ready,
+            (self._rank(queued_task), next(self._sequence), queued_task))
+
+        if self._idle_workers > 0:
+            # the woken up worker is not idle any more
+            self._idle_workers -= 1
+            self._condition.notify()
+        elif len(self._threads) < self._max_workers:
+            thread = threading.Thread(
+                target=self._work,
+                name=f'{self._name}_{len(self._threads)}',
+                daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_task(self) -> Optional[_QueuedTask]:
+        with self._condition:
+            while len(self._ready) == 0:
+                if self._is_shutdown:
+                    return None
+                self._idle_workers += 1
+                self._condition.wait()
+            _, _, queued_task = heapq.heappop(self._ready)
+
+            wait = time.monotonic() - queued_task.submitted_at
+            stats = self._get_stats(queued_task.priority)
+            stats.queued -= 1
+            stats.running += 1
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+            return queued_task
+
+    def _complete(self, queued_task: _QueuedTask) -> None:
+        with self._condition:
+            stats = self._get_stats(queued_task.priority)
+            stats.running -= 1
+            stats.completed += 1
+
+            state = self._keys[queued_task.key]
+            state.active -= 1
+            self._start_waiting(state)
+            if state.active == 0:
+                del self._keys[queued_task.key]
+
+    def _start_waiting(self, state: _KeyState) -> None:
+        '''
+        Make waiting tasks ready to run if they do not conflict with
+        active tasks with the same key.
+        '''
+        while len(state.waiting) > 0:
+            queued_task = state.waiting[0]
+            can_start = state.active == 0 or \
+                (state.shared and queued_task.shared)
+            if not can_start:
+                return
+            state.waiting.popleft()
+            state.active += 1
+            state.shared = queued_task.shared
+            self._push_ready(queued_task)
+
+    def _work(self) -> None:
+        while True:
+            queued_task = self._next_task()
+            if queued_task is None:
+                return
+            try:
+                queued_task.task()
+            except Exception:
+                logger.exception(
+                    f'Unhandled error in task with key "{queued_task.key}"')
+            finally:
+                self._complete(queued_task)
@@ -1,12 +1,76 @@
 import datetime
 import json
-from typing import Any
+from dataclasses import fields, is_dataclass
+from enum import Enum
+from typing import Any, Iterator
+
+from lumy_middleware.utils.binary import BinaryData
+from stringcase import camelcase
+
+# Default length of a message preview in logs
+PREVIEW_LENGTH = 1000
 
 
 def _datetime_aware_converter(o):
     if isinstance(o, datetime.datetime):
         return o.__str__()
+    if isinstance(o, BinaryData):
+        return repr(o)
 
 
 def object_as_json(j: Any) -> str:
     return json.dumps(j, default=_datetime_aware_converter)
+
+
+def _json_parts(j: Any, max_length: int) -> Iterator[str]:
+    if is_dataclass(j) and not isinstance(j, type):
+        j = {camelcase(f.name): getattr(j, f.name) for f in fields(j)}
+    elif isinstance(j, Enum):
+        j = j.value
+
+    if isinstance(j, dict):
+        yield '{'
+        for idx, (k, v) in enumerate(j.items()):
+            yield f'{", " if idx > 0 else ""}{json.dumps(str(k))}: '
+            yield from _json_parts(v, max_length)
+        yield '}'
+    elif isinstance(j, (list, tuple)):
+        yield '['
+        for idx, v in enumerate(j):
+            if idx > 0:
+                yield ', '
+            yield from _json_parts(v, max_length)
+        yield ']'
+    elif isinstance(j, str):
+        # long strings (i.e. base64 encoded values) are cut
+        # before they are serialized
+        yield json.dumps(j[:max_length])
+    else:
+        yield object_as_json(j)
+
+
+class JsonPreview:
+    '''
+    JSON representation of an object cut to `max_length` characters.
+    The representation is built when the preview is converted to string
+    and only the beginning of the object needed for the preview is
+    serialized. Pass it to the logger as an argument to avoid doing any
+    work when the message is not logged:
+
+    `logger.debug('Message: %s', JsonPreview(msg))`
+    '''
+    __slots__ = ('_obj', '_max_length')
+
+    def __init__(self, obj: Any, max_length: int = PREVIEW_LENGTH):
+        self._obj = obj
+        self._max_length = max_length
+
+    def __str__(self) -> str:
+        length = 0
+        parts = []
+        for part in _json_parts(self._obj, self._max_length):
+            parts.append(part)
+            length += len(part)
+            if length > self._max_length:
+                return ''.join(parts)[:self._max_length - 3] + '...'
+        return ''.join(parts)
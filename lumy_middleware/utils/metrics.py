@@ -0,0 +1,225 @@
+'''
+Latency and payload size metrics of handled messages.
+'''
+import bisect
+import logging
+import os
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from lumy_middleware.types.generated import ActionMetrics, MetricsHistogram
+
+logger = logging.getLogger(__name__)
+
+# Path of a Prometheus text file metrics are written to periodically
+# (i.e. for the node exporter textfile collector). Not written if unset.
+METRICS_FILE = os.environ.get('LUMY_METRICS_FILE', None)
+# Seconds between writes of the metrics file
+METRICS_INTERVAL = float(os.environ.get('LUMY_METRICS_INTERVAL', 15))
+
+# Phases of handling of a message
+DECODE = 'decode'
+HANDLER = 'handler'
+ENCODE = 'encode'
+PUBLISH = 'publish'
+
+LATENCY_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                  0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PAYLOAD_BOUNDS = tuple(float(1024 * 4 ** i) for i in range(11))  # 1K..1G
+
+MetricsKey = Tuple[str, str]  # target, action
+
+
+class Histogram:
+    '''
+    Counts of observed values in buckets with fixed upper bounds.
+    Not thread safe.
+    '''
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_message(self) -> MetricsHistogram:
+        return MetricsHistogram(
+            bounds=list(self.bounds),
+            counts=list(self.counts),
+            count=self.count,
+            sum=self.sum
+        )
+
+
+class _Metrics:
+    __slots__ = ('count', 'errors', 'phases', 'payload_bytes')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.phases: Dict[str, Histogram] = {}
+        self.payload_bytes = Histogram(PAYLOAD_BOUNDS)
+
+
+class MetricsRegistry:
+    '''
+    Metrics of messages by target and action. Thread safe.
+    '''
+    _metrics: Dict[MetricsKey, _Metrics]
+
+    def __init__(self):
+        self._metrics = defaultdict(_Metrics)
+        self._lock = threading.Lock()
+
+    def count(self, key: MetricsKey, error: bool = False) -> None:
+        with self._lock:
+            metrics = self._metrics[key]
+            metrics.count += 1
+            if error:
+                metrics.errors += 1
+
+    def observe_phase(self, key: MetricsKey, phase: str,
+                      seconds: float) -> None:
+        with self._lock:
+            phases = self._metrics[key].phases
+            histogram = phases.get(phase, None)
+            if histogram is None:
+                histogram = phases[phase] = Histogram(LATENCY_BOUNDS)
+            histogram.observe(seconds)
+
+    def observe_payload(self, key: MetricsKey, size: int) -> None:
+        with self._lock:
+            self._metrics[key].payload_bytes.observe(size)
+
+    def snapshot(self, reset: bool = False) -> List[ActionMetrics]:
+        with self._lock:
+            snapshot = [
+                ActionMetrics(
+                    target=target,
+                    action=action,
+                    count=metrics.count,
+                    errors=metrics.errors,
+                    phases={
+                        phase: histogram.as_message()
+                        for phase, histogram in metrics.phases.items()
+                    },
+                    payload_bytes=metrics.payload_bytes.as_message()
+                )
+                for (target, action), metrics in sorted(self._metrics.items())
+            ]
+            if reset:
+                self._metrics.clear()
+            return snapshot
+
+    def to_prometheus(self) -> str:
+        '''
+        Metrics in Prometheus text exposition format.
+        '''
+        return ''.join(_prometheus_lines(self.snapshot()))
+
+    def write_prometheus(self, path: Path) -> None:
+        '''
+        Write metrics to a Prometheus text file. The file is replaced
+        atomically so readers never see a partially written file.
+        '''
+        tmp_path = path.with_name(f'.{path.name}.tmp')
+        tmp_path.write_text(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _labels(**labels: str) -> str:
+    escaped = (
+        '{}="{}"'.format(
+            k, v.replace('\\', '\\\\').replace('"', '\\"'))
+        for k, v in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _histogram_lines(name: str,
+                     histogram: MetricsHistogram,
+                     **labels: str) -> Iterator[str]:
+    cumulative = 0
+    bounds = [str(b) for b in histogram.bounds] + ['+Inf']
+    for bound, count in zip(bounds, histogram.counts):
+        cumulative += count
+        yield f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}\n'
+    yield f'{name}_sum{_labels(**labels)} {histogram.sum}\n'
+    yield f'{name}_count{_labels(**labels)} {histogram.count}\n'
+
+
+def _prometheus_lines(snapshot: List[ActionMetrics]) -> Iterator[str]:
+    yield '# HELP lumy_messages_total Handled messages.\n'
+    yield '# TYPE lumy_messages_total counter\n'
+    for m in snapshot:
+        labels = _labels(target=m.target, action=m.action)
+        yield f'lumy_messages_total{labels} {m.count}\n'
+
+    yield '# HELP lumy_message_errors_total Messages failed with an error.\n'
+    yield '# TYPE lumy_message_errors_total counter\n'
+    for m in snapshot:
+        labels = _labels(target=m.target, action=m.action)
+        yield f'lumy_message_errors_total{labels} {m.errors}\n'
+
+    yield '# HELP lumy_message_phase_seconds ' \
+        'Time spent in a phase of handling of a message.\n'
+    yield '# TYPE lumy_message_phase_seconds histogram\n'
+    for m in snapshot:
+        for phase, histogram in m.phases.items():
+            yield from _histogram_lines(
+                'lumy_message_phase_seconds', histogram,
+                target=m.target, action=m.action, phase=phase)
+
+    yield '# HELP lumy_message_payload_bytes ' \
+        'Size of published messages: JSON envelope and buffers.\n'
+    yield '# TYPE lumy_message_payload_bytes histogram\n'
+    for m in snapshot:
+        yield from _histogram_lines(
+            'lumy_message_payload_bytes', m.payload_bytes,
+            target=m.target, action=m.action)
+
+
+class PrometheusFileExporter:
+    '''
+    Writes metrics to a Prometheus text file every `interval` seconds
+    on a daemon thread.
+    '''
+
+    def __init__(self,
+                 registry: MetricsRegistry,
+                 path: Path,
+                 interval: float = METRICS_INTERVAL):
+        self._registry = registry
+        self._path = path
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name='lumy_metrics', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._write()
+
+    def _write(self) -> None:
+        try:
+            self._registry.write_prometheus(self._path)
+        except Exception:
+            logger.exception(f'Could not write metrics to "{self._path}"')
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self._write()
@@ -0,0 +1,109 @@
+'''
+Recording of traces of client sessions.
+
+A trace is a JSON lines file. The first line is a header, every other
+line is a message received from the client (`"direction": "in"`, with
+its content, binary values embedded as base64 strings) or a message
+published to the client (`"direction": "out"`, only its size in
+bytes). `t` is the number of seconds since the recording started.
+
+Traces are replayed with `benchmark.replay`.
+'''
+import datetime
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from lumy_middleware.target import Target
+from lumy_middleware.utils.binary import encode_message
+from lumy_middleware.utils.json import object_as_json
+
+# Path of a trace file all client sessions are recorded to.
+# Not recorded if unset.
+TRACE_FILE = os.environ.get('LUMY_TRACE_FILE', None)
+
+TRACE_VERSION = 1
+
+INBOUND = 'in'
+OUTBOUND = 'out'
+
+
+@dataclass
+class TraceRecord:
+    t: float
+    direction: str
+    target: Target
+    action: str
+    # content of inbound messages
+    content: Optional[Any] = None
+    # size of outbound messages (bytes)
+    size: Optional[int] = None
+
+
+class TraceRecorder:
+    '''
+    Appends messages to a trace file. Thread safe.
+    '''
+
+    def __init__(self, path: Path):
+        self._started_at = time.monotonic()
+        self._lock = threading.Lock()
+        # line buffered: records are not lost if the process is killed
+        self._file = open(path, 'w', buffering=1, encoding='utf-8')
+        self._write({
+            'trace': TRACE_VERSION,
+            'startedAt': datetime.datetime.now().isoformat()
+        })
+
+    def record_inbound(self, target: Target, msg: Any) -> None:
+        msg_envelope, _ = encode_message(msg, False)
+        self._write({
+            't': time.monotonic() - self._started_at,
+            'direction': INBOUND,
+            'target': target.value,
+            'action': msg_envelope.get('action'),
+            'content': msg_envelope.get('content'),
+        })
+
+    def record_outbound(self, target: Target, action: str,
+                        size: int) -> None:
+        self._write({
+            't': time.monotonic() - self._started_at,
+            'direction': OUTBOUND,
+            'target': target.value,
+            'action': action,
+            'size': size,
+        })
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def _write(self, record: Any) -> None:
+        line = object_as_json(record)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + '\n')
+
+
+def read_trace(path: Path) -> Iterator[TraceRecord]:
+    with open(path, encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('trace') != TRACE_VERSION:
+            raise ValueError(f'Unsupported trace file: "{path}"')
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield TraceRecord(
+                t=record['t'],
+                direction=record['direction'],
+                target=Target(record['target']),
+                action=record['action'],
+                content=record.get('content', None),
+                size=record.get('size', None),
+            )
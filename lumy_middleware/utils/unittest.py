@@ -12,9 +12,21 @@ class ControllerTestCase(unittest.IsolatedAsyncioTestCase):
         self._old_log_level = logging.getLogger().getEffectiveLevel()
         logging.getLogger().setLevel(logging.WARN)
 
-        self.controller = StandaloneController()
+        self.controller = self.create_controller()
+
+    def create_controller(self) -> StandaloneController:
+        '''
+        Override to configure the controller, i.e. to handle messages
+        on an executor.
+        '''
+        return StandaloneController()
+
+    async def asyncTearDown(self):
+        # wait for async handlers started from async tests
+        await self.controller.drain()
 
     def tearDown(self):
+        self.controller.shutdown()
         del self.controller
         logging.getLogger().setLevel(self._old_log_level)
 
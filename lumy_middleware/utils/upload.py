@@ -0,0 +1,126 @@
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Dict, Union
+
+import pyarrow as pa
+from lumy_middleware.utils.binary import BinaryData
+
+logger = logging.getLogger(__name__)
+
+
+def get_spool_dir() -> Path:
+    '''
+    Returns directory where uploaded data is spooled.
+
+    **NOTE** Spool directory can be overridden via an
+    environmental variable.
+    '''
+    override_path = os.environ.get('LUMY_SPOOL_DIR')
+    if override_path is not None:
+        path = Path(override_path)
+    else:
+        path = Path(tempfile.gettempdir()) / 'lumy-uploads'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+@dataclass
+class Upload:
+    id: str
+    path: Path
+    file: IO[bytes]
+    # sequence number of the next expected chunk
+    next_sequence: int = 0
+
+
+class UploadSpool:
+    '''
+    Receives a table from the client in chunks without keeping
+    the whole table in memory.
+
+    Chunks are parts of an Arrow IPC stream (concatenated chunks make
+    a valid stream). They are appended to a file in the spool directory
+    as they arrive. When the upload is committed, the table is read
+    from the memory mapped file, so its buffers are backed by the map
+    rather than by the process memory.
+    '''
+    _uploads: Dict[str, Upload]
+
+    def __init__(self):
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def begin(self, upload_id: str) -> None:
+        with self._lock:
+            if upload_id in self._uploads:
+                raise Exception(f'Upload "{upload_id}" already started')
+            # upload ID comes from the client and is not used in the path
+            fd, path = tempfile.mkstemp(
+                prefix='upload-', suffix='.arrows', dir=get_spool_dir())
+            self._uploads[upload_id] = Upload(
+                id=upload_id,
+                path=Path(path),
+                file=os.fdopen(fd, 'wb')
+            )
+
+    def append(self,
+               upload_id: str,
+               sequence: int,
+               chunk: Union[BinaryData, str]) -> None:
+        upload = self._get_upload(upload_id)
+        try:
+            if sequence != upload.next_sequence:
+                raise Exception(
+                    f'Upload "{upload_id}": expected chunk '
+                    f'{upload.next_sequence}, received {sequence}')
+
+            if isinstance(chunk, str):
+                chunk = BinaryData.from_base64(chunk)
+            upload.file.write(chunk.as_memoryview())
+        except Exception:
+            # a failed upload cannot be resumed
+            self.abort(upload_id)
+            raise
+        upload.next_sequence += 1
+
+    def commit(self, upload_id: str) -> pa.Table:
+        upload = self._pop_upload(upload_id)
+        upload.file.close()
+        try:
+            source = pa.memory_map(str(upload.path), 'r')
+            return pa.ipc.open_stream(source).read_all()
+        finally:
+            self._remove_file(upload)
+
+    def abort(self, upload_id: str) -> None:
+        upload = self._pop_upload(upload_id)
+        upload.file.close()
+        self._remove_file(upload)
+
+    def _get_upload(self, upload_id: str) -> Upload:
+        with self._lock:
+            upload = self._uploads.get(upload_id, None)
+        if upload is None:
+            raise Exception(f'Unknown upload "{upload_id}"')
+        return upload
+
+    def _pop_upload(self, upload_id: str) -> Upload:
+        with self._lock:
+            upload = self._uploads.pop(upload_id, None)
+        if upload is None:
+            raise Exception(f'Unknown upload "{upload_id}"')
+        return upload
+
+    def _remove_file(self, upload: Upload) -> None:
+        # On POSIX systems the memory map stays valid after the file is
+        # unlinked. Elsewhere the file is left in the spool directory.
+        if os.name != 'posix':
+            return
+        try:
+            upload.path.unlink()
+        except OSError:
+            logger.warning(f'Could not remove spool file {upload.path}')
@@ -0,0 +1,253 @@
+'''
+Watchdog of slow requests.
+
+When handling of a client message takes longer than a threshold, the
+stack of the thread handling it is sampled until the message is handled.
+Threads that work on the request on its behalf (see `watched`) are
+sampled too.
+The samples are then written as a collapsed stack profile (one
+`frame;frame;...;frame count` line per stack) that can be rendered with
+flamegraph tools. The root frame is the action of the message with its
+anonymized content.
+'''
+import datetime
+import functools
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import FrameType
+from typing import (Any, Callable, Dict, Iterator, List, Optional, Tuple,
+                    TypeVar)
+
+logger = logging.getLogger(__name__)
+
+# Seconds a request is handled for before its stack is sampled.
+# The watchdog is disabled if unset.
+WATCHDOG_THRESHOLD = os.environ.get('LUMY_WATCHDOG_THRESHOLD', None)
+# Milliseconds between stack samples
+WATCHDOG_INTERVAL = float(os.environ.get('LUMY_WATCHDOG_INTERVAL', 10))
+
+T = TypeVar('T')
+
+# Watchdog and ID of the request being handled, if it is watched.
+watched_request: ContextVar[Optional[Tuple['Watchdog', int]]] = \
+    ContextVar('lumy_watched_request', default=None)
+
+
+def get_profiles_dir() -> Path:
+    '''
+    Returns directory where profiles of slow requests are written.
+
+    **NOTE** Profiles directory can be overridden via an
+    environmental variable.
+    '''
+    override_path = os.environ.get('LUMY_WATCHDOG_DIR')
+    if override_path is not None:
+        path = Path(override_path)
+    else:
+        path = Path(tempfile.gettempdir()) / 'lumy-profiles'
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def anonymize(value: Any) -> str:
+    '''
+    Shape of a message content without its values:
+    `{stepId: str, filter: {pageSize: int}}`.
+    '''
+    if isinstance(value, dict):
+        items = ', '.join(f'{k}: {anonymize(v)}' for k, v in value.items())
+        return '{' + items + '}'
+    if isinstance(value, list):
+        return f'list[{len(value)}]'
+    if value is None:
+        return 'null'
+    return type(value).__name__
+
+
+def collapse_stack(frame: Optional[FrameType]) -> List[str]:
+    '''
+    Frames of the stack from the outermost one.
+    '''
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        frames.append(f'{code.co_name} ({filename}:{frame.f_lineno})')
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def watched(fn: Callable[..., T]) -> Callable[..., T]:
+    '''
+    Wrap a function that is run on another thread (i.e. in an executor)
+    on behalf of the request handled in the current context, so that
+    stacks of this thread are sampled with the request while the function
+    runs. The function is returned as is if the request is not watched.
+    '''
+    current = watched_request.get()
+    if current is None:
+        return fn
+    watchdog, request_id = current
+
+    @functools.wraps(fn)
+    def _watched(*args: Any, **kwargs: Any) -> T:
+        with watchdog.attach(request_id):
+            return fn(*args, **kwargs)
+    return _watched
+
+
+@dataclass
+class WatchedRequest:
+    label: str
+    started_at: float
+    # thread ID -> number of times the thread is attached to the request
+    threads: Counter = field(default_factory=Counter)
+    samples: Counter = field(default_factory=Counter)
+
+
+class Watchdog:
+    '''
+    Samples stacks of threads handling requests that take longer than
+    `threshold` seconds every `interval` milliseconds.
+    '''
+    _requests: Dict[int, WatchedRequest]
+
+    def __init__(self,
+                 threshold: float,
+                 interval: float = WATCHDOG_INTERVAL,
+                 profiles_dir: Optional[Path] = None):
+        self._threshold = threshold
+        self._interval = interval / 1000
+        self._profiles_dir = profiles_dir
+        self._requests = {}
+        self._ids = itertools.count()
+        self._condition = threading.Condition()
+        self._is_shutdown = False
+        self._thread = threading.Thread(
+            target=self._run, name='lumy_watchdog', daemon=True)
+        self._thread.start()
+
+    def watch(self, action: str, content: Any) -> int:
+        '''
+        Start watching a request handled on the current thread.
+        Returns an ID of the request to pass to `done`.
+        '''
+        request = WatchedRequest(
+            label=f'{action}({anonymize(content)})'.replace(';', ','),
+            started_at=time.monotonic())
+        request.threads[threading.get_ident()] += 1
+        with self._condition:
+            request_id = next(self._ids)
+            self._requests[request_id] = request
+            self._condition.notify()
+        return request_id
+
+    @contextmanager
+    def attach(self, request_id: int) -> Iterator[None]:
+        '''
+        Sample the current thread with the request within the block.
+        Does nothing if the request is done.
+        '''
+        thread_id = threading.get_ident()
+        with self._condition:
+            request = self._requests.get(request_id)
+            if request is not None:
+                request.threads[thread_id] += 1
+        try:
+            yield
+        finally:
+            if request is not None:
+                with self._condition:
+                    self._release(request, thread_id)
+
+    def detach(self, request_id: int) -> None:
+        '''
+        Stop sampling the current thread with the request, i.e. when
+        the rest of the request is handled by a coroutine.
+        '''
+        with self._condition:
+            request = self._requests.get(request_id)
+            if request is not None:
+                self._release(request, threading.get_ident())
+
+    def done(self, request_id: int) -> Optional[Path]:
+        '''
+        Stop watching the request. Returns path of the profile if
+        the request was slow.
+        '''
+        with self._condition:
+            request = self._requests.pop(request_id)
+        if len(request.samples) == 0:
+            return None
+
+        duration = time.monotonic() - request.started_at
+        try:
+            path = self._write_profile(request)
+        except Exception:
+            logger.exception(f'Could not write profile of "{request.label}"')
+            return None
+        logger.warning('Slow request %s took %.1f s, profile: %s',
+                       request.label, duration, path)
+        return path
+
+    def shutdown(self) -> None:
+        with self._condition:
+            self._is_shutdown = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _release(self, request: WatchedRequest, thread_id: int) -> None:
+        request.threads[thread_id] -= 1
+        if request.threads[thread_id] <= 0:
+            del request.threads[thread_id]
+
+    def _write_profile(self, request: WatchedRequest) -> Path:
+        profiles_dir = self._profiles_dir or get_profiles_dir()
+        timestamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        action = request.label.split('(', 1)[0]
+        path = profiles_dir / f'{timestamp}-{action}.folded'
+        path.write_text(''.join(
+            f'{request.label};{stack} {count}\n'
+            for stack, count in request.samples.items()
+        ))
+        return path
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._is_shutdown:
+                    return
+                now = time.monotonic()
+                slow = [
+                    r for r in self._requests.values()
+                    if now - r.started_at >= self._threshold
+                ]
+                if len(slow) == 0:
+                    # sleep until the oldest request becomes slow
+                    started_at = min(
+                        (r.started_at for r in self._requests.values()),
+                        default=None)
+                    self._condition.wait(
+                        None if started_at is None
+                        else started_at + self._threshold - now)
+                    continue
+
+                frames = sys._current_frames()
+                for request in slow:
+                    for thread_id in request.threads:
+                        stack = collapse_stack(frames.get(thread_id))
+                        if stack:
+                            request.samples[';'.join(stack)] += 1
+                del frames
+            time.sleep(self._interval)
@@ -32,8 +32,10 @@ setup_args = dict(
         'kiara[all]==0.1.0',
         'kiara_modules.core==0.1.0',
         'pandas>=1.2.4',
+        'numpy>=1.19',
         'appdirs>=1.4.4',
         'stevedore>=3.3.0',
+        'websockets>=13.0',
     ],
     zip_safe=False,
     include_package_data=True,
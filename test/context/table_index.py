@@ -0,0 +1,96 @@
+import unittest
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from lumy_middleware.context.kiara.table_index import (SORTED, TRIGRAM,
+                                                       SortedIndex,
+                                                       TrigramIndex,
+                                                       get_index,
+                                                       invalidate_indexes)
+from lumy_middleware.context.kiara.table_utils import condition_mask
+from lumy_middleware.types.generated import (DataTabularDataFilterCondition,
+                                             DataTabularDataFilterItem,
+                                             Operator)
+
+
+class TestIndexes(unittest.TestCase):
+
+    def setUp(self):
+        self.names = pa.array(
+            ['Alpha', 'beta', None, 'ALPHABET', 'Straße', 'gamma', 'alp'])
+        self.sizes = pa.array([3.0, None, float('nan'), 1.0, 2.0, 3.0, 5.0])
+
+    def rows(self, mask):
+        return [idx for idx, is_set in enumerate(mask) if is_set]
+
+    def test_sorted_index(self):
+        index = SortedIndex(self.sizes)
+        self.assertEqual(
+            self.rows(index.is_in([3.0], match_nulls=False)), [0, 5])
+        self.assertEqual(
+            self.rows(index.is_in([None, 1.0], match_nulls=True)), [1, 3])
+        self.assertEqual(
+            self.rows(index.range(lower=2.0, lower_inclusive=False)),
+            [0, 5, 6])
+        self.assertEqual(self.rows(index.range(upper=float('nan'))), [])
+
+        index = SortedIndex(self.names.dictionary_encode())
+        self.assertEqual(self.rows(index.prefix('alp')), [6])
+        self.assertEqual(
+            self.rows(index.range(lower='a', upper='c')), [1, 6])
+
+    def test_trigram_index(self):
+        index = TrigramIndex(self.names)
+        self.assertEqual(
+            self.rows(index.contains('lph', ignore_case=False)), [0])
+        self.assertEqual(
+            self.rows(index.contains('LPH', ignore_case=True)), [0, 3])
+        self.assertEqual(
+            self.rows(index.contains('al', ignore_case=True)), [0, 3, 6])
+        self.assertEqual(
+            self.rows(index.contains('aße', ignore_case=False)), [4])
+        self.assertEqual(
+            self.rows(index.contains('xyz', ignore_case=True)), [])
+
+
+class TestIndexedFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.table = pa.table({
+            'name': [f'Node {i % 37}' for i in range(500)],
+            'size': [None if i % 11 == 0 else i % 17 for i in range(500)],
+        })
+        invalidate_indexes('table')
+
+    def test_index_built_after_repeated_scans(self):
+        column = self.table.column('name')
+        for _ in range(2):
+            self.assertIsNone(
+                get_index(TRIGRAM, 't2', 'name', column, 'table'))
+        self.assertIsInstance(
+            get_index(TRIGRAM, 't2', 'name', column, 'table'), TrigramIndex)
+
+        invalidate_indexes('table')
+        self.assertIsNone(get_index(TRIGRAM, 't2', 'name', column, 'table'))
+
+    def test_indexed_filter_matches_scan(self):
+        for item in [
+            ('name', 'contains', 'de 3'),
+            ('name', 'containsIgnoreCase', 'NODE 1'),
+            ('name', 'startsWith', 'Node 2'),
+            ('name', 'in', ['Node 1', 'Node 5']),
+            ('size', '>=', 9),
+            ('size', '=', 3),
+            ('size', 'lessThan', 4),
+        ]:
+            condition = DataTabularDataFilterCondition(
+                items=[DataTabularDataFilterItem(*item)],
+                operator=Operator.AND)
+            expected = pc.fill_null(
+                condition_mask(self.table, condition), False)
+            for _ in range(4):
+                mask = condition_mask(
+                    self.table, condition, table_id='t1', tag='table')
+                self.assertEqual(pc.fill_null(mask, False).to_pylist(),
+                                 expected.to_pylist(), item)
+        self.assertIsNotNone(get_index(SORTED, 't1', 'size', None, 'table'))
@@ -0,0 +1,80 @@
+import unittest
+
+import numpy as np
+import pyarrow as pa
+from lumy_middleware.context.kiara.table_stats import (HyperLogLog,
+                                                       _hashes, column_stats,
+                                                       table_stats)
+from lumy_middleware.context.kiara.table_utils import (
+    _row_indices_cache, invalidate_table_views, view_stats)
+from lumy_middleware.types.generated import (DataTabularDataFilterCondition,
+                                             DataTabularDataFilterItem,
+                                             Operator)
+
+
+class TestHyperLogLog(unittest.TestCase):
+
+    def test_estimates_distinct_count(self):
+        for values in [
+            pa.array(np.arange(50000) % 20000),
+            pa.array([f'value {i % 20000}' for i in range(50000)]),
+            pa.array(np.arange(50000) % 20000 / 3),
+        ]:
+            sketch = HyperLogLog()
+            sketch.add(_hashes(values))
+            self.assertLess(abs(sketch.count() - 20000), 20000 * 0.05)
+
+    def test_small_counts(self):
+        sketch = HyperLogLog()
+        sketch.add(_hashes(pa.array(['a', '', 'a', 'abcdefghij', None])))
+        self.assertEqual(sketch.count(), 3)
+
+
+class TestTableStats(unittest.TestCase):
+
+    def setUp(self):
+        self.table = pa.table({
+            'size': [1.0, None, 4.0, 2.5, float('nan'), 4.0],
+            'name': pa.array(
+                ['a', 'b', None, 'a', 'c', 'a']).dictionary_encode(),
+            'tags': [['x'], [], None, ['y'], ['x'], []],
+        })
+        invalidate_table_views('table')
+
+    def test_column_stats(self):
+        stats = table_stats(self.table, bins=3)
+
+        self.assertEqual(stats['size'].null_count, 1)
+        self.assertEqual((stats['size'].min, stats['size'].max), (1.0, 4.0))
+        self.assertEqual(stats['size'].histogram.counts, [1, 1, 2])
+        self.assertEqual(stats['size'].histogram.edges, [1.0, 2.0, 3.0, 4.0])
+
+        self.assertEqual(stats['name'].distinct_count, 3)
+        self.assertEqual((stats['name'].min, stats['name'].max), ('a', 'c'))
+        self.assertIsNone(stats['name'].histogram)
+
+        self.assertEqual(stats['tags'].null_count, 1)
+        self.assertIsNone(stats['tags'].distinct_count)
+
+    def test_histogram_of_narrow_range_of_large_integers(self):
+        stats = column_stats(
+            pa.chunked_array([pa.array([10**16], pa.int64())]))
+        self.assertEqual(stats.histogram.counts, [1])
+        self.assertEqual(stats.histogram.edges, [1e16, 1e16])
+
+        stats = column_stats(pa.chunked_array(
+            [pa.array([10**16, 10**16 + 3, None], pa.int64())]), bins=10)
+        self.assertEqual(sum(stats.histogram.counts), 2)
+
+    def test_view_stats_cached_with_selection(self):
+        condition = DataTabularDataFilterCondition(
+            items=[DataTabularDataFilterItem('name', 'equals', 'a')],
+            operator=Operator.AND)
+        stats = view_stats(self.table, condition, 't1', 'table')
+        self.assertEqual((stats['size'].min, stats['size'].max), (1.0, 4.0))
+        self.assertEqual(stats['name'].distinct_count, 1)
+
+        hits = _row_indices_cache.stats.hits
+        self.assertEqual(
+            view_stats(self.table, condition, 't1', 'table'), stats)
+        self.assertEqual(_row_indices_cache.stats.hits, hits + 1)
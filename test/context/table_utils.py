@@ -0,0 +1,167 @@
+import unittest
+
+import pyarrow as pa
+from lumy_middleware.context.kiara.table_utils import (
+    _row_indices_cache, filter_table, invalidate_table_views, sort_table,
+    view_indices)
+from lumy_middleware.types.generated import (DataTabularDataFilterCondition,
+                                             DataTabularDataFilterItem,
+                                             DataTabularDataSortingMethod,
+                                             Direction, NullPlacement,
+                                             Operator)
+
+
+def condition(*items, operator=Operator.AND):
+    return DataTabularDataFilterCondition(
+        items=[DataTabularDataFilterItem(*item) for item in items],
+        operator=operator)
+
+
+class TestFilterTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = pa.table({
+            'name': ['alpha', 'beta', 'gamma', None, 'delta'],
+            'size': [1, 5, 10, 20, None],
+            'kind': pa.array(['a', 'b', 'a', 'b', 'c']).dictionary_encode(),
+        })
+
+    def names(self, *items, operator=Operator.AND):
+        filtered = filter_table(self.table, condition(
+            *items, operator=operator))
+        return filtered.column('name').to_pylist()
+
+    def test_string_operators(self):
+        self.assertEqual(
+            self.names(('name', 'contains', 'ta')), ['beta', 'delta'])
+        self.assertEqual(self.names(('name', 'startsWith', 'g')), ['gamma'])
+        self.assertEqual(self.names(('name', 'endsWith', 'a')),
+                         ['alpha', 'beta', 'gamma', 'delta'])
+        self.assertEqual(
+            self.names(('name', 'regex', '^[ab]')), ['alpha', 'beta'])
+        # other types are matched by their string representation
+        self.assertEqual(
+            self.names(('size', 'contains', 0)), ['gamma', None])
+
+    def test_comparisons_are_typed_by_column(self):
+        self.assertEqual(self.names(('size', '>', '5')), ['gamma', None])
+        self.assertEqual(self.names(('size', 'lessThanOrEqual', 5)),
+                         ['alpha', 'beta'])
+        self.assertEqual(
+            self.names(('kind', 'equals', 'a')), ['alpha', 'gamma'])
+        self.assertEqual(self.names(('kind', 'in', ['b', 'c'])),
+                         ['beta', None, 'delta'])
+        self.assertEqual(self.names(('size', 'isNull', None)), ['delta'])
+        self.assertEqual(self.names(('name', 'isNotNull', None)),
+                         ['alpha', 'beta', 'gamma', 'delta'])
+
+    def test_items_are_combined(self):
+        self.assertEqual(
+            self.names(('kind', '=', 'a'), ('size', '>', 1)), ['gamma'])
+        self.assertEqual(self.names(('kind', '=', 'c'), ('size', '<', 5),
+                                    operator=Operator.OR),
+                         ['alpha', 'delta'])
+
+    def test_invalid_items(self):
+        with self.assertRaises(ValueError):
+            self.names(('name', 'like', 'a'))
+        with self.assertRaises(ValueError):
+            self.names(('missing', 'contains', 'a'))
+        with self.assertRaises(ValueError):
+            self.names(('size', '>', 'abc'))
+
+
+class TestSortTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = pa.table({
+            'id': list(range(200)),
+            'group': pa.array(
+                [f'g{i % 3}' for i in range(200)]).dictionary_encode(),
+            'value': [None if i % 10 == 0 else i % 7 for i in range(200)],
+        })
+
+    def ids(self, sorting, limit=None):
+        return sort_table(self.table, sorting, limit) \
+            .column('id').to_pylist()
+
+    def test_top_k_matches_full_sort(self):
+        for sorting in [
+            [DataTabularDataSortingMethod('value', Direction.ASC)],
+            [DataTabularDataSortingMethod(
+                'value', Direction.DESC, NullPlacement.FIRST)],
+            [DataTabularDataSortingMethod('group', Direction.DESC),
+             DataTabularDataSortingMethod(
+                 'value', Direction.ASC, NullPlacement.FIRST)],
+        ]:
+            full = self.ids(sorting)
+            for limit in [1, 10, 30]:
+                self.assertEqual(
+                    self.ids(sorting, limit)[:limit], full[:limit])
+
+    def test_null_placement(self):
+        last = self.ids(DataTabularDataSortingMethod('value', Direction.ASC))
+        first = self.ids(DataTabularDataSortingMethod(
+            'value', Direction.ASC, NullPlacement.FIRST))
+        self.assertEqual(last[-20:], list(range(0, 200, 10)))
+        self.assertEqual(first[:20], list(range(0, 200, 10)))
+
+    def test_default_direction_keeps_order(self):
+        self.assertEqual(self.ids(DataTabularDataSortingMethod(
+            'value', Direction.DEFAULT)), list(range(200)))
+
+
+class TestViewIndices(unittest.TestCase):
+
+    def setUp(self):
+        self.table = pa.table({
+            'id': list(range(1000)),
+            'value': [i % 13 for i in range(1000)],
+        })
+        self.condition = condition(('value', '>', 3))
+        self.sorting = [DataTabularDataSortingMethod('value', Direction.DESC)]
+        invalidate_table_views('table')
+
+    def expected(self):
+        return sort_table(
+            filter_table(self.table, self.condition), self.sorting) \
+            .column('id').to_pylist()
+
+    def ids(self, indices, offset, page_size):
+        return self.table.column('id').take(
+            indices.slice(offset, page_size)).to_pylist()
+
+    def test_pages_match_sorted_view(self):
+        expected = self.expected()
+        for offset in [0, 10, 500]:
+            indices, rows_count = view_indices(
+                self.table, self.condition, self.sorting,
+                limit=offset + 10, table_id='t1', tag='table')
+            self.assertEqual(rows_count, len(expected))
+            self.assertEqual(self.ids(indices, offset, 10),
+                             expected[offset:offset + 10])
+
+    def test_cached_until_invalidated(self):
+        view_indices(self.table, self.condition, self.sorting,
+                     limit=10, table_id='t1', tag='table')
+        hits = _row_indices_cache.stats.hits
+        view_indices(self.table, self.condition, self.sorting,
+                     limit=10, table_id='t1', tag='table')
+        self.assertEqual(_row_indices_cache.stats.hits, hits + 2)
+
+        invalidate_table_views('table')
+        misses = _row_indices_cache.stats.misses
+        view_indices(self.table, self.condition, self.sorting,
+                     limit=10, table_id='t1', tag='table')
+        self.assertEqual(_row_indices_cache.stats.misses, misses + 2)
+
+    def test_unsorted_view_is_selection(self):
+        indices, rows_count = view_indices(
+            self.table, self.condition, [], table_id='t1', tag='table')
+        self.assertEqual(
+            self.ids(indices, 0, rows_count),
+            filter_table(self.table, self.condition).column('id').to_pylist())
+
+        indices, rows_count = view_indices(self.table, None, [])
+        self.assertIsNone(indices)
+        self.assertEqual(rows_count, 1000)
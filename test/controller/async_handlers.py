@@ -0,0 +1,149 @@
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from lumy_middleware.jupyter.base import MessageEnvelope, MessageHandler
+from lumy_middleware.standalone.controller import StandaloneController
+from lumy_middleware.target import Target
+from lumy_middleware.types.generated import MsgCancelled, MsgProgress
+from lumy_middleware.utils.cancellation import Cancelled
+from lumy_middleware.utils.dataclasses import from_dict
+from lumy_middleware.utils.unittest import ControllerTestCase
+from lumy_middleware.utils.watchdog import Watchdog
+
+
+def slow_function():
+    time.sleep(0.2)
+
+
+class AsyncHandler(MessageHandler):
+
+    async def _handle_Ping(self):
+        await asyncio.sleep(0)
+        return MsgProgress(progress=100)
+
+    async def _handle_Fail(self):
+        await asyncio.sleep(0)
+        raise ValueError('Ping failed')
+
+    async def _handle_Cancel(self):
+        await asyncio.sleep(0)
+        raise Cancelled()
+
+    async def _handle_Slow(self):
+        await self.run_blocking(slow_function)
+        return MsgProgress(progress=100)
+
+
+class AsyncHandlersTestCase(ControllerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.controller._handlers[Target.Activity] = AsyncHandler(
+            self.controller._context, self.controller, Target.Activity)
+        self.received: List[MessageEnvelope] = []
+        self.subscription = self.client.subscribe(
+            Target.Activity, self.received.append)
+
+    def tearDown(self):
+        self.subscription.unsubscribe()
+        super().tearDown()
+
+    def send(self, action: str):
+        self.client.publish(
+            Target.Activity, MessageEnvelope(action=action, content={}))
+
+
+class TestAsyncHandlers(AsyncHandlersTestCase):
+
+    def test_response_without_running_loop(self):
+        # the coroutine runs to completion on the controller's own loop
+        self.send('Ping')
+        self.assertEqual([msg.action for msg in self.received], ['Progress'])
+        self.assertEqual(from_dict(MsgProgress, self.received[0].content),
+                         MsgProgress(progress=100))
+
+    def test_size_of_json_response_is_measured(self):
+        self.send('Ping')
+        metrics = next(
+            m for m in self.controller.get_metrics()
+            if m.target == Target.Activity.value and m.action == 'Ping')
+        self.assertEqual(metrics.payload_bytes.count, 1)
+        self.assertEqual(
+            metrics.payload_bytes.sum,
+            len(json.dumps({'action': 'Progress',
+                            'content': {'progress': 100}})))
+
+    async def test_response_on_running_loop(self):
+        self.send('Ping')
+        self.send('Ping')
+        # scheduled on the loop of the test
+        self.assertEqual(self.received, [])
+
+        await self.controller.drain()
+        self.assertEqual([msg.action for msg in self.received],
+                         ['Progress', 'Progress'])
+
+    async def test_error_is_published(self):
+        self.send('Fail')
+        await self.controller.drain()
+
+        self.assertEqual([msg.action for msg in self.received], ['Error'])
+        self.assertIn('Ping failed', self.received[0].content['message'])
+
+    async def test_cancelled_is_published(self):
+        self.send('Cancel')
+        await self.controller.drain()
+
+        self.assertEqual([msg.action for msg in self.received],
+                         ['Cancelled'])
+        self.assertEqual(
+            from_dict(MsgCancelled, self.received[0].content),
+            MsgCancelled(action='Cancel', supersede_key='',
+                         target=Target.Activity.value))
+
+
+class TestWatchedAsyncHandlers(AsyncHandlersTestCase):
+
+    def setUp(self):
+        self.profiles_dir = tempfile.TemporaryDirectory()
+        super().setUp()
+
+    def create_controller(self) -> StandaloneController:
+        return StandaloneController(watchdog=Watchdog(
+            0.05, 1, Path(self.profiles_dir.name)))
+
+    def tearDown(self):
+        super().tearDown()
+        self.profiles_dir.cleanup()
+
+    def assertSlowFunctionProfiled(self):
+        profiles = list(Path(self.profiles_dir.name).glob('*-Slow.folded'))
+        self.assertEqual(len(profiles), 1)
+        lines = profiles[0].read_text().splitlines()
+        self.assertGreater(len(lines), 0)
+        # only the executor thread running the blocking call is sampled
+        for line in lines:
+            self.assertTrue(line.startswith('Slow({});'))
+            self.assertIn('_watched (watchdog.py', line)
+        self.assertTrue(
+            any('slow_function (async_handlers.py' in line
+                for line in lines))
+
+    def test_blocking_call_is_profiled(self):
+        self.send('Slow')
+        self.assertEqual([msg.action for msg in self.received], ['Progress'])
+        self.assertSlowFunctionProfiled()
+
+    async def test_blocking_call_on_running_loop_is_profiled(self):
+        self.send('Slow')
+        # the request is watched until the response is published
+        self.assertEqual(
+            list(Path(self.profiles_dir.name).glob('*.folded')), [])
+
+        await self.controller.drain()
+        self.assertEqual([msg.action for msg in self.received], ['Progress'])
+        self.assertSlowFunctionProfiled()
@@ -1,5 +1,6 @@
 import asyncio
 import os
+import threading
 from pathlib import Path
 
 from lumy_middleware.jupyter.base import MessageEnvelope
@@ -9,8 +10,11 @@ from lumy_middleware.types.generated import (DataValueContainer,
                                              MsgWorkflowLoadLumyWorkflow,
                                              MsgModuleIOGetOutputValue,
                                              DataTabularDataFilter,
+                                             MsgCancelled,
                                              MsgModuleIOOutputValue)
 from lumy_middleware.utils.dataclasses import from_dict, to_dict
+from lumy_middleware.utils.dispatch import OrderedExecutor
+from lumy_middleware.standalone.controller import StandaloneController
 from lumy_middleware.utils.unittest import ControllerTestCase
 
 TEST_WORKFLOW_DIR = Path(__file__).parent.parent / 'resources'
@@ -19,7 +23,7 @@ LOGIC_TEST_WORKFLOW_PATH = TEST_WORKFLOW_DIR / 'LogicXorWorkflow.yml'
 TIMEOUT = 3  # sec
 
 
-class TestCurrentWorkflow(ControllerTestCase):
+class WorkflowTestCase(ControllerTestCase):
 
     def setUp(self):
         super().setUp()
@@ -30,11 +34,15 @@ class TestCurrentWorkflow(ControllerTestCase):
         del os.environ['LUMY_WORKFLOW_DIR']
 
     async def load_test_workflow(self):
-        current_workflow_updated = asyncio.get_event_loop().create_future()
+        loop = asyncio.get_running_loop()
+        current_workflow_updated = loop.create_future()
 
         def handler(msg: MessageEnvelope):
             if msg.action == 'Updated':
-                current_workflow_updated.set_result(True)
+                # handlers may be called on executor threads
+                loop.call_soon_threadsafe(
+                    lambda: current_workflow_updated.done()
+                    or current_workflow_updated.set_result(True))
 
         with self.client.subscribe(Target.Workflow, handler):
             self.client.publish(
@@ -46,7 +54,10 @@ class TestCurrentWorkflow(ControllerTestCase):
                     )
                 )
             )
-        await asyncio.wait_for(current_workflow_updated, timeout=TIMEOUT)
+            await asyncio.wait_for(current_workflow_updated, timeout=TIMEOUT)
+
+
+class TestCurrentWorkflow(WorkflowTestCase):
 
     async def test_workflow_outputs_updated_after_inputs_change(self):
         '''
@@ -106,3 +117,44 @@ class TestCurrentWorkflow(ControllerTestCase):
             )
 
         await asyncio.wait_for(outputs_updated, timeout=TIMEOUT)
+
+
+class TestSupersededRequests(WorkflowTestCase):
+
+    def create_controller(self) -> StandaloneController:
+        self.executor = OrderedExecutor(1)
+        return StandaloneController(executor=self.executor)
+
+    async def test_superseded_request_is_cancelled(self):
+        await self.load_test_workflow()
+
+        # requests wait in the queue of the target while it is busy
+        release = threading.Event()
+        self.executor.submit(
+            Target.ModuleIO, lambda: release.wait(TIMEOUT))
+
+        received = []
+        with self.client.subscribe(Target.ModuleIO, received.append), \
+                self.client.subscribe(Target.Activity, received.append):
+            for _ in range(2):
+                self.client.publish(
+                    Target.ModuleIO,
+                    MessageEnvelope(
+                        action='GetOutputValue',
+                        content=to_dict(MsgModuleIOGetOutputValue(
+                            step_id='setBAndSeeY',
+                            output_id='y',
+                            supersede_key='y'
+                        ))
+                    )
+                )
+            release.set()
+            # waits for queued requests to be handled
+            self.executor.shutdown()
+
+        self.assertEqual([msg.action for msg in received],
+                         ['Cancelled', 'OutputValue'])
+        self.assertEqual(
+            from_dict(MsgCancelled, received[0].content),
+            MsgCancelled(action='GetOutputValue', supersede_key='y',
+                         target=Target.ModuleIO.value))
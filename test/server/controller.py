@@ -0,0 +1,126 @@
+import asyncio
+import json
+import unittest
+
+from lumy_middleware.jupyter.base import MessageEnvelope
+from lumy_middleware.server.client import ServerClient
+from lumy_middleware.server.controller import ServerController
+from lumy_middleware.server.protocol import HEADER, encode_frame
+from lumy_middleware.target import Target
+from lumy_middleware.types.generated import MsgModuleIOOutputValuesUpdated
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+
+class TestServerSessions(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        # messages are handled on the loop of the test
+        self.controller = ServerController(workers=0)
+        self.server = await self.controller.serve(port=0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.clients = [
+            await ServerClient.connect('127.0.0.1', port) for _ in range(2)
+        ]
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            await client.close()
+        self.server.close()
+        await self.server.wait_closed()
+        self.controller.shutdown()
+
+    async def test_capabilities_are_kept_per_session(self):
+        batching_client, plain_client = self.clients
+        await batching_client.send(
+            Target.Activity, 'GetSystemInfo',
+            {'capabilities': {'batches': True}})
+        _, envelope, _ = await batching_client.receive()
+        self.assertEqual(envelope['action'], 'SystemInfo')
+        await plain_client.send(Target.Activity, 'GetSystemInfo', {})
+        _, envelope, _ = await plain_client.receive()
+        self.assertEqual(envelope['action'], 'SystemInfo')
+
+        # notifications are encoded for every client with its capabilities
+        self.controller._send_batch(Target.ModuleIO, [
+            MessageEnvelope(
+                action='OutputValuesUpdated',
+                content=MsgModuleIOOutputValuesUpdated(
+                    output_ids=['y'], step_id=step_id))
+            for step_id in ['a', 'b']
+        ])
+
+        _, envelope, _ = await batching_client.receive()
+        self.assertEqual(envelope['action'], 'Batch')
+        self.assertEqual(len(envelope['content']['messages']), 2)
+        for step_id in ['a', 'b']:
+            _, envelope, _ = await plain_client.receive()
+            self.assertEqual(envelope['action'], 'OutputValuesUpdated')
+            self.assertEqual(envelope['content']['stepId'], step_id)
+
+    async def test_session_sending_too_large_frame_is_closed(self):
+        self.controller._max_frame_size = 1024
+        port = self.server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            writer.write(HEADER.pack(2 ** 31, 0))
+            await writer.drain()
+            self.assertEqual(await reader.read(), b'')
+        finally:
+            writer.close()
+
+        # other sessions are not affected
+        client = self.clients[0]
+        await client.send(Target.Activity, 'GetSystemInfo', {})
+        _, envelope, _ = await client.receive()
+        self.assertEqual(envelope['action'], 'SystemInfo')
+
+
+class TestWebSocketSessions(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.controller = ServerController(workers=0, max_frame_size=1024)
+        self.server = await self.controller.serve_websocket(port=0)
+        port = list(self.server.sockets)[0].getsockname()[1]
+        # mounted under a prefix of a reverse proxy
+        self.url = f'ws://127.0.0.1:{port}/lumy/'
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.controller.shutdown()
+
+    async def test_json_messages(self):
+        async with connect(self.url) as websocket:
+            await websocket.send(json.dumps({
+                'target': Target.Activity.value,
+                'action': 'GetSystemInfo',
+                'content': {'capabilities': {'batches': True}}
+            }))
+            envelope = json.loads(await websocket.recv())
+        self.assertEqual(envelope['target'], Target.Activity.value)
+        self.assertEqual(envelope['action'], 'SystemInfo')
+
+    async def test_binary_frames(self):
+        async with connect(self.url) as websocket:
+            await websocket.send(b''.join(encode_frame({
+                'target': Target.Activity.value,
+                'action': 'GetSystemInfo',
+                'content': {}
+            }, [memoryview(b'abc')])))
+            envelope = json.loads(await websocket.recv())
+        self.assertEqual(envelope['action'], 'SystemInfo')
+
+    async def test_session_sending_too_large_frame_is_closed(self):
+        async with connect(self.url) as websocket:
+            await websocket.send(b'x' * 2048)
+            with self.assertRaises(ConnectionClosed) as e:
+                await websocket.recv()
+        # message too big
+        self.assertEqual(e.exception.rcvd.code, 1009)
+
+    async def test_session_sending_invalid_frame_is_closed(self):
+        async with connect(self.url) as websocket:
+            await websocket.send(HEADER.pack(0, 100))
+            with self.assertRaises(ConnectionClosed):
+                await websocket.recv()
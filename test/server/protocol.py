@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+
+from lumy_middleware.server.client import ServerClient
+from lumy_middleware.server.protocol import (HEADER, FrameTooLarge,
+                                             decode_frame, encode_frame,
+                                             read_frame)
+from lumy_middleware.target import Target
+
+
+class TestProtocol(unittest.IsolatedAsyncioTestCase):
+
+    async def test_frames_are_read_back(self):
+        reader = asyncio.StreamReader()
+        for envelope, buffers in [
+            ({'action': 'A', 'content': {'x': 1}}, []),
+            ({'action': 'B', 'content': {'v': {'__buffer__': 1}}},
+             [memoryview(b''), memoryview(b'\x00\x01' * 1000)]),
+        ]:
+            for part in encode_frame(envelope, buffers):
+                reader.feed_data(bytes(part))
+        reader.feed_eof()
+
+        envelope, buffers = await read_frame(reader)
+        self.assertEqual(envelope, {'action': 'A', 'content': {'x': 1}})
+        self.assertEqual(buffers, [])
+
+        envelope, buffers = await read_frame(reader)
+        self.assertEqual(envelope['content'], {'v': {'__buffer__': 1}})
+        self.assertEqual(
+            [bytes(b) for b in buffers], [b'', b'\x00\x01' * 1000])
+
+        self.assertIsNone(await read_frame(reader))
+
+    async def test_frames_over_the_limit_are_not_read(self):
+        for header in [HEADER.pack(2 ** 31, 0), HEADER.pack(10, 2 ** 31)]:
+            reader = asyncio.StreamReader()
+            reader.feed_data(header)
+            with self.assertRaises(FrameTooLarge):
+                await read_frame(reader, max_size=1024)
+
+        # buffer lengths are checked before buffers are read
+        reader = asyncio.StreamReader()
+        parts = encode_frame({'action': 'A'}, [memoryview(b'x' * 2048)])
+        reader.feed_data(b''.join(parts[:-1]))
+        with self.assertRaises(FrameTooLarge):
+            await read_frame(reader, max_size=1024)
+
+    def test_frames_are_decoded(self):
+        data = b''.join(encode_frame(
+            {'action': 'B', 'content': {'v': {'__buffer__': 0}}},
+            [memoryview(b'abc'), memoryview(b'de')]))
+        envelope, buffers = decode_frame(data)
+        self.assertEqual(envelope['content'], {'v': {'__buffer__': 0}})
+        self.assertEqual([bytes(b) for b in buffers], [b'abc', b'de'])
+
+        with self.assertRaises(FrameTooLarge):
+            decode_frame(data, max_size=len(data) - 1)
+        for invalid in [data[:4], data[:-1], data + b'x',
+                        HEADER.pack(0, 2 ** 31)]:
+            with self.assertRaises(ValueError):
+                decode_frame(invalid)
+
+    async def test_client_messages_reach_server(self):
+        async def echo(reader, writer):
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                writer.writelines(encode_frame(*frame))
+            writer.close()
+
+        server = await asyncio.start_server(echo, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        client = await ServerClient.connect('127.0.0.1', port)
+        try:
+            await client.send(Target.ModuleIO, 'GetOutputValue',
+                              {'stepId': 's'}, [memoryview(b'abc')])
+            target, envelope, buffers = await client.receive()
+            self.assertEqual(target, Target.ModuleIO)
+            self.assertEqual(envelope, {
+                'action': 'GetOutputValue', 'content': {'stepId': 's'}})
+            self.assertEqual([bytes(b) for b in buffers], [b'abc'])
+        finally:
+            await client.close()
+            server.close()
+            await server.wait_closed()
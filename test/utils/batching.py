@@ -0,0 +1,117 @@
+import threading
+import unittest
+from typing import List, Tuple
+
+from lumy_middleware.batching import NotificationBatcher
+from lumy_middleware.jupyter.base import MessageEnvelope
+from lumy_middleware.target import Target
+from lumy_middleware.types.generated import (MsgExecutionState,
+                                             MsgModuleIOInputValuesUpdated,
+                                             MsgModuleIOOutputValue,
+                                             MsgModuleIOOutputValuesUpdated,
+                                             State)
+
+
+def envelope(msg) -> MessageEnvelope:
+    return MessageEnvelope(action=msg._action, content=msg)
+
+
+class TestNotificationBatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.sent: List[Tuple[Target, List[MessageEnvelope]]] = []
+        self.batcher = NotificationBatcher(
+            lambda target, messages: self.sent.append((target, messages)),
+            window=60)
+
+    def tearDown(self):
+        self.batcher.flush()
+
+    def test_notifications_are_merged(self):
+        for msg in [
+            MsgModuleIOOutputValuesUpdated(output_ids=['a'], step_id='s1'),
+            MsgModuleIOInputValuesUpdated(input_ids=['x'], step_id='s1'),
+            MsgModuleIOOutputValuesUpdated(output_ids=['b', 'a'],
+                                           step_id='s1'),
+            MsgModuleIOOutputValuesUpdated(output_ids=['c'], step_id='s2'),
+        ]:
+            self.assertTrue(
+                self.batcher.offer(Target.ModuleIO, envelope(msg)))
+        self.assertEqual(self.sent, [])
+
+        self.batcher.flush()
+
+        self.assertEqual(len(self.sent), 1)
+        target, messages = self.sent[0]
+        self.assertEqual(target, Target.ModuleIO)
+        self.assertEqual([m.content for m in messages], [
+            MsgModuleIOOutputValuesUpdated(output_ids=['a', 'b'],
+                                           step_id='s1'),
+            MsgModuleIOInputValuesUpdated(input_ids=['x'], step_id='s1'),
+            MsgModuleIOOutputValuesUpdated(output_ids=['c'], step_id='s2'),
+        ])
+
+    def test_other_messages_are_sent_after_pending_notifications(self):
+        self.batcher.offer(Target.ModuleIO, envelope(
+            MsgModuleIOOutputValuesUpdated(output_ids=['a'], step_id='s')))
+        self.batcher.offer(Target.Activity, envelope(
+            MsgExecutionState(State.BUSY)))
+
+        response = MsgModuleIOOutputValue(
+            step_id='s', output_id='a', type='string', value='v')
+        self.assertFalse(
+            self.batcher.offer(Target.ModuleIO, envelope(response)))
+
+        # only notifications on the same target are sent
+        self.assertEqual(
+            [target for target, _ in self.sent], [Target.ModuleIO])
+
+    def test_end_of_processing_sends_notifications(self):
+        self.batcher.offer(Target.ModuleIO, envelope(
+            MsgModuleIOOutputValuesUpdated(output_ids=['a'], step_id='s')))
+        self.batcher.offer(Target.Activity, envelope(
+            MsgExecutionState(State.BUSY)))
+        self.batcher.offer(Target.Activity, envelope(
+            MsgExecutionState(State.IDLE)))
+
+        sent = {target: messages for target, messages in self.sent}
+        self.assertEqual(set(sent.keys()), {Target.ModuleIO, Target.Activity})
+        # BUSY is superseded by IDLE
+        self.assertEqual([m.content for m in sent[Target.Activity]],
+                         [MsgExecutionState(State.IDLE)])
+
+    def test_notifications_are_sent_when_window_ends(self):
+        done = threading.Event()
+        batcher = NotificationBatcher(lambda *_: done.set(), window=0.01)
+        batcher.offer(Target.ModuleIO, envelope(
+            MsgModuleIOOutputValuesUpdated(output_ids=['a'], step_id='s')))
+        self.assertTrue(done.wait(5))
+
+    def test_window_end_is_not_interleaved_with_published_messages(self):
+        sending_batch = threading.Event()
+        release_batch = threading.Event()
+        sent: List[str] = []
+
+        def send_batch(target, messages):
+            sending_batch.set()
+            release_batch.wait(5)
+            sent.extend(m.action for m in messages)
+
+        batcher = NotificationBatcher(send_batch, window=0.01)
+        batcher.offer(Target.ModuleIO, envelope(
+            MsgModuleIOOutputValuesUpdated(output_ids=['a'], step_id='s')))
+        self.assertTrue(sending_batch.wait(5))
+
+        response = MsgModuleIOOutputValue(
+            step_id='s', output_id='a', type='string', value='v')
+        publisher = threading.Thread(target=lambda: batcher.publish(
+            Target.ModuleIO, envelope(response),
+            lambda _, msg: sent.append(msg.action)))
+        publisher.start()
+        # the response waits for the batch being sent on its target
+        publisher.join(0.05)
+        self.assertTrue(publisher.is_alive())
+
+        release_batch.set()
+        publisher.join(5)
+        self.assertEqual(sent, ['OutputValuesUpdated', 'OutputValue'])
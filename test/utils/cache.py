@@ -0,0 +1,103 @@
+import threading
+import time
+import unittest
+
+from lumy_middleware.types.generated import (DataTabularDataFilter,
+                                             DataTabularDataSortingMethod)
+from lumy_middleware.utils.cache import (LRUCache, SingleFlight,
+                                         canonical_hash, get_caches_stats)
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache: LRUCache[str, str] = LRUCache(10)
+        cache.put('a', 'A', 4)
+        cache.put('b', 'B', 4)
+        self.assertEqual(cache.get('a'), 'A')
+
+        cache.put('c', 'C', 4)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertEqual(cache.get('c'), 'C')
+
+        stats = cache.stats
+        self.assertEqual(stats.hits, 3)
+        self.assertEqual(stats.misses, 1)
+        self.assertEqual(stats.evictions, 1)
+        self.assertEqual(stats.entries, 2)
+        self.assertEqual(stats.size, 8)
+
+    def test_entries_larger_than_budget_are_not_cached(self):
+        cache: LRUCache[str, str] = LRUCache(10)
+        cache.put('a', 'A', 11)
+        self.assertNotIn('a', cache)
+
+    def test_invalidate_by_tag(self):
+        cache: LRUCache[str, str] = LRUCache(10)
+        cache.put('a', 'A', 1, tag='x')
+        cache.put('b', 'B', 1, tag='x')
+        cache.put('c', 'C', 1, tag='y')
+
+        cache.invalidate('x')
+
+        self.assertEqual(len(cache), 1)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.stats.size, 1)
+
+    def test_named_cache_stats(self):
+        cache: LRUCache[str, str] = LRUCache(10, name='test')
+        cache.put('a', 'A', 1)
+        self.assertEqual(get_caches_stats()['test'].entries, 1)
+
+
+class TestCanonicalHash(unittest.TestCase):
+
+    def test_hash_does_not_depend_on_keys_order(self):
+        self.assertEqual(canonical_hash({'a': 1, 'b': 2}),
+                         canonical_hash({'b': 2, 'a': 1}))
+
+    def test_filter_hash(self):
+        f1 = DataTabularDataFilter(
+            offset=0, sorting=DataTabularDataSortingMethod(column='a'))
+        f2 = DataTabularDataFilter(
+            offset=0, sorting=DataTabularDataSortingMethod(column='a'))
+        f3 = DataTabularDataFilter(offset=5)
+
+        self.assertEqual(canonical_hash(f1), canonical_hash(f2))
+        self.assertNotEqual(canonical_hash(f1), canonical_hash(f3))
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_calls_share_computation(self):
+        flights: SingleFlight[str, int] = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 42
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(flights.do('k', compute)))
+        leader.start()
+        self.assertTrue(started.wait(5))
+
+        follower = threading.Thread(
+            target=lambda: results.append(flights.do('k', compute)))
+        follower.start()
+        while flights.coalesced == 0:
+            time.sleep(0.001)
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(results, [42, 42])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flights.do('k', lambda: 1), 1)
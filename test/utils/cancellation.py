@@ -0,0 +1,25 @@
+import unittest
+
+from lumy_middleware.utils.cancellation import (Cancelled,
+                                                SupersedeRegistry,
+                                                cancellation_scope,
+                                                check_cancelled)
+
+
+class TestSupersedeRegistry(unittest.TestCase):
+
+    def test_new_request_cancels_previous_one(self):
+        registry = SupersedeRegistry()
+        first = registry.register('filter')
+        second = registry.register('filter')
+        other = registry.register('other')
+
+        self.assertTrue(first.is_cancelled)
+        self.assertFalse(second.is_cancelled)
+        self.assertFalse(other.is_cancelled)
+
+        with cancellation_scope(first):
+            with self.assertRaises(Cancelled):
+                check_cancelled()
+        with cancellation_scope(second):
+            check_cancelled()
@@ -0,0 +1,224 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pyarrow as pa
+from lumy_middleware.types.generated import DataType, DataValueContainer
+from lumy_middleware.utils.binary import (BinaryData, embed_buffers,
+                                          merge_buffers, split_buffers)
+from lumy_middleware.utils.codec import (CodecOptions, CodecRegistry,
+                                         SimpleValueCodec, deserialize,
+                                         pick_compression, serialize,
+                                         serialize_chunks, split_table_schema)
+from lumy_middleware.utils.dictionary_encoding import \
+    dictionary_encode_low_cardinality
+
+TEST_TABLE = pa.Table.from_pydict({
+    'id': [1, 2, 3],
+    'label': ['a', 'b', 'c']
+})
+
+
+class TestTableCodec(unittest.TestCase):
+
+    def test_table_is_serialized_as_binary_data(self):
+        container = serialize(TEST_TABLE)
+        self.assertEqual(container.data_type, DataType.TABLE)
+        self.assertIsInstance(container.value, BinaryData)
+
+    def test_binary_buffers_roundtrip(self):
+        msg = {'value': serialize(TEST_TABLE).value, 'items': [1, 2]}
+
+        envelope, buffers = split_buffers(msg)
+        self.assertEqual(len(buffers), 1)
+        self.assertEqual(envelope['value'], {'__buffer__': 0})
+        self.assertEqual(envelope['items'], [1, 2])
+
+        restored = merge_buffers(envelope, buffers)
+        table = deserialize(
+            DataValueContainer(DataType.TABLE, restored['value']))
+        self.assertTrue(table.equals(TEST_TABLE))
+
+    def test_base64_fallback_roundtrip(self):
+        msg = embed_buffers({'value': serialize(TEST_TABLE).value})
+        self.assertIsInstance(msg['value'], str)
+
+        table = deserialize(DataValueContainer(DataType.TABLE, msg['value']))
+        self.assertTrue(table.equals(TEST_TABLE))
+
+
+class TestTableCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.large_table = pa.Table.from_pydict({
+            'label': ['repeated label'] * 100000
+        })
+
+    def test_large_table_is_compressed(self):
+        options = CodecOptions(
+            compression=['foo', 'zstd'], dictionary_encoding=False)
+        self.assertEqual(
+            pick_compression(options, self.large_table.nbytes), 'zstd')
+
+        compressed = serialize(self.large_table, options).value
+        uncompressed = serialize(
+            self.large_table, CodecOptions(dictionary_encoding=False)).value
+        self.assertLess(compressed.size, uncompressed.size / 4)
+
+        table = deserialize(DataValueContainer(DataType.TABLE, compressed))
+        self.assertTrue(table.equals(self.large_table))
+
+    def test_small_table_is_not_compressed(self):
+        options = CodecOptions(compression=['zstd'])
+        self.assertIsNone(pick_compression(options, TEST_TABLE.nbytes))
+
+    def test_no_compression_without_client_support(self):
+        self.assertIsNone(
+            pick_compression(CodecOptions(), self.large_table.nbytes))
+
+
+class TestTableChunks(unittest.TestCase):
+
+    def test_chunks_make_a_valid_stream(self):
+        table = pa.Table.from_pydict({
+            'id': list(range(10000)),
+            'label': [f'label {i}' for i in range(10000)]
+        })
+        chunks = list(serialize_chunks(table, chunk_size=16 * 1024))
+
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual(
+            bytes(chunks[0].value.as_memoryview()),
+            table.schema.serialize().to_pybytes())
+
+        stream = b''.join(c.value.as_memoryview() for c in chunks)
+        self.assertTrue(pa.ipc.open_stream(stream).read_all().equals(table))
+
+    def test_simple_value_is_a_single_chunk(self):
+        chunks = list(serialize_chunks({'a': 1}))
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0].value, {'a': 1})
+
+
+class TestCodecRegistry(unittest.TestCase):
+
+    def test_values_are_serialized_by_type(self):
+        batch = TEST_TABLE.to_batches()[0]
+        df = TEST_TABLE.to_pandas()
+
+        for value in [batch, df, TEST_TABLE['label'], pa.array([1, 2])]:
+            container = serialize(value)
+            self.assertEqual(container.data_type, DataType.TABLE)
+            self.assertIsInstance(deserialize(container), pa.Table)
+
+        self.assertEqual(
+            deserialize(serialize(df)).to_pydict(), TEST_TABLE.to_pydict())
+
+    def test_numpy_values(self):
+        array = np.arange(12, dtype=np.float64).reshape(3, 4)
+        container = serialize(array)
+        self.assertEqual(container.data_type, DataType.TENSOR)
+        self.assertTrue(np.array_equal(deserialize(container), array))
+
+        container = serialize(np.int64(3))
+        self.assertEqual(container.data_type, DataType.SIMPLE)
+        self.assertEqual(container.value, 3)
+
+        with self.assertRaises(Exception):
+            serialize(np.array([object()]))
+
+    def test_codec_is_found_by_base_class(self):
+        class Label(str):
+            pass
+
+        container = serialize(Label('a'))
+        self.assertEqual(container.data_type, DataType.SIMPLE)
+        self.assertEqual(container.value, 'a')
+
+    def test_plugins_are_loaded_before_lookups(self):
+        class Label(str):
+            pass
+
+        plugin_codec = SimpleValueCodec()
+
+        def register_codecs(registry):
+            time.sleep(0.05)
+            registry.register(Label, DataType.SIMPLE, plugin_codec)
+
+        registry = CodecRegistry()
+        registry.register(str, DataType.SIMPLE, SimpleValueCodec())
+        found = []
+        extension = SimpleNamespace(name='labels', plugin=register_codecs)
+        with patch('lumy_middleware.utils.codec.ExtensionManager',
+                   return_value=[extension]):
+            threads = [
+                threading.Thread(
+                    target=lambda: found.append(registry.find(Label('a'))))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual([codec for _, codec in found], [plugin_codec] * 4)
+
+
+class TestTableSchema(unittest.TestCase):
+
+    def test_split_table_schema(self):
+        payload = serialize(TEST_TABLE).value
+        schema_id, batches = split_table_schema(payload)
+
+        self.assertIsNotNone(schema_id)
+        self.assertLess(batches.size, payload.size)
+
+        # schema ID does not depend on the table content
+        other_schema_id, _ = split_table_schema(
+            serialize(TEST_TABLE.slice(1, 1)).value)
+        self.assertEqual(schema_id, other_schema_id)
+
+        stream = TEST_TABLE.schema.serialize().to_pybytes() + \
+            bytes(batches.as_memoryview())
+        self.assertTrue(pa.ipc.open_stream(stream).read_all().equals(
+            TEST_TABLE))
+
+
+class TestDictionaryEncoding(unittest.TestCase):
+
+    def test_low_cardinality_columns_are_encoded(self):
+        table = pa.Table.from_pydict({
+            'id': [str(i) for i in range(5000)],
+            'group': ['a', 'b', 'c', 'd'] * 1250,
+        })
+        payload = serialize(table).value
+        stream_table = pa.ipc.open_stream(payload.as_memoryview()).read_all()
+
+        self.assertTrue(
+            pa.types.is_string(stream_table.schema.field('id').type))
+        self.assertTrue(
+            pa.types.is_dictionary(stream_table.schema.field('group').type))
+        self.assertEqual(stream_table.to_pydict(), table.to_pydict())
+
+    def test_small_tables_are_not_encoded(self):
+        payload = serialize(TEST_TABLE).value
+        stream_table = pa.ipc.open_stream(payload.as_memoryview()).read_all()
+        self.assertTrue(stream_table.schema.equals(TEST_TABLE.schema))
+
+    def test_decision_is_cached_per_value(self):
+        repeated = pa.table({'label': [f'l{i % 10}' for i in range(2000)]})
+        unique = pa.table({'label': [f'l{i}' for i in range(2000)]})
+
+        encoded = dictionary_encode_low_cardinality(repeated, 'value-1')
+        self.assertTrue(pa.types.is_dictionary(encoded['label'].type))
+        # the same value (another page of it) reuses the decision
+        encoded = dictionary_encode_low_cardinality(unique, 'value-1')
+        self.assertTrue(pa.types.is_dictionary(encoded['label'].type))
+
+        encoded = dictionary_encode_low_cardinality(unique, 'value-2')
+        self.assertFalse(pa.types.is_dictionary(encoded['label'].type))
+        encoded = dictionary_encode_low_cardinality(unique)
+        self.assertFalse(pa.types.is_dictionary(encoded['label'].type))
@@ -0,0 +1,82 @@
+import unittest
+
+from lumy_middleware.jupyter.base import MessageEnvelope
+from lumy_middleware.types.generated import (DataTabularDataFilter,
+                                             DataTabularDataSortingMethod,
+                                             Direction,
+                                             MsgModuleIOOutputValue)
+from lumy_middleware.utils.binary import BinaryData, encode_message
+from lumy_middleware.utils.dataclasses import from_dict, to_dict
+from lumy_middleware.utils.json import JsonPreview
+
+
+class TestCompiledDataclasses(unittest.TestCase):
+
+    def setUp(self):
+        self.msg = MsgModuleIOOutputValue(
+            step_id='step',
+            output_id='output',
+            type='table',
+            value=[1, 2],
+            filter=DataTabularDataFilter(
+                page_size=10,
+                sorting=DataTabularDataSortingMethod(
+                    column='a', direction=Direction.DESC)
+            )
+        )
+
+    def test_encoding(self):
+        data = to_dict(self.msg)
+        self.assertEqual(data['stepId'], 'step')
+        self.assertEqual(data['filter']['pageSize'], 10)
+        self.assertEqual(data['filter']['sorting']['direction'], 'desc')
+        self.assertIsNone(data['schemaId'])
+
+    def test_roundtrip(self):
+        self.assertEqual(
+            from_dict(MsgModuleIOOutputValue, to_dict(self.msg)), self.msg)
+
+    def test_decoding_snake_case_keys(self):
+        msg = from_dict(DataTabularDataFilter, {'page_size': 5})
+        self.assertEqual(msg.page_size, 5)
+
+    def test_decoding_fails_on_missing_required_field(self):
+        with self.assertRaises(KeyError):
+            from_dict(MsgModuleIOOutputValue, {'stepId': 'step'})
+
+
+class TestEncodeMessage(unittest.TestCase):
+
+    def setUp(self):
+        self.envelope = MessageEnvelope(
+            action='OutputValue',
+            content=MsgModuleIOOutputValue(
+                step_id='step',
+                output_id='output',
+                type='table',
+                value=BinaryData(b'abc'),
+                filter=DataTabularDataFilter(
+                    sorting=DataTabularDataSortingMethod(
+                        column='a', direction=Direction.ASC)
+                )
+            )
+        )
+
+    def test_binary_values_are_sent_as_buffers(self):
+        msg, buffers = encode_message(self.envelope, True)
+        self.assertEqual(msg['content']['value'], {'__buffer__': 0})
+        self.assertEqual(bytes(buffers[0]), b'abc')
+        self.assertEqual(
+            msg['content']['filter']['sorting']['direction'], 'asc')
+
+    def test_binary_values_are_embedded(self):
+        msg, buffers = encode_message(self.envelope, False)
+        self.assertEqual(msg['content']['value'], 'YWJj')
+        self.assertEqual(buffers, [])
+
+    def test_preview_is_cut(self):
+        msg = {'action': 'a', 'content': {'value': 'x' * 10000}}
+        preview = str(JsonPreview(msg, 50))
+        self.assertEqual(len(preview), 50)
+        self.assertTrue(preview.startswith('{"action": "a", "content"'))
+        self.assertTrue(preview.endswith('...'))
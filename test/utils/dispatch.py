@@ -0,0 +1,137 @@
+import threading
+import time
+import unittest
+
+from lumy_middleware.priorities import get_priority, is_read_only
+from lumy_middleware.target import Target
+from lumy_middleware.utils.dispatch import OrderedExecutor, Priority
+
+
+class TestOrderedExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = OrderedExecutor(4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_tasks_with_same_key_run_in_order(self):
+        results = []
+        done = threading.Event()
+
+        def task(i):
+            def run():
+                time.sleep(0.001 * (10 - i))
+                results.append(i)
+                if i == 9:
+                    done.set()
+            return run
+
+        for i in range(10):
+            self.executor.submit('a', task(i))
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(results, list(range(10)))
+
+    def test_tasks_with_different_keys_run_concurrently(self):
+        release = threading.Event()
+        done = threading.Event()
+
+        self.executor.submit('slow', lambda: release.wait(5))
+        self.executor.submit('fast', done.set)
+
+        self.assertTrue(done.wait(5))
+        release.set()
+
+    def test_queued_tasks_run_by_priority(self):
+        executor = OrderedExecutor(1, aging=60)
+        release = threading.Event()
+        done = threading.Event()
+        results = []
+
+        executor.submit('busy', lambda: release.wait(5))
+        executor.submit('heavy', lambda: results.append('heavy'),
+                        Priority.HEAVY)
+        executor.submit('read', lambda: results.append('read'),
+                        Priority.INTERACTIVE)
+        executor.submit('end', done.set, Priority.HEAVY)
+
+        self.assertEqual(executor.stats()[Priority.HEAVY].queued, 2)
+        release.set()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(results, ['read', 'heavy'])
+        self.assertEqual(executor.stats()[Priority.HEAVY].completed, 2)
+        executor.shutdown()
+
+    def test_low_priority_tasks_are_not_starved(self):
+        executor = OrderedExecutor(1, aging=0)
+        release = threading.Event()
+        done = threading.Event()
+        results = []
+
+        executor.submit('busy', lambda: release.wait(5))
+        executor.submit('heavy', lambda: results.append('heavy'),
+                        Priority.HEAVY)
+        executor.submit('read', lambda: results.append('read'),
+                        Priority.INTERACTIVE)
+        executor.submit('end', done.set)
+
+        release.set()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(results, ['heavy', 'read'])
+        executor.shutdown()
+
+    def test_shared_tasks_run_concurrently(self):
+        release = threading.Event()
+        read_done = threading.Event()
+        results = []
+        done = threading.Event()
+
+        self.executor.submit('a', lambda: release.wait(5), shared=True)
+        self.executor.submit('a', read_done.set, shared=True)
+        self.executor.submit('a', lambda: results.append('write'))
+        self.executor.submit('a', done.set, shared=True)
+
+        self.assertTrue(read_done.wait(5))
+        self.assertEqual(results, [])
+        release.set()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(results, ['write'])
+
+    def test_read_runs_ahead_of_queued_mutation_with_same_key(self):
+        release = threading.Event()
+        done = threading.Event()
+        results = []
+
+        def submit(action, task):
+            self.executor.submit(
+                Target.ModuleIO, task,
+                get_priority(Target.ModuleIO, action),
+                shared=is_read_only(Target.ModuleIO, action))
+
+        submit('Execute', lambda: release.wait(5))
+        submit('UpdateInputValues', lambda: results.append('update'))
+        submit('GetOutputValue', lambda: results.append('read'))
+        submit('Execute', done.set)
+
+        release.set()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(results, ['read', 'update'])
+
+    def test_read_does_not_overtake_mutation_waiting_for_long(self):
+        executor = OrderedExecutor(4, aging=0)
+        release = threading.Event()
+        done = threading.Event()
+        results = []
+
+        executor.submit('a', lambda: release.wait(5))
+        executor.submit('a', lambda: results.append('update'),
+                        Priority.MUTATION)
+        executor.submit('a', lambda: results.append('read'),
+                        Priority.INTERACTIVE, shared=True)
+        executor.submit('a', done.set)
+
+        release.set()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(results, ['update', 'read'])
+        executor.shutdown()
@@ -0,0 +1,56 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from lumy_middleware.utils.metrics import (HANDLER, Histogram,
+                                           MetricsRegistry)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram_buckets(self):
+        histogram = Histogram([1, 10])
+        for value in [0.5, 1, 5, 100]:
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.sum, 106.5)
+
+    def test_snapshot(self):
+        registry = MetricsRegistry()
+        key = ('module_io', 'GetOutputValue')
+        registry.count(key)
+        registry.count(key, error=True)
+        registry.observe_phase(key, HANDLER, 0.02)
+        registry.observe_payload(key, 2048)
+
+        [metrics] = registry.snapshot(reset=True)
+        self.assertEqual((metrics.target, metrics.action), key)
+        self.assertEqual((metrics.count, metrics.errors), (2, 1))
+        self.assertEqual(metrics.phases[HANDLER].count, 1)
+        self.assertEqual(metrics.payload_bytes.sum, 2048)
+
+        self.assertEqual(registry.snapshot(), [])
+
+    def test_prometheus_file(self):
+        registry = MetricsRegistry()
+        key = ('activity', 'GetSystemInfo')
+        registry.count(key)
+        registry.observe_phase(key, HANDLER, 0.02)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'lumy.prom'
+            registry.write_prometheus(path)
+            text = path.read_text()
+
+        labels = 'target="activity",action="GetSystemInfo"'
+        self.assertIn(f'lumy_messages_total{{{labels}}} 1\n', text)
+        self.assertIn(
+            f'lumy_message_phase_seconds_bucket{{{labels},'
+            'phase="handler",le="0.01"} 0\n', text)
+        self.assertIn(
+            f'lumy_message_phase_seconds_bucket{{{labels},'
+            'phase="handler",le="0.025"} 1\n', text)
+        self.assertIn(
+            f'lumy_message_phase_seconds_bucket{{{labels},'
+            'phase="handler",le="+Inf"} 1\n', text)
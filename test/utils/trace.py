@@ -0,0 +1,38 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from lumy_middleware.jupyter.base import MessageEnvelope
+from lumy_middleware.target import Target
+from lumy_middleware.types.generated import MsgModuleIOUploadChunk
+from lumy_middleware.utils.binary import BinaryData
+from lumy_middleware.utils.trace import (INBOUND, OUTBOUND, TraceRecorder,
+                                         read_trace)
+
+
+class TestTrace(unittest.TestCase):
+
+    def test_trace_is_read_back(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'trace.jsonl'
+            recorder = TraceRecorder(path)
+            recorder.record_inbound(Target.ModuleIO, MessageEnvelope(
+                action='UploadChunk',
+                content=MsgModuleIOUploadChunk(
+                    upload_id='u', sequence=0,
+                    value=BinaryData(b'\x00\x01'))
+            ))
+            recorder.record_outbound(Target.ModuleIO, 'UploadProgress', 0)
+            recorder.close()
+
+            records = list(read_trace(path))
+
+        self.assertEqual(
+            [(r.direction, r.target, r.action) for r in records], [
+                (INBOUND, Target.ModuleIO, 'UploadChunk'),
+                (OUTBOUND, Target.ModuleIO, 'UploadProgress'),
+            ])
+        self.assertEqual(records[0].content, {
+            'uploadId': 'u', 'sequence': 0, 'value': 'AAE='})
+        self.assertEqual(records[1].size, 0)
+        self.assertLessEqual(records[0].t, records[1].t)
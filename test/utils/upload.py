@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+import pyarrow as pa
+from lumy_middleware.utils.codec import serialize_chunks
+from lumy_middleware.utils.upload import UploadSpool
+
+
+class TestUploadSpool(unittest.TestCase):
+
+    def setUp(self):
+        self._spool_dir = tempfile.TemporaryDirectory()
+        os.environ['LUMY_SPOOL_DIR'] = self._spool_dir.name
+        self.table = pa.Table.from_pydict({
+            'a': list(range(10000)),
+            'b': [str(i) for i in range(10000)]
+        })
+
+    def tearDown(self):
+        del os.environ['LUMY_SPOOL_DIR']
+        self._spool_dir.cleanup()
+
+    def test_chunks_are_assembled_into_table(self):
+        spool = UploadSpool()
+        spool.begin('u1')
+        for sequence, chunk in enumerate(
+                serialize_chunks(self.table, 16 * 1024)):
+            spool.append('u1', sequence, chunk.value)
+
+        table = spool.commit('u1')
+
+        self.assertTrue(table.equals(self.table))
+        self.assertEqual(os.listdir(self._spool_dir.name), [])
+
+    def test_out_of_order_chunk_aborts_upload(self):
+        spool = UploadSpool()
+        spool.begin('u1')
+        chunks = list(serialize_chunks(self.table, 16 * 1024))
+
+        with self.assertRaises(Exception):
+            spool.append('u1', 1, chunks[1].value)
+        with self.assertRaises(Exception):
+            spool.commit('u1')
+        self.assertEqual(os.listdir(self._spool_dir.name), [])
+
+    def test_upload_id_is_not_part_of_spool_path(self):
+        spool = UploadSpool()
+        spool.begin('../../u1')
+
+        files = os.listdir(self._spool_dir.name)
+        self.assertEqual(len(files), 1)
+        self.assertNotIn('u1', files[0])
+
+        spool.abort('../../u1')
+        self.assertEqual(os.listdir(self._spool_dir.name), [])
+
+    def test_invalid_chunk_aborts_upload(self):
+        spool = UploadSpool()
+        spool.begin('u1')
+
+        with self.assertRaises(Exception):
+            spool.append('u1', 0, 'not base64!')
+        self.assertEqual(os.listdir(self._spool_dir.name), [])
+        with self.assertRaises(Exception):
+            spool.append('u1', 1, 'AAE=')
+        with self.assertRaises(Exception):
+            spool.commit('u1')
@@ -0,0 +1,74 @@
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from lumy_middleware.utils.watchdog import (Watchdog, anonymize, watched,
+                                            watched_request)
+
+
+def slow_function():
+    time.sleep(0.1)
+
+
+class TestWatchdog(unittest.TestCase):
+
+    def test_anonymize(self):
+        self.assertEqual(
+            anonymize({'stepId': 'a', 'filter': {'pageSize': 10},
+                       'ids': ['a', 'b'], 'x': None}),
+            '{stepId: str, filter: {pageSize: int}, ids: list[2], x: null}')
+
+    def test_fast_requests_are_not_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            watchdog = Watchdog(10, 1, Path(tmp_dir))
+            request_id = watchdog.watch('GetNotes', {'stepId': 's'})
+            self.assertIsNone(watchdog.done(request_id))
+            watchdog.shutdown()
+
+    def test_slow_requests_are_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            watchdog = Watchdog(0.01, 1, Path(tmp_dir))
+            request_id = watchdog.watch('Execute', {'stepId': 's'})
+            slow_function()
+            path = watchdog.done(request_id)
+            watchdog.shutdown()
+
+            self.assertIsNotNone(path)
+            lines = path.read_text().splitlines()
+
+        self.assertGreater(len(lines), 0)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+            self.assertTrue(stack.startswith('Execute({stepId: str});'))
+        self.assertTrue(
+            any('slow_function (watchdog.py' in line for line in lines))
+
+    def test_threads_working_on_request_are_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            watchdog = Watchdog(0.01, 1, Path(tmp_dir))
+            request_id = watchdog.watch('Execute', {'stepId': 's'})
+            token = watched_request.set((watchdog, request_id))
+            try:
+                fn = watched(slow_function)
+            finally:
+                watched_request.reset(token)
+            # the thread that started the request only waits
+            watchdog.detach(request_id)
+            thread = threading.Thread(target=fn)
+            thread.start()
+            thread.join()
+            path = watchdog.done(request_id)
+            watchdog.shutdown()
+
+            self.assertIsNotNone(path)
+            lines = path.read_text().splitlines()
+
+        self.assertGreater(len(lines), 0)
+        for line in lines:
+            self.assertIn('_watched (watchdog.py', line)
+
+    def test_unwatched_functions_are_not_wrapped(self):
+        self.assertIs(watched(slow_function), slow_function)